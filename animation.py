@@ -0,0 +1,220 @@
+import threading
+import time
+from event_log import log_event
+
+# Global variables
+default_duration = 0.12  # Seconds one move/resize step takes when animated
+
+# Function to ease out: fast start, gentle stop
+def ease_out_cubic(t):
+    return 1 - (1 - t) ** 3
+
+# One window on its way from start to target; both rects are (left, top, right, bottom)
+class Transition:
+    __slots__ = ('start', 'target', 'current', 'started_at', 'origin')
+
+    def __init__(self, start, target, started_at, origin=None):
+        self.start = start
+        self.target = target
+        self.current = start
+        self.started_at = started_at
+        self.origin = origin  # Instrumentation token of the press whose first frame is not drawn yet
+
+# Animates moves and resizes instead of jumping by move_pixels in one step.
+# add() takes the same deltas as MoveCoalescer.add(). One scheduler thread writes every window
+# in flight once per frame, at the monitor refresh rate, with all windows in one deferred batch.
+# Positions are computed from the clock, not from a frame counter, so when an app is too slow to
+# repaint at the frame rate the intermediate frames are skipped (and counted) rather than queued.
+# A new press on a window that is still moving retargets it from where it is now.
+# Pass a fake clock and call poll() directly to drive it without the thread;
+# `waker` is then called whenever a window starts moving while none were.
+# With `instrumentation` set, the first frame after a press is charged to the hotkey action of that press.
+class Animator:
+    def __init__(self, backend, rate=60, duration=default_duration, easing=ease_out_cubic, clock=time.monotonic):
+        self.backend = backend
+        self.frame_interval = 1.0 / rate
+        self.duration = duration
+        self.easing = easing
+        self.clock = clock
+        self._transitions = {}  # hwnd -> Transition
+        self._cond = threading.Condition()
+        self._last_frame = None  # Time of the previous frame while windows are moving
+        self._thread = None
+        self._running = False
+        self.waker = None
+        self.instrumentation = None
+        self.transitions = 0
+        self.retargets = 0
+        self.frames = 0
+        self.dropped_frames = 0
+        self.position_calls = 0
+        self.active_time = 0.0
+        self.frame_gaps = 0
+
+    def set_rate(self, rate):
+        with self._cond:
+            self.frame_interval = 1.0 / rate
+            self._cond.notify()
+
+    # Queue a move (dx, dy) and/or a side resize (left, top, right, bottom grow outwards)
+    def add(self, hwnd, dx=0, dy=0, left=0, top=0, right=0, bottom=0):
+        now = self.clock()
+        origin = self.instrumentation.current() if self.instrumentation else None
+        rect = None
+        if hwnd not in self._transitions:
+            rect = tuple(self.backend.get_window_rect(hwnd))
+        with self._cond:
+            idle = not self._transitions
+            transition = self._transitions.get(hwnd)
+            if transition is None:
+                start = goal = rect or tuple(self.backend.get_window_rect(hwnd))
+                self.transitions += 1
+            else:
+                start = transition.current
+                goal = transition.target
+                origin = transition.origin or origin
+                self.retargets += 1
+            target = (goal[0] + dx - left, goal[1] + dy - top, goal[2] + dx + right, goal[3] + dy + bottom)
+            if start == target:
+                self._transitions.pop(hwnd, None)
+            else:
+                self._transitions[hwnd] = Transition(start, target, now, origin)
+            self._cond.notify()
+        if idle and self._transitions and self.waker is not None:
+            self.waker()
+
+    def is_animating(self, hwnd=None):
+        return bool(self._transitions) if hwnd is None else hwnd in self._transitions
+
+    # Seconds until the next frame is due, or None if nothing is moving
+    def time_until_due(self, now=None):
+        if not self._transitions:
+            return None
+        if self._last_frame is None:
+            return 0.0
+        if now is None:
+            now = self.clock()
+        return max(0.0, self._last_frame + self.frame_interval - now)
+
+    # Draw a frame if one is due; returns the time until the next one (or None)
+    def poll(self, now=None):
+        if now is None:
+            now = self.clock()
+        wait = self.time_until_due(now)
+        if wait == 0.0:
+            self.step(now)
+            return self.time_until_due(now)
+        return wait
+
+    # Function to draw one frame: put every window where its easing curve says it is at `now`
+    def step(self, now=None):
+        if now is None:
+            now = self.clock()
+        frame = []
+        finished = []
+        origins = []
+        with self._cond:
+            if self._last_frame is not None:
+                gap = now - self._last_frame
+                self.active_time += gap
+                self.frame_gaps += 1
+                # Frames that should have been drawn in the gap were skipped, not queued
+                missed = int(gap / self.frame_interval + 0.5) - 1
+                if missed > 0:
+                    self.dropped_frames += missed
+            if not self._transitions:
+                self._last_frame = None
+                return
+            for hwnd, transition in self._transitions.items():
+                progress = min(1.0, (now - transition.started_at) / self.duration) if self.duration > 0 else 1.0
+                eased = self.easing(progress)
+                rect = tuple(round(a + (b - a) * eased) for a, b in zip(transition.start, transition.target))
+                if rect != transition.current:
+                    frame.append((hwnd, rect))
+                    transition.current = rect
+                    if transition.origin:
+                        origins.append(transition.origin)
+                        transition.origin = None
+                if progress >= 1.0:
+                    finished.append((hwnd, transition))
+        instrumentation = self.instrumentation
+        begun = instrumentation.begin_deferred() if instrumentation else None
+        batch = None
+        if len(frame) > 1 and hasattr(self.backend, 'begin_defer'):
+            batch = self.backend.begin_defer(len(frame))
+        for hwnd, (left, top, right, bottom) in frame:
+            if batch is None:
+                self.backend.set_window_pos(hwnd, left, top, right - left, bottom - top)
+            else:
+                batch.set_pos(hwnd, left, top, right - left, bottom - top)
+        if batch is not None:
+            batch.commit()
+        if instrumentation:
+            instrumentation.end_deferred(begun, origins)
+        with self._cond:
+            self.frames += 1
+            self.position_calls += len(frame)
+            for hwnd, transition in finished:
+                # A press during the frame may have retargeted the window; keep that transition
+                if self._transitions.get(hwnd) is transition:
+                    del self._transitions[hwnd]
+            self._last_frame = now if self._transitions else None
+
+    def stats(self):
+        return {
+            'transitions': self.transitions,
+            'retargets': self.retargets,
+            'frames': self.frames,
+            'dropped_frames': self.dropped_frames,
+            'fps': self.frame_gaps / self.active_time if self.active_time else 0.0,
+            'position_calls': self.position_calls,
+            'in_flight': len(self._transitions),
+        }
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    # Stop the thread and put every window straight at its target
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        self.finish()
+
+    # Function to put moving windows (or just hwnd) straight at their target
+    def finish(self, hwnd=None):
+        with self._cond:
+            if hwnd is None:
+                moving = list(self._transitions.items())
+                self._transitions.clear()
+            else:
+                transition = self._transitions.pop(hwnd, None)
+                moving = [(hwnd, transition)] if transition else []
+            if not self._transitions:
+                self._last_frame = None
+        for hwnd, transition in moving:
+            left, top, right, bottom = transition.target
+            self.backend.set_window_pos(hwnd, left, top, right - left, bottom - top)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and not self._transitions:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                wait = self.time_until_due()
+                if wait:
+                    self._cond.wait(wait)
+                    continue
+            try:
+                self.step()
+            except Exception as e:
+                log_event('error', f"Failed to animate window: {e}", source='animator')
@@ -0,0 +1,169 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from control_channel import AsyncControlServer, default_port
+from event_log import log_event
+from instrumentation import Histogram
+
+# Global variables
+default_lag_interval = 0.05  # Seconds between event loop lag samples
+worker_batch = 0.02  # Seconds a hotkey worker stays in the executor running presses as they arrive
+lag_warning = 0.1  # Loop lag in seconds that is worth a warning in the log
+lag_warning_every = 10.0  # At most one lag warning per this many seconds
+
+# Runs the daemon on one asyncio event loop instead of a thread per component (--headless).
+# Every job is a task on the loop:
+#   hotkey workers  take presses from the Dispatcher and run them in the executor, staying there for
+#                   worker_batch seconds per trip, so a storm is not paced by hops through the loop
+#   movers          flush the MoveCoalescer / draw Animator frames when they are due
+#   config watcher  re-reads settings.json every poll_interval
+#   control server  the JSON-lines control channel
+#   lag monitor     measures how late the loop wakes up from a sleep
+# Backend calls only happen in the executor, a small thread pool, so the loop itself never waits on
+# a window. Components wake the loop through their `waker` when work arrives from another thread
+# (the keyboard hook, an action running in the executor). stop() may be called from any thread;
+# run() then cancels every task, closes the control channel and waits for running actions.
+class AsyncDaemon:
+    def __init__(self, dispatcher, movers, config, handlers, port=default_port, inline_commands=(), workers=4, lag_interval=default_lag_interval, token=None):
+        self.dispatcher = dispatcher
+        self.movers = movers
+        self.config = config
+        self.handlers = handlers
+        self.port = port
+        self.token = token
+        self.inline_commands = inline_commands
+        self.workers = workers
+        self.lag_interval = lag_interval
+        self.executor = None
+        self.control = None
+        self.lag = Histogram()
+        self.wakeups = 0
+        self.started_at = None
+        self._loop = None
+        self._tasks = []
+        self._stopping = None
+        self._work = None
+
+    # Function to ask the loop to shut down; safe to call from any thread
+    def stop(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._stopping.set)
+
+    # Function to run the daemon until stop(); `ready` is called once every task is up
+    async def run(self, ready=None):
+        self._loop = asyncio.get_running_loop()
+        self._stopping = asyncio.Event()
+        self._work = asyncio.Event()
+        self.started_at = time.monotonic()
+        # One thread on top of the hotkey workers, so a due flush never waits behind a slow action
+        self.executor = ThreadPoolExecutor(max_workers=self.workers + 1, thread_name_prefix='backend')
+        self.dispatcher.waker = self._waker(self._work)
+        try:
+            if self.port:
+                self.control = AsyncControlServer(self.handlers, self.port, self.executor, self.inline_commands, self.token)
+                try:
+                    await self.control.start()
+                except OSError as e:
+                    self.control = None
+                    log_event('warning', f"Control channel disabled: {e}")
+            self._tasks = [asyncio.create_task(self._hotkey_worker(), name=f'hotkey-worker-{i}') for i in range(self.workers)]
+            for mover in self.movers:
+                wake = asyncio.Event()
+                mover.waker = self._waker(wake)
+                self._tasks.append(asyncio.create_task(self._run_mover(mover, wake), name=type(mover).__name__))
+            self._tasks.append(asyncio.create_task(self._watch_config(), name='config-watcher'))
+            self._tasks.append(asyncio.create_task(self._monitor_lag(), name='lag-monitor'))
+            if ready:
+                ready()
+            await self._stopping.wait()
+        finally:
+            await self._shutdown()
+
+    async def _shutdown(self):
+        if self.control:
+            await self.control.stop()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self.dispatcher.waker = None
+        for mover in self.movers:
+            mover.waker = None
+        # Actions already handed to the executor finish; whatever is still queued is run by the caller.
+        # The wait happens on a helper thread so the loop stays free meanwhile.
+        await asyncio.to_thread(self.executor.shutdown)
+        self._loop = None
+
+    # Function to build a waker that sets an asyncio.Event from whatever thread calls it
+    def _waker(self, event):
+        loop = self._loop
+
+        def wake():
+            self.wakeups += 1
+            loop.call_soon_threadsafe(event.set)
+        return wake
+
+    async def _hotkey_worker(self):
+        loop = self._loop
+        while True:
+            if await loop.run_in_executor(self.executor, self.dispatcher.run_for, worker_batch):
+                continue
+            # No lane was ready; sleep until a press arrives (the check and clear run on the loop, so no wake is lost)
+            if not self.dispatcher.has_ready():
+                self._work.clear()
+                await self._work.wait()
+
+    # Function to flush a MoveCoalescer or step an Animator whenever it is due
+    async def _run_mover(self, mover, wake):
+        loop = self._loop
+        while True:
+            wait = mover.time_until_due()
+            if wait is None:
+                wake.clear()
+                if mover.time_until_due() is None:
+                    await wake.wait()
+            elif wait > 0:
+                await asyncio.sleep(wait)
+            else:
+                try:
+                    await loop.run_in_executor(self.executor, mover.poll)
+                except Exception as e:
+                    log_event('error', f"Failed to move window: {e}", source=type(mover).__name__.lower())
+
+    async def _watch_config(self):
+        loop = self._loop
+        while True:
+            await asyncio.sleep(self.config.poll_interval)
+            try:
+                await loop.run_in_executor(self.executor, self.config.reload)
+            except OSError:
+                pass  # settings.json is being replaced; the next poll reads it
+            except ValueError as e:
+                # A listener rejected a value; keep watching so the next fix to the file is picked up
+                log_event('warning', f"Could not apply settings: {e}", source='config')
+
+    async def _monitor_lag(self):
+        loop = self._loop
+        last_warning = float('-inf')
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.lag_interval)
+            now = loop.time()
+            lag = max(0.0, now - start - self.lag_interval)
+            self.lag.record(int(lag * 1e9))
+            if lag >= lag_warning and now - last_warning >= lag_warning_every:
+                last_warning = now
+                log_event('warning', f"Event loop ran {lag * 1000:.0f} ms late", source='loop', lag_ms=lag * 1000)
+
+    def stats(self):
+        lag = self.lag.summary()
+        return {
+            'tasks': len(self._tasks),
+            'executor_threads': self.workers + 1,
+            'wakeups': self.wakeups,
+            'control_requests': self.control.requests if self.control else 0,
+            'lag_samples': lag['count'],
+            'mean_lag_ms': lag['mean_us'] / 1000,
+            'p99_lag_ms': lag['p99_us'] / 1000,
+            'max_lag_ms': lag['max_us'] / 1000,
+        }
@@ -0,0 +1,79 @@
+# Drives the Animator on a simulated clock against the simulated window manager, where every
+# position write costs the app some repaint time. Reports achieved FPS, dropped frames and
+# position writes, and checks every window still lands exactly on its target.
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from animation import Animator
+from window_backend import SimulatedBackend
+
+frame_rate = 60
+
+# Simulated clock advanced by the benchmark and by slow writes
+class SimulatedClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+# Window manager whose apps take repaint_cost seconds to handle each position write (or batch)
+class SlowAppBackend(SimulatedBackend):
+    def __init__(self, clock, repaint_cost, window_count):
+        SimulatedBackend.__init__(self, window_count=window_count)
+        self.clock = clock
+        self.repaint_cost = repaint_cost
+
+    def _call(self, name):
+        SimulatedBackend._call(self, name)
+        if name in ('set_window_pos', 'end_defer_window_pos'):
+            self.clock.now += self.repaint_cost
+
+# Function to replay presses (time, dx) on the given windows and draw frames until nothing moves
+def run(repaint_cost, presses, window_count=1, duration=0.12):
+    clock = SimulatedClock()
+    backend = SlowAppBackend(clock, repaint_cost, window_count)
+    animator = Animator(backend, rate=frame_rate, duration=duration, clock=clock)
+    hwnds = list(backend.windows)
+    expected = {hwnd: list(backend.windows[hwnd].rect) for hwnd in hwnds}
+    presses = list(presses)
+    while presses or animator.is_animating():
+        wait = animator.time_until_due(clock.now)
+        next_frame = clock.now + wait if wait is not None else float('inf')
+        if presses and presses[0][0] <= next_frame:
+            at, dx = presses.pop(0)
+            clock.now = max(clock.now, at)
+            for hwnd in hwnds:
+                animator.add(hwnd, dx=dx)
+                expected[hwnd][0] += dx
+                expected[hwnd][2] += dx
+        else:
+            clock.now = next_frame
+            animator.step(clock.now)
+    exact = all(tuple(expected[hwnd]) == backend.windows[hwnd].rect for hwnd in hwnds)
+    return animator.stats(), clock.now, exact
+
+def report(name, result):
+    stats, elapsed, exact = result
+    print(f"{name:38s} {stats['fps']:5.1f} fps  {stats['frames']:4d} frames  {stats['dropped_frames']:4d} dropped  "
+          f"{stats['position_calls']:5d} writes  {stats['retargets']:3d} retargets  done at {elapsed * 1000:6.0f} ms  "
+          f"{'exact' if exact else 'WRONG TARGET'}")
+    return exact
+
+def main():
+    one_press = [(0.0, 200)]
+    held_key = [(i / 30, 40) for i in range(30)]  # Key repeat at 30 Hz for one second
+    results = [
+        report("one press, fast app (1 ms repaint)", run(0.001, one_press)),
+        report("one press, slow app (45 ms repaint)", run(0.045, one_press)),
+        report("held key, fast app", run(0.001, held_key)),
+        report("held key, slow app", run(0.045, held_key)),
+        report("held key, 20 windows in one batch", run(0.004, held_key, window_count=20)),
+    ]
+    if not all(results):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# Compares per-window commits with one deferred-position transaction when moving
+# 10/100/500 windows at once on the simulated backend.
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import togglewindows
+from overlay import NullOverlay
+from window_backend import SimulatedBackend
+
+call_latency = 20e-6  # Cost of one Win32 round trip
+
+def per_window(backend, hwnds):
+    for hwnd in hwnds:
+        left, top, right, bottom = backend.windows[hwnd].rect
+        backend.set_window_pos(hwnd, left + 40, top, right - left, bottom - top)
+
+def batched(backend, hwnds):
+    batch = backend.begin_defer(len(hwnds))
+    for hwnd in hwnds:
+        left, top, right, bottom = backend.windows[hwnd].rect
+        batch.set_pos(hwnd, left + 40, top, right - left, bottom - top)
+    batch.commit()
+
+def measure(commit, count, rounds=5):
+    backend = SimulatedBackend(window_count=count, call_latency=call_latency)
+    hwnds = list(backend.windows)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        commit(backend, hwnds)
+    return (time.perf_counter() - start) / rounds, backend.repaints // rounds
+
+def main():
+    print(f"backend round trip {call_latency * 1e6:.0f} us")
+    for count in (10, 100, 500):
+        single, single_repaints = measure(per_window, count)
+        batch, batch_repaints = measure(batched, count)
+        print(f"{count:4d} windows: per-window {single * 1000:7.2f} ms ({single_repaints} repaints), "
+              f"batched {batch * 1000:7.2f} ms ({batch_repaints} repaint), {single / batch:5.1f}x")
+
+    # Group hotkey end to end: every window of the foreground app moves in one commit
+    backend = SimulatedBackend(window_count=500, call_latency=call_latency)
+    togglewindows.overlay = NullOverlay()
+    togglewindows.set_backend(backend)
+    backend.repaints = 0
+    start = time.perf_counter()
+    togglewindows.move_group_right(backend.foreground)
+    togglewindows.coalescer.flush()
+    togglewindows.set_group_always_on_top(backend.foreground)
+    elapsed = time.perf_counter() - start
+    group = togglewindows.get_window_group(backend.foreground)
+    print(f"group hotkeys on {len(group)} windows of one app: {elapsed * 1000:.2f} ms, {backend.repaints} repaints")
+
+if __name__ == "__main__":
+    main()
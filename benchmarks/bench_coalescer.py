@@ -0,0 +1,114 @@
+# Replays held-down arrow keys through the MoveCoalescer on a simulated clock and a fake window backend.
+# Reports SetWindowPos calls per second and the lag from key event to window update, and checks that
+# every window is written at most once per frame and with fewer calls than key events; exits with
+# status 1 if not.
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from coalescer import MoveCoalescer
+
+# Fake window backend that records every call and when each window was written
+class FakeWindows:
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.rects = {}
+        self.position_calls = 0
+        self.writes = {}  # hwnd -> times of its SetWindowPos calls
+
+    def get_window_rect(self, hwnd):
+        return self.rects.setdefault(hwnd, (100, 100, 900, 700))
+
+    def set_window_pos(self, hwnd, x, y, width, height):
+        self.rects[hwnd] = (x, y, x + width, y + height)
+        self.position_calls += 1
+        self.writes.setdefault(hwnd, []).append(self.clock())
+
+# Simulated clock advanced by the benchmark
+class SimulatedClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+# Function to simulate held keys: every stream repeats at repeat_rate Hz for duration seconds
+def simulate(streams, repeat_rate, frame_rate, duration=5.0):
+    clock = SimulatedClock()
+    windows = FakeWindows(clock)
+    coalescer = MoveCoalescer(windows, rate=frame_rate, clock=clock)
+    events = []
+    for index, (hwnd, dx, dy) in enumerate(streams):
+        offset = index / (repeat_rate * len(streams))
+        count = int(duration * repeat_rate)
+        events.extend((offset + i / repeat_rate, hwnd, dx, dy) for i in range(count))
+    events.sort()
+
+    for event_time, hwnd, dx, dy in events:
+        # Let the flush scheduler catch up to the event time
+        while True:
+            wait = coalescer.time_until_due(clock.now)
+            if wait is None or clock.now + wait > event_time:
+                break
+            clock.now += wait
+            coalescer.poll(clock.now)
+        clock.now = event_time
+        coalescer.add(hwnd, dx=dx, dy=dy)
+    while coalescer.time_until_due(clock.now) is not None:
+        clock.now += coalescer.time_until_due(clock.now)
+        coalescer.poll(clock.now)
+    return coalescer.stats(), windows, duration
+
+# Function to run the real flush thread against the wall clock
+def run_threaded(events_per_second, frame_rate, duration=1.0):
+    windows = FakeWindows()
+    coalescer = MoveCoalescer(windows, rate=frame_rate)
+    coalescer.start()
+    interval = 1.0 / events_per_second
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        coalescer.add(1, dx=40)
+        time.sleep(interval)
+    coalescer.stop()
+    return coalescer.stats(), windows, duration
+
+# Function to print one run and return its problems. On the simulated clock no two writes to a window
+# may be closer than a frame; against the wall clock a write can be late, so only the count is checked
+# (plus the flush stop() does).
+def report(name, frame_rate, stats, windows, duration, simulated=True):
+    print(f"{name:45s} events={stats['events']:5d} SetWindowPos/s={windows.position_calls / duration:7.1f} "
+          f"mean lag={stats['mean_lag_ms']:6.2f} ms max lag={stats['max_lag_ms']:6.2f} ms")
+    problems = []
+    frame = 1.0 / frame_rate
+    frames = int(duration * frame_rate) + (1 if simulated else 2)
+    for hwnd, times in windows.writes.items():
+        gaps = [later - earlier for earlier, later in zip(times, times[1:])]
+        if simulated and gaps and min(gaps) < frame - 1e-9:
+            problems.append(f"{name}: window {hwnd} written twice {min(gaps) * 1000:.2f} ms apart, frame is {frame * 1000:.2f} ms")
+        if len(times) > frames:
+            problems.append(f"{name}: window {hwnd} written {len(times)} times in {frames} frames")
+    # Writes only drop below one per event once events come faster than frames
+    if windows.position_calls > stats['events'] or (stats['events'] > frames * len(windows.writes) and windows.position_calls >= stats['events']):
+        problems.append(f"{name}: {windows.position_calls} SetWindowPos calls for {stats['events']} events")
+    return problems
+
+def main():
+    one_key = [(1, 40, 0)]
+    diagonal = [(1, 40, 0), (1, 0, 40)]
+    three_keys = [(1, 40, 0), (1, 0, 40), (1, -40, 0)]
+    problems = []
+    for frame_rate in (30, 60, 144):
+        problems += report(f"1 key @33Hz, frame {frame_rate}Hz", frame_rate, *simulate(one_key, 33, frame_rate))
+        problems += report(f"2 keys @33Hz, frame {frame_rate}Hz", frame_rate, *simulate(diagonal, 33, frame_rate))
+        problems += report(f"3 keys @50Hz, frame {frame_rate}Hz", frame_rate, *simulate(three_keys, 50, frame_rate))
+    print("uncoalesced baseline: one SetWindowPos per event (SetWindowPos/s = events/s)")
+    problems += report("threaded, 500 events/s, frame 60Hz", 60, *run_threaded(500, 60), simulated=False)
+    for problem in problems:
+        print(f"PROBLEM: {problem}")
+    if problems:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
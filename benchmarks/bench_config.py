@@ -0,0 +1,39 @@
+# Compares the per-keypress cost of reading move_pixels.txt from disk against the cached ConfigStore.
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config_store import ConfigStore, read_move_pixels
+
+iterations = 100000
+
+# Function to time a callable and return nanoseconds per call
+def time_per_call(fn, count):
+    start = time.perf_counter_ns()
+    for _ in range(count):
+        fn()
+    return (time.perf_counter_ns() - start) / count
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        move_pixels_file = os.path.join(tmp, 'move_pixels.txt')
+        settings_file = os.path.join(tmp, 'settings.json')
+        with open(move_pixels_file, 'w') as f:
+            f.write('40')
+
+        config = ConfigStore(settings_file, move_pixels_file=move_pixels_file)
+
+        before = time_per_call(lambda: read_move_pixels(move_pixels_file), iterations // 10)
+        after = time_per_call(lambda: config.get('move_pixels'), iterations)
+        poll = time_per_call(config.reload, iterations // 10)
+
+    print(f"file read per keypress:   {before:10.0f} ns")
+    print(f"cached read per keypress: {after:10.0f} ns")
+    print(f"background poll (stat):   {poll:10.0f} ns per poll, every {config.poll_interval}s")
+    print(f"speedup: {before / after:.0f}x")
+
+if __name__ == "__main__":
+    main()
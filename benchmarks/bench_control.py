@@ -0,0 +1,69 @@
+# Round-trips control channel commands against a fake daemon on localhost.
+# The fake daemon wires the real ConfigStore and MoveCoalescer to a fake window backend,
+# so this runs on Linux without win32gui or keyboard.
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from coalescer import MoveCoalescer
+from config_store import ConfigStore
+from control_channel import ControlClient, ControlServer
+
+requests = 5000
+
+# Fake window backend for the coalescer
+class FakeWindows:
+    def __init__(self):
+        self.rects = {}
+
+    def get_window_rect(self, hwnd):
+        return self.rects.setdefault(hwnd, (0, 0, 800, 600))
+
+    def set_window_pos(self, hwnd, x, y, width, height):
+        self.rects[hwnd] = (x, y, x + width, y + height)
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        config = ConfigStore(os.path.join(tmp, 'settings.json'), move_pixels_file=os.path.join(tmp, 'move_pixels.txt'))
+        coalescer = MoveCoalescer(FakeWindows())
+        state = {'paused': False, 'shutdown': False}
+        handlers = {
+            'set_config': lambda **values: config.update(values),
+            'pause': lambda: state.update(paused=True),
+            'resume': lambda: state.update(paused=False),
+            'status': lambda: {'paused': state['paused'], 'move_pixels': config.get('move_pixels')},
+            'stats': lambda: {'coalescer': coalescer.stats()},
+            'shutdown': lambda: state.update(shutdown=True),
+        }
+        server = ControlServer(handlers, port=0, token='bench')
+        server.start()
+        client = ControlClient(port=server.port, token='bench')
+
+        assert client.request('set_config', move_pixels=55)['ok']
+        assert client.request('status')['result']['move_pixels'] == 55
+        assert client.request('pause')['ok'] and client.request('status')['result']['paused']
+        assert client.request('resume')['ok'] and not client.request('status')['result']['paused']
+        assert not client.request('bogus')['ok']
+        stranger = ControlClient(port=server.port, token='guess')
+        assert stranger.request('status')['error'] == 'not authorized'
+        stranger.close()
+
+        for cmd, args in (('set_config', {'move_pixels': 41}), ('status', {}), ('stats', {})):
+            samples = []
+            for i in range(requests):
+                start = time.perf_counter()
+                client.request(cmd, **args)
+                samples.append((time.perf_counter() - start) * 1e6)
+            samples.sort()
+            print(f"{cmd:12s} round trip p50={samples[len(samples) // 2]:7.1f} us p99={samples[int(len(samples) * 0.99)]:7.1f} us")
+
+        client.request('shutdown')
+        assert state['shutdown']
+        client.close()
+        server.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# Measures how long the keyboard hook callback takes when it hands presses to the Dispatcher,
+# compared with running the handler inline, while every backend call is artificially slow.
+# Exits with status 1 if the dispatched hook callback p99 is over the budget.
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import togglewindows
+from overlay import NullOverlay
+from window_backend import SimulatedBackend
+
+def percentile(samples, fraction):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+# Function to build a key stream: held-key runs on a few windows, with focus changes in between
+def build_stream(backend, events, seed=1):
+    rng = random.Random(seed)
+    hwnds = list(backend.windows)[:8]
+    combos = ['up', 'down', 'left', 'right', 'shift+right', 'ctrl+up', 'ctrl+right', 'ctrl+left', 'ctrl+shift+m']
+    stream = []
+    while len(stream) < events:
+        focus = rng.choice(hwnds)
+        combo = rng.choice(combos)
+        stream.extend((focus, combo) for _ in range(rng.randint(1, 20)))
+    return stream[:events]
+
+def main():
+    parser = argparse.ArgumentParser(description="Hook-callback time with and without the dispatcher")
+    parser.add_argument('--events', type=int, default=2000)
+    parser.add_argument('--latency-ms', type=float, default=2.0, help="simulated cost of every backend call")
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--budget-us', type=float, default=500.0, help="allowed dispatched hook callback p99; the hook must not hold up keystrokes")
+    args = parser.parse_args()
+
+    backend = SimulatedBackend(
+        window_count=50,
+        monitors=[(1, (0, 0, 1920, 1080), (0, 0, 1920, 1040)), (2, (1920, 0, 3840, 1080), (1920, 0, 3840, 1040))],
+        call_latency=args.latency_ms / 1000,
+    )
+    togglewindows.overlay = NullOverlay()
+    togglewindows.set_backend(backend)
+    togglewindows.coalescer.start()
+    stream = build_stream(backend, args.events)
+    callbacks = togglewindows.instrumented_hotkeys()
+
+    # Inline: the hook runs the handler itself (a sample is enough, it is slow)
+    inline = []
+    for focus, combo in stream[:100]:
+        backend.set_foreground_window(focus)
+        start = time.perf_counter()
+        callbacks[combo](backend.get_foreground_window())  # The hook would have to ask for the window itself
+        inline.append(time.perf_counter() - start)
+
+    # Dispatched: the hook only submits; workers run the handlers
+    dispatcher = togglewindows.dispatcher
+    dispatcher.worker_count = args.workers
+    dispatcher.start()
+    hook = []
+    start_all = time.perf_counter()
+    for focus, combo in stream:
+        togglewindows.window_index.on_event('foreground', focus)  # What the foreground WinEvent would report
+        callback = callbacks[combo]
+        policy = togglewindows.dispatch_policies.get(callback.__name__, 'keep')
+        start = time.perf_counter()
+        dispatcher.submit(callback, policy)
+        hook.append(time.perf_counter() - start)
+        time.sleep(0.0005)  # Key repeat/typing gap so the workers get the GIL back between presses
+    dispatcher.wait_idle()
+    drained = time.perf_counter() - start_all
+    dispatcher.stop()
+    togglewindows.coalescer.stop()
+
+    print(f"backend call latency {args.latency_ms:.1f} ms, {args.workers} workers, {len(stream)} presses")
+    print(f"inline hook callback:     p50 {percentile(inline, 0.5) * 1e6:9.0f} us  p99 {percentile(inline, 0.99) * 1e6:9.0f} us  max {max(inline) * 1e6:9.0f} us")
+    print(f"dispatched hook callback: p50 {percentile(hook, 0.5) * 1e6:9.1f} us  p99 {percentile(hook, 0.99) * 1e6:9.1f} us  max {max(hook) * 1e6:9.1f} us")
+    print(f"all presses handled after {drained:.2f} s")
+    print("dispatcher:", dispatcher.stats())
+    p99 = percentile(hook, 0.99) * 1e6
+    print(f"dispatched hook callback p99 {p99:.1f} us (budget {args.budget_us:.0f} us)")
+    if p99 > args.budget_us:
+        print("OVER BUDGET")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
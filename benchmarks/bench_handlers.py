@@ -0,0 +1,83 @@
+# Replays scripted hotkey streams through the real handlers in togglewindows.py
+# against the simulated window manager and reports ops/sec and p50/p99 latency per action.
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import togglewindows
+from overlay import NullOverlay
+from window_backend import SimulatedBackend
+
+# Function to build a scripted key stream: runs of held keys, with the focus hopping between windows
+def build_stream(backend, events, seed=1):
+    rng = random.Random(seed)
+    hwnds = list(backend.windows)
+    # Layouts and tiling touch every window, and there are no macros to play here; bench_layouts.py,
+    # bench_tiling.py and bench_macros.py cover them
+    skipped = (
+        togglewindows.save_current_layout, togglewindows.restore_saved_layout,
+        togglewindows.tile_next_layout, togglewindows.tile_previous_layout,
+        togglewindows.toggle_macro_recording,
+    )
+    combos = [
+        combo for combo, callback in togglewindows.hotkeys.items()
+        if callback not in skipped and not callback.__name__.startswith('play_macro_')
+    ]
+    stream = []
+    while len(stream) < events:
+        focus = rng.choice(hwnds)
+        combo = rng.choice(combos)
+        stream.extend((focus, combo) for _ in range(rng.randint(1, 30)))
+    return stream[:events]
+
+def percentile(samples, fraction):
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+def run(stream, backend):
+    samples = {}
+    coalescer = togglewindows.coalescer
+    for focus, combo in stream:
+        backend.foreground = focus
+        callback = togglewindows.hotkeys[combo]
+        start = time.perf_counter()
+        callback(focus)
+        coalescer.flush()  # Include the window write that the flush thread would do
+        samples.setdefault(combo, []).append(time.perf_counter() - start)
+    return samples
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay scripted hotkey streams against the simulated backend")
+    parser.add_argument('--windows', type=int, default=5000)
+    parser.add_argument('--events', type=int, default=20000)
+    parser.add_argument('--latency-us', type=float, default=0.0, help="simulated cost of every backend call")
+    args = parser.parse_args()
+
+    backend = SimulatedBackend(
+        window_count=args.windows,
+        monitors=[(1, (0, 0, 1920, 1080), (0, 0, 1920, 1040)), (2, (1920, 0, 3840, 1080), (1920, 0, 3840, 1040))],
+        call_latency=args.latency_us / 1e6,
+    )
+    togglewindows.overlay = NullOverlay()
+    togglewindows.set_backend(backend)
+    stream = build_stream(backend, args.events)
+
+    start = time.perf_counter()
+    samples = run(stream, backend)
+    elapsed = time.perf_counter() - start
+
+    print(f"{args.windows} windows, {args.events} events, backend latency {args.latency_us} us")
+    print(f"{'action':18s} {'count':>6s} {'ops/sec':>10s} {'p50 us':>8s} {'p99 us':>8s}")
+    for combo in togglewindows.hotkeys:
+        timings = sorted(samples.get(combo, []))
+        if not timings:
+            continue
+        ops = len(timings) / sum(timings)
+        print(f"{combo:18s} {len(timings):6d} {ops:10.0f} {percentile(timings, 0.5) * 1e6:8.1f} {percentile(timings, 0.99) * 1e6:8.1f}")
+    print(f"total: {args.events / elapsed:.0f} ops/sec, backend calls: {dict(backend.calls)}")
+
+if __name__ == "__main__":
+    main()
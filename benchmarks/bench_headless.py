@@ -0,0 +1,200 @@
+# Sustained synthetic key storms against the daemon on the simulated backend, so it runs on Linux.
+# Starts togglewindows.py with --simulated (and --headless for the asyncio event loop), then
+# presses hotkeys through the control channel at a fixed rate over several pipelined connections.
+# Reports press throughput, the round trip of each press, how long presses waited for a worker,
+# how far window moves lagged behind the first press, the event loop's own lag, and checks that
+# the daemon shuts down cleanly afterwards. Exits with status 1 on errors, dropped presses, an unclean
+# shutdown, or (with --mode both) a headless press round trip p99 above --max-p99-ratio times the threaded one.
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root)
+
+from control_channel import ControlClient, read_token
+
+ready_line = "Hotkey listener started."
+storm_keys = (
+    'up', 'down', 'left', 'right', 'shift+left', 'shift+right', 'shift+up', 'shift+down',
+    'ctrl+up', 'ctrl+down', 'ctrl+alt+shift+left', 'ctrl+alt+shift+right',
+)
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def percentile(samples, fraction):
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))] if samples else 0.0
+
+# Presses keys on one connection at `rate` per second; responses are read on a second thread
+class StormConnection:
+    def __init__(self, port, rate, seconds, offset):
+        self.port = port
+        self.sock = socket.create_connection(('127.0.0.1', port))
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.rate = rate
+        self.seconds = seconds
+        self.offset = offset
+        self.sent_at = []
+        self.round_trips = []
+        self.errors = []
+        self.sent = 0
+        self.received = 0
+
+    def send(self):
+        token = read_token(self.port)
+        lines = [(json.dumps({'cmd': 'press', 'args': {'combo': key}, 'token': token}) + '\n').encode() for key in storm_keys]
+        start = time.perf_counter()
+        while True:
+            elapsed = time.perf_counter() - start
+            if elapsed >= self.seconds:
+                break
+            due = int(elapsed * self.rate) + 1 if self.rate else self.sent + 64
+            chunk = []
+            while self.sent < due:
+                chunk.append(lines[(self.sent + self.offset) % len(lines)])
+                self.sent += 1
+            if chunk:
+                now = time.perf_counter()
+                self.sent_at.extend([now] * len(chunk))
+                self.sock.sendall(b''.join(chunk))
+            if self.rate:
+                time.sleep(0.001)
+
+    def receive(self):
+        reader = self.sock.makefile('rb')
+        for line in reader:
+            now = time.perf_counter()
+            self.round_trips.append(now - self.sent_at[self.received])
+            self.received += 1
+            response = json.loads(line)
+            if not response['ok'] and len(self.errors) < 5:
+                self.errors.append(response['error'])
+
+    def run(self):
+        receiver = threading.Thread(target=self.receive, daemon=True)
+        receiver.start()
+        self.send()
+        self.sock.shutdown(socket.SHUT_WR)  # The daemon answers what is left, then closes the connection
+        receiver.join(timeout=30)
+        self.sock.close()
+
+# Function to run one storm against a freshly started daemon; returns the numbers to report
+def storm(headless, rate, seconds, connections):
+    port = free_port()
+    command = [sys.executable, '-u', 'togglewindows.py', '--simulated', '--control-port', str(port)]
+    if headless:
+        command.append('--headless')
+    process = subprocess.Popen(command, cwd=root, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    output = []
+    try:
+        for line in process.stdout:
+            output.append(line.rstrip())
+            if line.strip() == ready_line:
+                break
+        else:
+            raise RuntimeError("daemon exited before hotkeys were ready:\n" + "\n".join(output))
+        threading.Thread(target=lambda: output.extend(line.rstrip() for line in process.stdout), daemon=True).start()
+
+        storms = [StormConnection(port, rate / connections, seconds, i * 5) for i in range(connections)]
+        threads = [threading.Thread(target=connection.run) for connection in storms]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        sent_for = time.perf_counter() - start
+
+        client = ControlClient(port, timeout=10.0)
+        while True:
+            stats = client.request('stats')['result']
+            if not stats['dispatcher']['queued'] and not stats['dispatcher']['running']:
+                break
+            time.sleep(0.01)
+        drained_after = time.perf_counter() - start - sent_for
+        client.request('shutdown')
+        client.close()
+        stopping = time.perf_counter()
+        code = process.wait(timeout=10)
+        shutdown_time = time.perf_counter() - stopping
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+    round_trips = sorted(sample for connection in storms for sample in connection.round_trips)
+    return {
+        'sent': sum(connection.sent for connection in storms),
+        'answered': len(round_trips),
+        'errors': [error for connection in storms for error in connection.errors],
+        'sent_for': sent_for,
+        'drained_after': drained_after,
+        'round_trips': round_trips,
+        'stats': stats,
+        'exit_code': code,
+        'shutdown_time': shutdown_time,
+        'tracebacks': [line for line in output if line.startswith('Traceback')],
+    }
+
+def report(name, result):
+    dispatcher = result['stats']['dispatcher']
+    coalescer = result['stats']['coalescer']
+    round_trips = result['round_trips']
+    print(f"{name}:")
+    print(f"  presses: {result['sent']} sent in {result['sent_for']:.1f} s ({result['sent'] / result['sent_for']:,.0f}/s), "
+          f"{result['answered']} answered, queue drained {result['drained_after'] * 1000:.0f} ms after the last press")
+    print(f"  press round trip: p50 {percentile(round_trips, 0.5) * 1e3:.2f} ms, p99 {percentile(round_trips, 0.99) * 1e3:.2f} ms, "
+          f"max {percentile(round_trips, 1.0) * 1e3:.2f} ms")
+    print(f"  dispatcher: {dispatcher['executed']} actions run ({dispatcher['merged']} merged, {dispatcher['dropped']} dropped, {dispatcher['errors']} failed), "
+          f"wait mean {dispatcher['mean_wait_ms']:.2f} ms, max {dispatcher['max_wait_ms']:.2f} ms")
+    print(f"  coalescer: {coalescer['position_calls']} window writes in {coalescer['flushes']} flushes, "
+          f"move lag mean {coalescer['mean_lag_ms']:.1f} ms, max {coalescer['max_lag_ms']:.1f} ms")
+    loop = result['stats'].get('loop')
+    if loop:
+        print(f"  event loop: {loop['tasks']} tasks, {loop['executor_threads']} executor threads, lag mean {loop['mean_lag_ms']:.2f} ms, "
+              f"p99 under {loop['p99_lag_ms']:.1f} ms, max {loop['max_lag_ms']:.1f} ms over {loop['lag_samples']} samples")
+    print(f"  shutdown: exit code {result['exit_code']} after {result['shutdown_time'] * 1000:.0f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Key storms against the threaded and the headless asyncio daemon")
+    parser.add_argument('--rate', type=float, default=2000, help="presses per second over all connections (0 for as fast as possible)")
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--connections', type=int, default=2)
+    parser.add_argument('--mode', choices=('headless', 'threaded', 'both'), default='both')
+    parser.add_argument('--max-p99-ratio', type=float, default=2.0, help="headless round trip p99 allowed, as a multiple of the threaded p99")
+    args = parser.parse_args()
+
+    failed = False
+    p99s = {}
+    modes = [('threaded', False), ('headless', True)]
+    for name, headless in modes:
+        if args.mode not in (name, 'both'):
+            continue
+        result = storm(headless, args.rate, args.seconds, args.connections)
+        report(name, result)
+        problems = result['errors'] + result['tracebacks']
+        if result['answered'] != result['sent']:
+            problems.append(f"{result['sent'] - result['answered']} presses were not answered")
+        dropped = result['stats']['dispatcher']['dropped']
+        if dropped:
+            problems.append(f"{dropped} presses were dropped by the dispatcher")
+        if result['exit_code'] != 0:
+            problems.append(f"daemon exited with {result['exit_code']}")
+        p99s[name] = percentile(result['round_trips'], 0.99)
+        if name == 'headless' and 'threaded' in p99s and p99s['headless'] > args.max_p99_ratio * p99s['threaded']:
+            problems.append(f"press round trip p99 {p99s['headless'] * 1e3:.2f} ms is over {args.max_p99_ratio:g}x the threaded "
+                            f"{p99s['threaded'] * 1e3:.2f} ms")
+        for problem in problems:
+            print(f"  PROBLEM: {problem}")
+        failed = failed or bool(problems)
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
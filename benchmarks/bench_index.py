@@ -0,0 +1,80 @@
+# Query latency of the event-driven WindowIndex with 1,000 simulated windows,
+# compared with enumerating every window and reading its title on each query.
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from window_backend import SimulatedBackend
+from window_index import WindowIndex
+
+window_count = 1000
+call_latency = 5e-6  # Cost of one Win32 round trip
+queries = ['chrome', 'report q3', 'visual stu', 'note', 'slack general', 'zzz', 'term', 'excel budget']
+
+words = ['report', 'budget', 'notes', 'inbox', 'general', 'random', 'design', 'review', 'draft', 'q3',
+         'meeting', 'project', 'invoice', 'readme', 'main', 'build', 'server', 'logs', 'todo', 'photos']
+apps = [('chrome.exe', 'Chrome_WidgetWin_1', 'Google Chrome'), ('code.exe', 'Chrome_WidgetWin_1', 'Visual Studio Code'),
+        ('excel.exe', 'XLMAIN', 'Excel'), ('notepad.exe', 'Notepad', 'Notepad'),
+        ('slack.exe', 'Chrome_WidgetWin_1', 'Slack'), ('windowsterminal.exe', 'CASCADIA_HOSTING_WINDOW_CLASS', 'Terminal')]
+
+# Function doing what a query costs without an index
+def scan_query(backend, query):
+    query = query.lower()
+    return [hwnd for hwnd in backend.enum_windows() if query in backend.get_window_text(hwnd).lower()]
+
+def timed(fn, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        fn()
+    return (time.perf_counter() - start) / count
+
+def main():
+    rng = random.Random(7)
+    backend = SimulatedBackend(call_latency=call_latency)
+    for i in range(window_count):
+        process, class_name, app = rng.choice(apps)
+        pid = 2000 + apps.index((process, class_name, app)) * 10 + rng.randrange(3)
+        backend.process_names[pid] = process
+        title = f"{' '.join(rng.sample(words, 3))} - {app}"
+        backend.add_window((0, 0, 800, 600), title, pid=pid, class_name=class_name)
+
+    index = WindowIndex(backend, reconcile_interval=0)
+    start = time.perf_counter()
+    index.start()
+    print(f"initial reconcile of {window_count} windows: {(time.perf_counter() - start) * 1000:.1f} ms "
+          f"({call_latency * 1e6:.0f} us per backend call)")
+
+    for query in queries:
+        indexed = timed(lambda: index.search(query), 200)
+        scanned = timed(lambda: scan_query(backend, query), 5)
+        results = index.search(query, limit=3)
+        best = results[0].title if results else '-'
+        print(f"{query!r:16s} index {indexed * 1e6:8.1f} us   scan {scanned * 1e6:9.1f} us   best: {best}")
+
+    pid = next(iter(index.by_pid))
+    print(f"windows of one process: {timed(lambda: index.windows_of_pid(pid), 1000) * 1e6:.2f} us")
+
+    # Incremental updates from events
+    hwnds = list(backend.windows)
+    start = time.perf_counter()
+    for i in range(200):
+        backend.set_title(hwnds[i], f"renamed {i} - Notepad")
+    rename = (time.perf_counter() - start) / 200
+    start = time.perf_counter()
+    for i in range(200):
+        backend.remove_window(hwnds[i])
+    destroy = (time.perf_counter() - start) / 200
+    print(f"name change event: {rename * 1e6:.1f} us, destroy event: {destroy * 1e6:.1f} us, index size {len(index.windows)}")
+
+    # Events missed while the hook was down are recovered by the next reconcile
+    backend.event_callbacks.clear()
+    for i in range(50):
+        backend.add_window((0, 0, 400, 300), f"missed {i} - Notepad", pid=9999)
+    index.reconcile()
+    print(f"after reconcile: {len(index.windows)} windows, {len(index.windows_of_pid(9999))} recovered")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# Measures what the always-on instrumentation costs per hotkey action
+# by running the same key stream through raw and instrumented handlers,
+# with a free backend and with one that costs 10 us per call like a typical Win32 round trip.
+# Exits with status 1 if the overhead per action is over the budget.
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import togglewindows
+from overlay import NullOverlay
+from instrumentation import Instrumentation
+from window_backend import SimulatedBackend
+
+rounds = 20000
+combos = ['up', 'shift+left', 'ctrl+up', 'ctrl+shift+m']
+
+# Function to run every combo `count` times and return nanoseconds per call
+def time_callbacks(callbacks, count):
+    hwnd = togglewindows.backend.get_foreground_window()
+    start = time.perf_counter_ns()
+    for _ in range(count):
+        for combo in combos:
+            callbacks[combo](hwnd)
+            togglewindows.coalescer.flush()
+    return (time.perf_counter_ns() - start) / (count * len(combos))
+
+# Function to compare raw and instrumented handlers for one backend call latency
+def compare(call_latency, count):
+    results = {}
+    for label, enabled in (('raw', False), ('instrumented', True)):
+        togglewindows.instrumentation = Instrumentation(enabled=enabled)
+        togglewindows.set_backend(SimulatedBackend(window_count=100, call_latency=call_latency))
+        callbacks = togglewindows.instrumented_hotkeys()
+        time_callbacks(callbacks, count // 10)  # Warm up
+        results[label] = min(time_callbacks(callbacks, count) for _ in range(3))
+    overhead = results['instrumented'] - results['raw']
+    print(f"backend call latency {call_latency * 1e6:4.0f} us: raw {results['raw']:8.0f} ns, "
+          f"instrumented {results['instrumented']:8.0f} ns, overhead {overhead:6.0f} ns per action "
+          f"({100 * overhead / results['raw']:.0f}%)")
+    return overhead
+
+def main():
+    parser = argparse.ArgumentParser(description="Cost of the always-on instrumentation per hotkey action")
+    parser.add_argument('--budget-us', type=float, default=20.0, help="allowed overhead per action; a Win32 hotkey action takes milliseconds")
+    args = parser.parse_args()
+
+    togglewindows.overlay = NullOverlay()
+    overheads = [compare(10e-6, rounds // 10), compare(0.0, rounds)]
+
+    instrumentation = togglewindows.instrumentation
+    start = time.perf_counter_ns()
+    for _ in range(100):
+        instrumentation.snapshot_json()
+    print(f"snapshot as JSON:     {(time.perf_counter_ns() - start) / 100 / 1000:8.1f} us")
+    snapshot = instrumentation.snapshot()
+    for name, action in sorted(snapshot.items()):
+        latency = action['latency']
+        phases = ", ".join(f"{phase}={summary['mean_us']:.2f}" for phase, summary in action['phases'].items())
+        print(f"  {name:26s} calls={action['calls']:7d} p50<{latency['p50_us']}us p99<{latency['p99_us']}us "
+              f"update p99<{action['update']['p99_us']}us mean us: {phases}")
+
+    worst = max(overheads) / 1000
+    print(f"worst overhead {worst:.1f} us per action (budget {args.budget_us:.0f} us)")
+    if worst > args.budget_us:
+        print("OVER BUDGET")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# Saves and restores layouts of 100/300/1000 windows on the simulated backend.
+# Reports capture, save, mmap load and batched restore times, the file size next to the
+# same layout as JSON, and checks that every rect, topmost flag, opacity and the z-order came back.
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from layouts import capture_layout, load_layout, restore_layout, save_layout
+from monitors import MonitorTopology
+from window_backend import WS_EX_LAYERED, SimulatedBackend
+from window_index import WindowIndex
+from window_state import WindowStateCache
+
+monitors = [(1, (0, 0, 1920, 1080), (0, 0, 1920, 1040)), (2, (1920, 0, 4480, 1440), (1920, 0, 4480, 1400))]
+
+# Function to list what a user would see: z-order, rects, styles and the opacity of layered windows
+def state_of(backend):
+    windows = [backend.windows[hwnd] for hwnd in backend.z_order]
+    return [(window.hwnd, window.rect, window.ex_style, window.alpha if window.ex_style & WS_EX_LAYERED else 255) for window in windows]
+
+# Function to mess the windows up: move them, change opacity and topmost, shuffle the z-order
+def scramble(backend, rng):
+    for hwnd, window in backend.windows.items():
+        left, top, right, bottom = window.rect
+        dx, dy = rng.randint(-300, 300), rng.randint(-300, 300)
+        backend.drag_window(hwnd, (left + dx, top + dy, right + dx, bottom + dy))
+        window.ex_style = WS_EX_LAYERED if rng.random() < 0.3 else 0
+        window.alpha = rng.randint(50, 255)
+    rng.shuffle(backend.z_order)
+
+def run(count, path, rng):
+    raw = SimulatedBackend(window_count=count, monitors=monitors)
+    # Some windows start topmost or translucent so every saved field is exercised
+    for hwnd in list(raw.windows)[::7]:
+        raw.set_topmost(hwnd, True)
+    for hwnd in list(raw.windows)[::5]:
+        raw.windows[hwnd].ex_style |= WS_EX_LAYERED
+        raw.windows[hwnd].alpha = 180
+    backend = WindowStateCache(raw)
+    raw.watch_window_events(backend.on_event)
+    index = WindowIndex(backend, reconcile_interval=0)
+    index.start()
+    topology = MonitorTopology(backend)
+    expected = state_of(raw)
+
+    start = time.perf_counter()
+    layout = capture_layout(backend, index, topology)
+    captured = time.perf_counter() - start
+    start = time.perf_counter()
+    save_layout(layout, path)
+    saved = time.perf_counter() - start
+    json_size = len(json.dumps([
+        {'rect': r.rect, 'alpha': r.alpha, 'topmost': r.topmost, 'layered': r.layered, 'monitor': r.monitor,
+         'process': r.process, 'class': r.class_name, 'title': r.title}
+        for r in layout.records
+    ]))
+
+    scramble(raw, rng)
+    backend.invalidate()
+    raw.calls.clear()
+    raw.repaints = 0
+    start = time.perf_counter()
+    loaded = load_layout(path)
+    load_time = time.perf_counter() - start
+    start = time.perf_counter()
+    restored = restore_layout(loaded, backend, index, topology)
+    restore_time = time.perf_counter() - start
+
+    ok = state_of(raw) == expected
+    print(f"{count:5d} windows: capture {captured * 1000:6.1f} ms, save {saved * 1000:5.1f} ms, "
+          f"load {load_time * 1000:5.1f} ms, restore {restore_time * 1000:6.1f} ms ({restored} windows, {raw.repaints} repaint), "
+          f"file {os.path.getsize(path) / 1024:6.1f} KiB vs JSON {json_size / 1024:6.1f} KiB, {'exact' if ok else 'MISMATCH'}")
+    return ok
+
+def main():
+    rng = random.Random(1)
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'layout.wcl')
+        results = [run(count, path, rng) for count in (100, 300, 1000)]
+    if not all(results):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
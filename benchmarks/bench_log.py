@@ -0,0 +1,118 @@
+# Stress test for the daemon -> GUI log pipeline: a child process writes JSON log events
+# (plus raw lines on stderr, like tracebacks) as fast as --rate allows, into one merged pipe.
+# The parent reads it with LogReader and drains it every --drain-ms the way the GUI's after()
+# loop does. It checks that the child never blocks on the pipe, that it reaches the target rate
+# (a producer that falls short did not test the rate asked for), and that memory stays flat.
+import argparse
+import os
+import subprocess
+import sys
+import time
+from collections import deque
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from event_log import EventLog, LogReader
+
+# Function to read the resident set size in MB, or None where /proc is not available
+def rss_mb():
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        return None
+
+# Function run in the child: write `rate` events per second for `seconds`
+def produce(rate, seconds):
+    log = EventLog(json_lines=True)
+    batch = max(1, rate // 1000)  # Events per millisecond
+    start = time.perf_counter()
+    sent = 0
+    while True:
+        elapsed = time.perf_counter() - start
+        if elapsed >= seconds:
+            break
+        due = int(elapsed * rate)
+        if sent >= due:
+            time.sleep(0.0005)
+            continue
+        for _ in range(min(batch, due - sent)):
+            log.write('info', f"event {sent}", source='bench', hwnd=sent & 0xFFFF, x=sent % 1920, y=sent % 1080)
+            sent += 1
+            if sent % 10000 == 0:
+                sys.stderr.write(f"Traceback-like line on stderr after {sent} events\n")
+    log.write('info', f"done {sent} {time.perf_counter() - start:.3f}", source='bench')
+
+def consume(rate, seconds, drain_ms, capacity, history_size):
+    child = subprocess.Popen(
+        [sys.executable, __file__, '--produce', '--rate', str(rate), '--seconds', str(seconds)],
+        stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, errors='replace'
+    )
+    reader = LogReader(child.stdout, capacity=capacity)
+    reader.start()
+    history = deque(maxlen=history_size)
+    delivered = 0
+    stderr_lines = 0
+    last = None
+    samples = []  # (seconds since start, rss MB, buffered lines)
+    start = time.perf_counter()
+    deadline = start + seconds * 5 + 10
+    while reader.is_alive() or reader.stats()['buffered']:
+        if time.perf_counter() > deadline:
+            child.kill()
+            print("DEADLOCK: the producer did not finish in time")
+            return False
+        time.sleep(drain_ms / 1000)
+        buffered = reader.stats()['buffered']
+        events = reader.drain(history_size)
+        history.extend(events)
+        delivered += len(events)
+        stderr_lines += sum(1 for event in events if event['source'] == 'output')
+        if events:
+            last = events[-1]
+        samples.append((time.perf_counter() - start, rss_mb(), buffered))
+    child.wait()
+    reader.stream.close()
+
+    stats = reader.stats()
+    done = last['message'].split() if last else []
+    sent, produce_seconds = (int(done[1]), float(done[2])) if len(done) == 3 and done[0] == 'done' else (None, None)
+    print(f"target {rate} events/s for {seconds:.0f} s, drained every {drain_ms} ms into a {capacity}-line buffer")
+    if sent is not None:
+        print(f"  producer wrote {sent} events at {sent / produce_seconds:,.0f} events/s ({produce_seconds:.2f} s)")
+    print(f"  reader received {stats['received']} lines, dropped {stats['dropped']}, delivered {delivered} to the consumer ({stderr_lines} from stderr)")
+    print(f"  buffer peak {max(sample[2] for sample in samples)} lines")
+
+    ok = sent is not None and stats['received'] == sent + 1 + sent // 10000
+    if not ok:
+        print("  FAILED: lines were lost before reaching the buffer")
+    if sent is not None and sent < rate * seconds * 0.95:
+        print(f"  FAILED: the producer reached {sent / produce_seconds:,.0f} of the {rate:,} events/s target")
+        ok = False
+    memory = [(at, mb) for at, mb, _ in samples if mb is not None]
+    if memory:
+        warm = [mb for at, mb in memory if at >= seconds / 4]
+        growth = max(warm) - warm[0] if warm else 0.0
+        print(f"  RSS {memory[0][1]:.1f} MB at start, {warm[0] if warm else memory[-1][1]:.1f} MB after warm-up, peak {max(mb for _, mb in memory):.1f} MB (growth after warm-up {growth:.1f} MB)")
+        if growth > 20:
+            print("  FAILED: memory kept growing")
+            ok = False
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description="Log pipeline stress test")
+    parser.add_argument('--rate', type=int, default=100000)
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--drain-ms', type=int, default=100)
+    parser.add_argument('--capacity', type=int, default=5000)
+    parser.add_argument('--history', type=int, default=2000)
+    parser.add_argument('--produce', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.produce:
+        produce(args.rate, args.seconds)
+        return
+    if not consume(args.rate, args.seconds, args.drain_ms, args.capacity, args.history):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# Records a macro through the real hotkey handlers in togglewindows.py on the simulated backend,
+# then replays it two ways on fresh windows: step by step through the handlers, and compiled to its
+# net effect (one deferred batch for rects and topmost, one opacity write). Reports time, backend
+# writes and repaints for both and checks that they leave the windows in the same state.
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import togglewindows
+from macros import MacroStore
+from overlay import NullOverlay
+from window_backend import WS_EX_LAYERED, WS_EX_TOPMOST, SimulatedBackend
+
+monitors = [(1, (0, 0, 1920, 1080), (0, 0, 1920, 1040)), (2, (1920, 0, 4480, 1440), (1920, 0, 4480, 1400))]
+write_calls = ('set_window_pos', 'set_topmost', 'set_insert_after', 'set_ex_style', 'set_layered_alpha', 'begin_defer_window_pos')
+macro_keys = (
+    'up', 'down', 'left', 'right', 'shift+left', 'shift+right', 'shift+up', 'shift+down',
+    'ctrl+up', 'ctrl+down', 'ctrl+left', 'ctrl+right', 'ctrl+shift+m', 'ctrl+alt+shift+m',
+)
+
+# Function to build a macro script: runs of held keys, like a user nudging a window into place
+def build_script(steps, seed=1):
+    rng = random.Random(seed)
+    script = []
+    while len(script) < steps:
+        script.extend([rng.choice(macro_keys)] * rng.randint(1, 6))
+    return script[:steps]
+
+def press(backend, hwnd, combo):
+    backend.foreground = hwnd
+    togglewindows.hotkeys[combo](hwnd)
+    togglewindows.coalescer.flush()  # Include the window write that the flush thread would do
+
+def writes(backend):
+    return sum(backend.calls[name] for name in write_calls)
+
+def state_of(backend, hwnd):
+    window = backend.windows[hwnd]
+    return window.rect, window.alpha if window.ex_style & WS_EX_LAYERED else 255, bool(window.ex_style & WS_EX_TOPMOST)
+
+def main():
+    parser = argparse.ArgumentParser(description="Macro recording and compiled replay")
+    parser.add_argument('--steps', type=int, default=60)
+    parser.add_argument('--windows', type=int, default=200, help="windows the macro is replayed on")
+    args = parser.parse_args()
+
+    backend = SimulatedBackend(monitors=monitors)
+    start_rect = (200, 150, 1000, 750)
+    recorded = backend.add_window(start_rect, "Recorded", pid=1)
+    stepwise = [backend.add_window(start_rect, f"Stepwise {i}", pid=2) for i in range(args.windows)]
+    compiled = [backend.add_window(start_rect, f"Compiled {i}", pid=3) for i in range(args.windows)]
+    togglewindows.overlay = NullOverlay()
+    togglewindows.set_backend(backend)
+    togglewindows.macro_store = MacroStore(os.path.join(tempfile.mkdtemp(), 'macros.json'))
+
+    script = build_script(args.steps)
+    togglewindows.start_macro(recorded)
+    for combo in script:
+        press(backend, recorded, combo)
+    macro = togglewindows.macro_store.get(togglewindows.stop_macro('bench'))
+    program = ", ".join(f"{op[0]} {op[1]}" for op in macro.compiled.program)
+    print(f"recorded {len(macro.steps)} steps, compiled to [{program}], alpha {macro.compiled.alpha}, topmost {macro.compiled.topmost}")
+
+    calls, repaints = writes(backend), backend.repaints
+    start = time.perf_counter()
+    for hwnd in stepwise:
+        for combo in script:
+            press(backend, hwnd, combo)
+    stepwise_time = time.perf_counter() - start
+    stepwise_writes, stepwise_repaints = writes(backend) - calls, backend.repaints - repaints
+
+    calls, repaints = writes(backend), backend.repaints
+    start = time.perf_counter()
+    togglewindows.play_macro('bench', compiled)
+    compiled_time = time.perf_counter() - start
+    compiled_writes, compiled_repaints = writes(backend) - calls, backend.repaints - repaints
+
+    print(f"step by step: {stepwise_time * 1000:8.2f} ms, {stepwise_writes:6d} writes, {stepwise_repaints:6d} repaints for {args.windows} windows")
+    print(f"compiled:     {compiled_time * 1000:8.2f} ms, {compiled_writes:6d} writes, {compiled_repaints:6d} repaints for {args.windows} windows")
+    expected = state_of(backend, recorded)
+    mismatches = sum(1 for hwnd in stepwise + compiled if state_of(backend, hwnd) != expected)
+    print("final state: " + ("identical" if not mismatches else f"{mismatches} windows differ"))
+    if mismatches:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
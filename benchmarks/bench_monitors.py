@@ -0,0 +1,73 @@
+# Compares per-keypress monitor lookup on a simulated 6-monitor rig:
+# enumerate + linear scan on every press versus the cached MonitorTopology.
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from monitors import MonitorTopology, map_rect
+from window_backend import SimulatedBackend
+
+lookups = 50000
+
+# Two rows of three monitors with mixed resolutions and DPI
+six_monitors = [
+    (11, (0, 0, 2560, 1440), (0, 0, 2560, 1400)),
+    (12, (2560, 0, 6400, 2160), (2560, 0, 6400, 2120)),
+    (13, (6400, 0, 8320, 1080), (6400, 0, 8320, 1040)),
+    (21, (0, 1440, 1920, 2520), (0, 1440, 1920, 2480)),
+    (22, (1920, 2160, 4480, 3600), (1920, 2160, 4480, 3560)),
+    (23, (4480, 2160, 8320, 4320), (4480, 2160, 8320, 4280)),
+]
+six_dpis = {12: 144, 23: 192}
+
+# Function doing what the old hotkey did on every press
+def scan_next_monitor(backend, hwnd):
+    current = backend.monitor_from_window(hwnd)
+    found = backend.enum_monitors()
+    for i, monitor in enumerate(found):
+        if monitor[0] == current:
+            return found[(i + 1) % len(found)]
+
+def main():
+    backend = SimulatedBackend(monitors=six_monitors, monitor_dpis=six_dpis, call_latency=5e-6)
+    rng = random.Random(1)
+    hwnds = []
+    for _ in range(200):
+        x, y = rng.randrange(0, 8000), rng.randrange(0, 4000)
+        hwnds.append(backend.add_window((x, y, x + 300, y + 200)))
+
+    topology = MonitorTopology(backend)
+    backend.watch_display_changes(topology.invalidate)
+
+    start = time.perf_counter()
+    for i in range(lookups):
+        scan_next_monitor(backend, hwnds[i % len(hwnds)])
+    scan = (time.perf_counter() - start) / lookups
+
+    rects = [backend.windows[hwnd].rect for hwnd in hwnds]
+    start = time.perf_counter()
+    for i in range(lookups):
+        topology.next_monitor(topology.monitor_from_rect(rects[i % len(rects)]))
+    cached = (time.perf_counter() - start) / lookups
+
+    print(f"enumerate + scan per press (5 us/call backend): {scan * 1e6:7.2f} us")
+    print(f"cached topology lookup per press:               {cached * 1e6:7.2f} us")
+    print(f"topology rebuilds so far: {topology.rebuilds}")
+
+    # Moving across monitors keeps the relative position and size
+    source = topology.monitors[0]
+    target = topology.next_monitor(source)
+    rect = (640, 350, 1920, 1050)
+    print(f"{rect} on {source.work} -> {map_rect(rect, source, target)} on {target.work} (dpi {source.dpi} -> {target.dpi})")
+
+    # A display change invalidates the cache; the next lookup rebuilds once
+    backend.set_monitors(six_monitors[:3])
+    topology.monitor_from_point(100, 100)
+    topology.monitor_from_point(3000, 100)
+    print(f"after unplugging 3 monitors: {len(topology.monitors)} monitors, rebuilds {topology.rebuilds}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# Measures how long the always-on-top hotkey callbacks take, end to end through the instrumented
+# handlers in togglewindows.py on the simulated backend, while other toasts are on screen.
+# The budget is 1 ms per callback; exits with status 1 if p99 goes over it.
+# Without a display the Tk part is skipped (and reported); the callbacks are then timed with an
+# overlay that queues messages the same way but never draws them.
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import togglewindows
+from instrumentation import overlay_phases
+from overlay import OverlayService
+from window_backend import SimulatedBackend
+
+budget_ms = 1.0
+callbacks = 2000
+
+# OverlayService that only queues messages, for machines where Tk cannot open a display
+class QueueOnlyOverlay(OverlayService):
+    def start(self):
+        pass
+
+# Function to start a real overlay with a few toasts on screen; returns it, or None if Tk is not available
+def start_overlay():
+    overlay = OverlayService(duration_ms=500)
+    overlay.start()
+    for i in range(overlay.max_toasts):
+        overlay.show(100, 100, f"Window {i}\nAlways on top turned on", key=i)
+    # Wait until the Tk thread has drawn them
+    deadline = time.monotonic() + 5
+    while overlay.shown < overlay.max_toasts and time.monotonic() < deadline:
+        if overlay._failed:
+            return None
+        time.sleep(0.01)
+    return overlay
+
+def main():
+    backend = SimulatedBackend(window_count=20)
+    togglewindows.set_backend(backend)
+    overlay = start_overlay()
+    if overlay is None:
+        print("SKIPPED: Tk cannot open a display here, so no toasts are drawn; timing the callbacks with a queue-only overlay")
+        overlay = QueueOnlyOverlay()
+    togglewindows.overlay = togglewindows.instrumentation.instrument_calls(overlay, overlay_phases)
+    hotkeys = togglewindows.instrumented_hotkeys()
+    hwnds = list(backend.windows)
+
+    samples = []
+    for i in range(callbacks):
+        backend.foreground = hwnds[i % 8]
+        callback = hotkeys['ctrl+right' if i % 2 else 'ctrl+left']
+        start = time.perf_counter()
+        callback(backend.foreground)
+        samples.append((time.perf_counter() - start) * 1000)
+        if i % 100 == 0:
+            time.sleep(0.02)  # Let toasts be replaced and stacked while we measure
+    if overlay._thread:
+        overlay.stop()
+
+    samples.sort()
+    p50 = samples[len(samples) // 2]
+    p99 = samples[int(len(samples) * 0.99)]
+    print(f"toasts shown={overlay.shown} toast windows created={overlay.created}")
+    print(f"set/remove_always_on_top callback latency p50={p50:.4f} ms p99={p99:.4f} ms max={samples[-1]:.4f} ms (budget {budget_ms} ms)")
+    if p99 > budget_ms:
+        print("FAIL: hotkey callback latency over budget")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# Measures what matching new windows against window rules costs as the rule count grows.
+# Every window is matched through the RuleIndex and through a plain linear scan of the rules (which
+# must agree), then windows are created on the simulated backend so the RuleEngine applies rules
+# when they are shown, and the cost of each new window is reported.
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from monitors import MonitorTopology
+from rules import Rule, RuleEngine, RuleIndex
+from window_backend import SimulatedBackend
+from window_index import WindowIndex, WindowInfo
+
+monitors = [(1, (0, 0, 1920, 1080), (0, 0, 1920, 1040)), (2, (1920, 0, 4480, 1440), (1920, 0, 4480, 1400))]
+words = ('editor', 'terminal', 'chat', 'mail', 'player', 'notes', 'browser', 'viewer', 'studio', 'manager', 'sheet', 'paint')
+
+# Function to make a rule set: mostly per-app rules, some per-class and some title-only ones
+def build_rules(count, rng):
+    rules = []
+    for order in range(count):
+        entry = {'name': f"rule {order}"}
+        kind = rng.random()
+        if kind < 0.7:
+            entry['process'] = f"app{rng.randrange(count)}.exe"
+            if rng.random() < 0.3:
+                entry['title'] = rng.choice(words) + r'\s+\d+'
+        elif kind < 0.85:
+            entry['class'] = f"Class{rng.randrange(count)}"
+        else:
+            entry['title'] = f"^{rng.choice(words)} {rng.randrange(count)}$"
+        action = rng.random()
+        if action < 0.4:
+            entry['rect'] = [rng.randrange(0, 800), rng.randrange(0, 400), rng.randrange(900, 1800), rng.randrange(500, 1000)]
+            entry['monitor'] = rng.randrange(2)
+        elif action < 0.6:
+            entry['monitor'] = rng.randrange(2)
+        elif action < 0.8:
+            entry['opacity'] = rng.randrange(80, 256)
+        else:
+            entry['topmost'] = True
+        rules.append(Rule(order, entry))
+    return rules
+
+# Function to make new windows: process, class and title drawn from a wider pool than the rules use
+def build_windows(count, rule_count, rng):
+    windows = []
+    for i in range(count):
+        spread = rule_count * 2
+        windows.append((
+            f"app{rng.randrange(spread)}.exe", f"Class{rng.randrange(spread)}",
+            f"{rng.choice(words)} {rng.randrange(spread)}",
+        ))
+    return windows
+
+def linear_match(rules, info):
+    for rule in rules:
+        if rule.matches(info):
+            return rule
+    return None
+
+def run(rule_count, window_count, seed):
+    rng = random.Random(seed)
+    rules = build_rules(rule_count, rng)
+    windows = build_windows(window_count, rule_count, rng)
+    infos = [WindowInfo(0x10000 + 4 * i, title, class_name, 1, process) for i, (process, class_name, title) in enumerate(windows)]
+
+    start = time.perf_counter()
+    index = RuleIndex(rules)
+    build_time = time.perf_counter() - start
+    start = time.perf_counter()
+    indexed = [index.match(info) for info in infos]
+    index_time = time.perf_counter() - start
+    start = time.perf_counter()
+    linear = [linear_match(rules, info) for info in infos]
+    linear_time = time.perf_counter() - start
+    agree = indexed == linear
+
+    backend = SimulatedBackend(monitors=monitors)
+    window_index = WindowIndex(backend, reconcile_interval=0)
+    window_index.start()
+    topology = MonitorTopology(backend)
+    engine = RuleEngine(backend, window_index, topology, rules)
+    backend.watch_window_events(engine.on_event)
+    for i, (process, class_name, title) in enumerate(windows):
+        backend.process_names[5000 + i] = process
+    start = time.perf_counter()
+    for i, (process, class_name, title) in enumerate(windows):
+        backend.add_window((100, 100, 900, 700), title, pid=5000 + i, class_name=class_name)
+    create_time = time.perf_counter() - start
+    stats = engine.stats()
+
+    print(
+        f"{rule_count:5d} rules: index built in {build_time * 1000:6.2f} ms, match {index_time / window_count * 1e6:6.2f} us/window "
+        f"vs linear {linear_time / window_count * 1e6:7.2f} us, {sum(rule is not None for rule in indexed):4d} matched, "
+        f"{'agree' if agree else 'DISAGREE'}; create+show with rules {create_time / window_count * 1e6:6.1f} us/window "
+        f"({stats['applied']} applied, engine mean {stats['mean_match_us']:.2f} us)"
+    )
+    return agree
+
+def main():
+    parser = argparse.ArgumentParser(description="Window rule matching cost per new window")
+    parser.add_argument('--windows', type=int, default=2000)
+    parser.add_argument('--rules', type=int, nargs='+', default=[10, 100, 300, 1000])
+    args = parser.parse_args()
+    ok = True
+    for count in args.rules:
+        ok = run(count, args.windows, seed=count) and ok
+    if not ok:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+# Hammers settings.json from several sides at once: writer threads push bursts of changes through one
+# ConfigStore (like the GUI while a color is dragged or the pixel buttons are held), while reader
+# processes poll it with their own ConfigStore (like the daemon) and also parse the raw file.
+# Checks that no reader ever sees a missing, half-written or mixed file or falls back to the
+# default move_pixels, that generations only go up, and that every reader ends on the last write.
+# Reports how many writes the bursts were coalesced into.
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config_store import ConfigStore, default_move_pixels
+
+# Function to poll settings.json until the writers are done; puts a summary on the queue
+def reader(path, done, results):
+    config = ConfigStore(path, poll_interval=0, move_pixels_file=path + '.missing')
+    problems = []
+    polls = 0
+    raw_reads = 0
+    last_generation = config.generation
+    while not done.is_set():
+        config.reload()
+        polls += 1
+        if config.generation < last_generation:
+            problems.append(f"generation went back from {last_generation} to {config.generation}")
+        last_generation = config.generation
+        if config.get('move_pixels') == default_move_pixels:
+            problems.append("fell back to the default move_pixels")
+        if config.get('pair_a') != config.get('pair_b'):
+            problems.append(f"mixed values {config.get('pair_a')} / {config.get('pair_b')}")
+        if polls % 10 == 0:
+            try:
+                with open(path, 'r') as f:
+                    data = json.load(f)
+                raw_reads += 1
+                if data.get('pair_a') != data.get('pair_b'):
+                    problems.append("raw read saw mixed values")
+            except FileNotFoundError:
+                problems.append("settings.json was missing")
+            except ValueError:
+                problems.append("raw read saw a half-written file")
+            except PermissionError:
+                pass  # Windows, mid-replace
+    config.reload()
+    results.put({
+        'polls': polls, 'raw_reads': raw_reads, 'problems': problems[:20], 'problem_count': len(problems),
+        'generation': config.generation, 'move_pixels': config.get('move_pixels'), 'pair_a': config.get('pair_a'),
+        'stats': config.stats(),
+    })
+
+# Function to push bursts of changes; the pair is always saved together, move_pixels on its own
+def writer(config, seconds, seed, counter, lock):
+    rng = random.Random(seed)
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        for _ in range(rng.randint(1, 50)):
+            with lock:
+                counter[0] += 1
+                value = counter[0]
+            config.save_settings({'pair_a': value, 'pair_b': value})
+            config.set_move_pixels(100 + value % 500)
+        time.sleep(rng.uniform(0, config.debounce * 2))
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent settings.json readers and writers")
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--writers', type=int, default=2, help="writer threads sharing one ConfigStore")
+    parser.add_argument('--readers', type=int, default=3, help="reader processes")
+    parser.add_argument('--debounce', type=float, default=0.05)
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp()
+    path = os.path.join(folder, 'settings.json')
+    config = ConfigStore(path, debounce=args.debounce, move_pixels_file=path + '.missing')
+    config.save_settings({'pair_a': 0, 'pair_b': 0})
+    config.set_move_pixels(100)
+    config.flush()
+
+    done = multiprocessing.Event()
+    results = multiprocessing.Queue()
+    readers = [multiprocessing.Process(target=reader, args=(path, done, results)) for _ in range(args.readers)]
+    for process in readers:
+        process.start()
+
+    counter = [0]
+    lock = threading.Lock()
+    threads = [threading.Thread(target=writer, args=(config, args.seconds, seed, counter, lock)) for seed in range(args.writers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    config.flush()
+    elapsed = time.perf_counter() - start
+    time.sleep(0.05)
+    done.set()
+    summaries = [results.get() for _ in readers]
+    for process in readers:
+        process.join()
+
+    stats = config.stats()
+    print(f"writers: {stats['changes']} changes in {elapsed:.1f} s written as {stats['writes']} files "
+          f"({stats['changes'] / max(1, stats['writes']):.0f} changes per write, debounce {args.debounce * 1000:.0f} ms)")
+    failed = False
+    for i, summary in enumerate(summaries):
+        reader_stats = summary['stats']
+        print(f"reader {i}: {summary['polls']} polls, {reader_stats['parses']} parses, {reader_stats['skipped_parses']} skipped by generation, "
+              f"{summary['raw_reads']} raw reads, ended on generation {summary['generation']}")
+        for problem in summary['problems']:
+            print(f"  PROBLEM: {problem}")
+        if summary['problem_count']:
+            failed = True
+        if (summary['generation'], summary['pair_a'], summary['move_pixels']) != (config.generation, config.get('pair_a'), config.get('move_pixels')):
+            print(f"  PROBLEM: ended on generation {summary['generation']}, writer is on {config.generation}")
+            failed = True
+    print("result: " + ("FAILED" if failed else "no torn, missing or mixed reads"))
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
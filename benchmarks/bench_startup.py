@@ -0,0 +1,70 @@
+# Measures time-to-hotkeys-ready of the daemon: from spawning the process to the
+# "Hotkey listener started." line, with the simulated backend and simulated hotkeys so it
+# runs on Linux CI. Exits with status 1 if the median is over the budget.
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root)
+
+from control_channel import ControlClient
+
+ready_line = "Hotkey listener started."
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+# Function to start the daemon once; returns seconds until hotkeys were ready and the startup profile
+def start_once():
+    port = free_port()
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, '-u', 'togglewindows.py', '--simulated', '--control-port', str(port), '--profile-startup'],
+        cwd=root, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True
+    )
+    profile = []
+    try:
+        for line in process.stdout:
+            if line.strip() == ready_line:
+                elapsed = time.perf_counter() - start
+                break
+            profile.append(line.rstrip())
+        else:
+            raise RuntimeError("daemon exited before hotkeys were ready:\n" + "\n".join(profile))
+        client = ControlClient(port, timeout=5.0)
+        client.request('shutdown')
+        client.close()
+        process.wait(timeout=10)
+    finally:
+        if process.poll() is None:
+            process.kill()
+        process.stdout.close()
+    return elapsed, profile
+
+def main():
+    parser = argparse.ArgumentParser(description="Daemon time-to-hotkeys-ready")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=500.0)
+    args = parser.parse_args()
+
+    times = []
+    for _ in range(args.runs):
+        elapsed, profile = start_once()
+        times.append(elapsed)
+    median = statistics.median(times)
+    print("\n".join(profile))
+    print(f"time to hotkeys ready over {args.runs} runs: median {median * 1000:.0f} ms, "
+          f"min {min(times) * 1000:.0f} ms, max {max(times) * 1000:.0f} ms (budget {args.budget_ms:.0f} ms)")
+    if median * 1000 > args.budget_ms:
+        print("over budget")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# Counts backend (Win32) calls per hotkey action with the window state cache disabled (ttl 0)
+# and enabled, replaying held keys at the keyboard repeat rate on a simulated clock.
+# Now and then a window is dragged by "the user" so cache invalidation is exercised too.
+import argparse
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import togglewindows
+from overlay import NullOverlay
+from window_backend import SimulatedBackend
+from window_state import default_ttl
+
+combos = ['up', 'down', 'left', 'right', 'shift+right', 'shift+down', 'ctrl+up', 'ctrl+down', 'ctrl+right', 'ctrl+left']
+
+# Simulated clock advanced by the benchmark
+class SimulatedClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def build_stream(events, windows, seed=1):
+    rng = random.Random(seed)
+    stream = []
+    while len(stream) < events:
+        focus = rng.randrange(windows)
+        combo = rng.choice(combos)
+        stream.extend((focus, combo) for _ in range(rng.randint(1, 30)))
+    return stream[:events]
+
+def run(stream, ttl, repeat_rate, drag_every):
+    backend = SimulatedBackend(window_count=20)
+    togglewindows.overlay = NullOverlay()
+    togglewindows.set_backend(backend)
+    cache = togglewindows.window_state
+    cache.ttl = ttl
+    cache.clock = clock = SimulatedClock()
+    hwnds = list(backend.windows)
+    backend.calls.clear()
+    per_combo = {}
+    for i, (focus, combo) in enumerate(stream):
+        clock.now += 1.0 / repeat_rate
+        if drag_every and i % drag_every == 0:
+            left, top, right, bottom = backend.windows[hwnds[focus]].rect
+            backend.drag_window(hwnds[focus], (left + 5, top + 5, right + 5, bottom + 5))
+        backend.foreground = hwnds[focus]
+        before = sum(backend.calls.values())
+        togglewindows.hotkeys[combo](hwnds[focus])
+        togglewindows.coalescer.flush()
+        per_combo.setdefault(combo, []).append(sum(backend.calls.values()) - before)
+    return per_combo, cache.stats(), backend.calls
+
+def main():
+    parser = argparse.ArgumentParser(description="Win32 calls per action with and without the window state cache")
+    parser.add_argument('--events', type=int, default=20000)
+    parser.add_argument('--repeat-rate', type=float, default=30.0, help="key repeats per second")
+    parser.add_argument('--drag-every', type=int, default=200, help="drag the focused window every N presses (0 to never)")
+    args = parser.parse_args()
+
+    stream = build_stream(args.events, 20)
+    uncached, _, uncached_calls = run(stream, 0, args.repeat_rate, args.drag_every)
+    cached, stats, cached_calls = run(stream, default_ttl, args.repeat_rate, args.drag_every)
+    print(f"{'action':12s} {'uncached':>9s} {'cached':>7s}  (backend calls per press)")
+    for combo in combos:
+        before = sum(uncached[combo]) / len(uncached[combo])
+        after = sum(cached[combo]) / len(cached[combo])
+        print(f"{combo:12s} {before:9.2f} {after:7.2f}")
+    total_before = sum(map(sum, uncached.values())) / len(stream)
+    total_after = sum(map(sum, cached.values())) / len(stream)
+    print(f"{'all':12s} {total_before:9.2f} {total_after:7.2f}  ({1 - total_after / total_before:.0%} fewer calls)")
+    print("cache:", stats)
+    print("reads saved:", {name: uncached_calls[name] - cached_calls[name] for name in ('get_window_rect', 'get_ex_style', 'get_layered_alpha')})
+
+if __name__ == "__main__":
+    main()
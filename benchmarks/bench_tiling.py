@@ -0,0 +1,64 @@
+# Times tiled layout computation for 500 windows across 6 monitors of mixed DPI.
+# Pure computation: no window backend or display is needed, only NumPy.
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Six monitors in a 3x2 wall, with a taskbar cut out of each work area
+work_areas = [
+    (0, 0, 1920, 1040), (1920, 0, 4480, 1400), (4480, 0, 6400, 1040),
+    (0, 1080, 1920, 2120), (1920, 1440, 4480, 2840), (4480, 1080, 6400, 2120),
+]
+dpis = [96, 144, 96, 120, 144, 96]
+
+def best_time(function, rounds=200):
+    best = float('inf')
+    for _ in range(rounds):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+# Function to check rects stay inside their work area and do not overlap within a monitor
+def check(rects, monitor):
+    for m, (left, top, right, bottom) in enumerate(work_areas):
+        mine = rects[monitor == m]
+        if len(mine) and (mine[:, 0].min() < left or mine[:, 1].min() < top or mine[:, 2].max() > right or mine[:, 3].max() > bottom):
+            return False
+        if (mine[:, 2] <= mine[:, 0]).any() or (mine[:, 3] <= mine[:, 1]).any():
+            return False
+        for i in range(len(mine)):
+            others = mine[i + 1:]
+            overlap = (others[:, 0] < mine[i, 2]) & (others[:, 2] > mine[i, 0]) & (others[:, 1] < mine[i, 3]) & (others[:, 3] > mine[i, 1])
+            if overlap.any():
+                return False
+    return True
+
+def main():
+    if np is None:
+        print("NumPy is not installed; skipping the tiling benchmark")
+        return
+    from tiling import tile_layouts, tile_rects
+
+    count = 500
+    monitor = np.random.default_rng(1).integers(0, len(work_areas), count)
+    print(f"{count} windows on {len(work_areas)} monitors")
+    ok = True
+    for layout in tile_layouts:
+        rects = tile_rects(layout, monitor, work_areas, dpis)
+        valid = check(rects, monitor)
+        ok = ok and valid
+        elapsed = best_time(lambda: tile_rects(layout, monitor, work_areas, dpis))
+        print(f"{layout:14s} {elapsed * 1e6:8.1f} us  {'ok' if valid else 'OVERLAP OR OUT OF BOUNDS'}")
+    if not ok:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
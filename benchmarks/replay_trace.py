@@ -0,0 +1,215 @@
+# Replays a session trace recorded with `togglewindows.py --trace PATH` through the hotkey handlers
+# in togglewindows.py against the simulated backend, at recorded speed or as fast as possible.
+# Reports throughput, per-action latency and backend calls per press next to what the trace
+# recorded, and compares them with a stored baseline (exit status 1 on a regression).
+# With --synthesize N a trace of N random presses is recorded first, so this runs without a Windows session.
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import togglewindows
+from macros import MacroStore
+from overlay import NullOverlay
+from session_trace import TraceRecorder, load_trace
+from window_backend import SimulatedBackend
+
+default_window = (100, 100, 900, 700)  # Rect for windows created during the trace; the trace does not say where they opened
+replayed_events = ('create', 'destroy', 'foreground')
+min_samples = 50  # Actions pressed fewer times than this are not compared with the baseline
+min_slowdown_us = 10  # Smaller p50 changes are timer noise at this scale
+uncounted_calls = ('begin_defer_window_pos',)  # A trace records a deferred batch as one call, its commit
+
+# Function to keep the replay from writing layout.wcl/macros.json into the working directory
+def isolate_files():
+    folder = tempfile.mkdtemp()
+    togglewindows.config.update({'layout_file': os.path.join(folder, 'layout.wcl'), 'animate': False})
+    togglewindows.macro_store = MacroStore(os.path.join(folder, 'macros.json'))
+
+# Function to record a trace of random key runs on a simulated desktop
+def synthesize(path, presses, seed=1):
+    rng = random.Random(seed)
+    backend = SimulatedBackend(
+        window_count=200,
+        monitors=[(1, (0, 0, 1920, 1080), (0, 0, 1920, 1040)), (2, (1920, 0, 4480, 1440), (1920, 0, 4480, 1400))],
+    )
+    togglewindows.overlay = NullOverlay()
+    togglewindows.tracer = TraceRecorder(path)
+    togglewindows.set_backend(backend)
+    togglewindows.tracer.snapshot(togglewindows.backend, togglewindows.window_index, togglewindows.monitors)
+    skipped = (togglewindows.save_current_layout, togglewindows.restore_saved_layout, togglewindows.toggle_macro_recording)
+    combos = [
+        combo for combo, callback in togglewindows.hotkeys.items()
+        if callback not in skipped and not callback.__name__.startswith('play_macro_')
+    ]
+    hwnds = list(backend.windows)
+    pressed = 0
+    while pressed < presses:
+        backend.foreground = rng.choice(hwnds)
+        combo = rng.choice(combos)
+        for _ in range(min(rng.randint(1, 30), presses - pressed)):
+            togglewindows.tracer.hotkey(combo, backend.foreground)
+            togglewindows.hotkeys[combo](backend.foreground)
+            togglewindows.coalescer.flush()
+            pressed += 1
+    togglewindows.tracer.close()
+    togglewindows.tracer = None
+
+# Function to rebuild the traced desktop on the simulated backend; returns it and a map of traced to simulated hwnds
+def build_backend(trace, call_latency):
+    monitors = [(i + 1, rect, work) for i, (rect, work, dpi) in enumerate(trace.monitors)] or None
+    dpis = {i + 1: dpi for i, (rect, work, dpi) in enumerate(trace.monitors)}
+    backend = SimulatedBackend(monitors=monitors, monitor_dpis=dpis, call_latency=call_latency)
+    hwnds = {}
+    for hwnd, rect, pid, title, class_name, process in trace.windows:
+        backend.process_names[pid] = process
+        hwnds[hwnd] = backend.add_window(rect, title, pid=pid, class_name=class_name)
+    return backend, hwnds
+
+def counted_calls(backend):
+    return sum(count for name, count in backend.calls.items() if name not in uncounted_calls)
+
+def percentile(samples, fraction):
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+def replay(trace, realtime, call_latency):
+    backend, hwnds = build_backend(trace, call_latency)
+    togglewindows.overlay = NullOverlay()
+    togglewindows.set_backend(backend)
+    timeline = [(at, 0, combo, hwnd) for at, combo, hwnd in trace.hotkeys]
+    timeline += [(at, 1, event, hwnd) for at, event, hwnd in trace.events if event in replayed_events]
+    timeline.sort()
+    samples = {}
+    skipped = 0
+    busy = 0.0
+    calls_before = counted_calls(backend)
+    first = timeline[0][0] if timeline else 0
+    start = time.perf_counter()
+    for at, is_event, name, hwnd in timeline:
+        if realtime:
+            delay = (at - first) / 1e9 - (time.perf_counter() - start)
+            if delay > 0:
+                time.sleep(delay)
+        if is_event:
+            if name == 'create' and hwnd not in hwnds:
+                hwnds[hwnd] = backend.add_window(default_window)
+            elif name == 'destroy' and hwnds.get(hwnd) in backend.windows:
+                backend.remove_window(hwnds.pop(hwnd))
+            elif name == 'foreground' and hwnd in hwnds:
+                backend.foreground = hwnds[hwnd]
+            continue
+        callback = togglewindows.hotkeys.get(name)
+        if callback is None:
+            skipped += 1
+            continue
+        backend.foreground = hwnds.get(hwnd)
+        pressed = time.perf_counter()
+        callback(backend.foreground)
+        togglewindows.coalescer.flush()  # Include the window write that the flush thread would do
+        elapsed = time.perf_counter() - pressed
+        busy += elapsed
+        samples.setdefault(name, []).append(elapsed)
+    wall = time.perf_counter() - start
+    presses = sum(len(values) for values in samples.values())
+    return {
+        'presses': presses,
+        'skipped': skipped,
+        'wall_s': wall,
+        'ops_per_sec': presses / busy if busy else 0.0,
+        'calls_per_press': (counted_calls(backend) - calls_before) / presses if presses else 0.0,
+        'actions': {
+            name: {'count': len(values), 'p50_us': percentile(sorted(values), 0.5) * 1e6, 'p99_us': percentile(sorted(values), 0.99) * 1e6}
+            for name, values in samples.items()
+        },
+    }
+
+# Function to list what got worse than the baseline by more than `tolerance` (a fraction)
+def regressions(result, baseline, tolerance):
+    found = []
+    if result['ops_per_sec'] < baseline['ops_per_sec'] * (1 - tolerance):
+        found.append(f"throughput {result['ops_per_sec']:,.0f} ops/s vs baseline {baseline['ops_per_sec']:,.0f}")
+    if result['calls_per_press'] > baseline['calls_per_press'] * (1 + tolerance):
+        found.append(f"backend calls per press {result['calls_per_press']:.2f} vs baseline {baseline['calls_per_press']:.2f}")
+    for name, action in sorted(result['actions'].items()):
+        before = baseline['actions'].get(name)
+        if (
+            before and min(action['count'], before['count']) >= min_samples
+            and action['p50_us'] > before['p50_us'] * (1 + tolerance)
+            and action['p50_us'] - before['p50_us'] >= min_slowdown_us
+        ):
+            found.append(f"{name} p50 {action['p50_us']:.1f} us vs baseline {before['p50_us']:.1f} us")
+    return found
+
+def report_trace(trace):
+    span = (trace.hotkeys[-1][0] - trace.hotkeys[0][0]) / 1e9 if len(trace.hotkeys) > 1 else 0.0
+    print(f"trace: {len(trace.hotkeys)} presses over {span:.1f} s, {len(trace.windows)} windows, {len(trace.monitors)} monitors, "
+          f"{len(trace.events)} window events, {len(trace.calls)} backend calls{' (truncated)' if trace.truncated else ''}")
+    totals = {}
+    for at, name, duration in trace.calls:
+        count, total = totals.get(name, (0, 0))
+        totals[name] = (count + 1, total + duration)
+    for name, (count, total) in sorted(totals.items(), key=lambda item: -item[1][1]):
+        print(f"  recorded {name:24s} {count:7d} calls, mean {total / count / 1000:8.1f} us")
+    if trace.hotkeys:
+        print(f"  recorded backend calls per press: {len(trace.calls) / len(trace.hotkeys):.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a session trace against the simulated backend")
+    parser.add_argument('trace', help="trace file written by togglewindows.py --trace")
+    parser.add_argument('--realtime', action='store_true', help="keep the recorded timing between presses instead of replaying as fast as possible")
+    parser.add_argument('--recorded-latency', action='store_true', help="make every simulated backend call take the mean recorded call time")
+    parser.add_argument('--baseline', help="JSON file with a previous result to compare with")
+    parser.add_argument('--save-baseline', action='store_true', help="write this result to --baseline instead of comparing")
+    parser.add_argument('--repeat', type=int, default=3, help="replay this many times and keep the best numbers")
+    parser.add_argument('--tolerance', type=float, default=0.5, help="allowed slowdown as a fraction (default 0.5)")
+    parser.add_argument('--synthesize', type=int, metavar='PRESSES', help="first record a trace of this many random presses to the trace path")
+    args = parser.parse_args()
+
+    isolate_files()
+    if args.synthesize:
+        synthesize(args.trace, args.synthesize)
+    trace = load_trace(args.trace)
+    report_trace(trace)
+    call_latency = 0.0
+    if args.recorded_latency and trace.calls:
+        call_latency = sum(duration for at, name, duration in trace.calls) / len(trace.calls) / 1e9
+    # Keep the best of several runs so one noisy run does not pass for a regression
+    result = None
+    for _ in range(args.repeat):
+        run = replay(trace, args.realtime, call_latency)
+        if result is None:
+            result = run
+            continue
+        result['ops_per_sec'] = max(result['ops_per_sec'], run['ops_per_sec'])
+        result['wall_s'] = min(result['wall_s'], run['wall_s'])
+        for name, action in run['actions'].items():
+            best = result['actions'][name]
+            best['p50_us'] = min(best['p50_us'], action['p50_us'])
+            best['p99_us'] = min(best['p99_us'], action['p99_us'])
+
+    print(f"replay: {result['presses']} presses ({result['skipped']} unknown hotkeys skipped) in {result['wall_s']:.2f} s, "
+          f"{result['ops_per_sec']:,.0f} ops/s, {result['calls_per_press']:.2f} backend calls per press")
+    for name, action in sorted(result['actions'].items()):
+        print(f"  {name:20s} {action['count']:6d} {action['p50_us']:8.1f} {action['p99_us']:8.1f}")
+
+    if args.baseline and args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(result, f, indent=1)
+        print(f"saved baseline to {args.baseline}")
+    elif args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        found = regressions(result, baseline, args.tolerance)
+        for line in found:
+            print(f"REGRESSION: {line}")
+        if found:
+            sys.exit(1)
+        print(f"no regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+import threading
+import time
+from event_log import log_event
+
+# Sums move/resize deltas per window and writes them with at most one SetWindowPos per frame.
+# The backend needs get_window_rect(hwnd) and set_window_pos(hwnd, x, y, width, height);
+# if it also has begin_defer(), several windows flushed in one frame are committed as one batch.
+# Pass a fake clock and call poll() directly to drive it without the flush thread;
+# `waker` is then called whenever a move arrives while nothing was pending.
+# With `instrumentation` set, each write is charged to the hotkey action that queued the window's first move.
+class MoveCoalescer:
+    def __init__(self, backend, rate=60, clock=time.monotonic):
+        self.backend = backend
+        self.clock = clock
+        self.frame_interval = 1.0 / rate
+        self._pending = {}  # hwnd -> [dx, dy, left, top, right, bottom, first_event_time, instrumentation token]
+        self._cond = threading.Condition()
+        self._last_flush = float('-inf')
+        self._thread = None
+        self._running = False
+        self.waker = None
+        self.instrumentation = None
+        self.events = 0
+        self.flushes = 0
+        self.position_calls = 0
+        self.total_lag = 0.0
+        self.max_lag = 0.0
+
+    def set_rate(self, rate):
+        with self._cond:
+            self.frame_interval = 1.0 / rate
+            self._cond.notify()
+
+    # Queue a move (dx, dy) and/or a side resize (left, top, right, bottom grow outwards)
+    def add(self, hwnd, dx=0, dy=0, left=0, top=0, right=0, bottom=0):
+        origin = self.instrumentation.current() if self.instrumentation else None
+        with self._cond:
+            idle = not self._pending
+            entry = self._pending.get(hwnd)
+            if entry is None:
+                self._pending[hwnd] = [dx, dy, left, top, right, bottom, self.clock(), origin]
+            else:
+                entry[0] += dx
+                entry[1] += dy
+                entry[2] += left
+                entry[3] += top
+                entry[4] += right
+                entry[5] += bottom
+            self.events += 1
+            self._cond.notify()
+        if idle and self.waker is not None:
+            self.waker()
+
+    # Seconds until the next flush may run, or None if nothing is pending
+    def time_until_due(self, now=None):
+        if not self._pending:
+            return None
+        if now is None:
+            now = self.clock()
+        return max(0.0, self._last_flush + self.frame_interval - now)
+
+    # Flush if a frame boundary has passed; returns the time until the next flush (or None)
+    def poll(self, now=None):
+        if now is None:
+            now = self.clock()
+        wait = self.time_until_due(now)
+        if wait == 0.0:
+            self.flush(now)
+            return self.time_until_due(now)
+        return wait
+
+    def flush(self, now=None):
+        with self._cond:
+            pending = self._pending
+            self._pending = {}
+            if now is None:
+                now = self.clock()
+            self._last_flush = now
+        if not pending:
+            return
+        self.flushes += 1
+        instrumentation = self.instrumentation
+        begun = instrumentation.begin_deferred() if instrumentation else None
+        batch = None
+        if len(pending) > 1 and hasattr(self.backend, 'begin_defer'):
+            batch = self.backend.begin_defer(len(pending))
+        for hwnd, entry in pending.items():
+            self._write(hwnd, entry, now, batch)
+        if batch is not None:
+            batch.commit()
+        if instrumentation:
+            instrumentation.end_deferred(begun, [entry[7] for entry in pending.values() if entry[7]])
+
+    # Function to write what is pending for one window right away, e.g. before its rect is read for a monitor jump
+    def flush_window(self, hwnd):
+        with self._cond:
+            entry = self._pending.pop(hwnd, None)
+        if entry is None:
+            return
+        instrumentation = self.instrumentation
+        begun = instrumentation.begin_deferred() if instrumentation else None
+        self._write(hwnd, entry, self.clock())
+        if instrumentation:
+            instrumentation.end_deferred(begun, [entry[7]] if entry[7] else [])
+
+    def _write(self, hwnd, entry, now, batch=None):
+        dx, dy, left, top, right, bottom, first_event = entry[:7]
+        if dx == dy == left == top == right == bottom == 0:
+            return
+        rect = self.backend.get_window_rect(hwnd)
+        new_left = rect[0] + dx - left
+        new_top = rect[1] + dy - top
+        new_right = rect[2] + dx + right
+        new_bottom = rect[3] + dy + bottom
+        if batch is None:
+            self.backend.set_window_pos(hwnd, new_left, new_top, new_right - new_left, new_bottom - new_top)
+        else:
+            batch.set_pos(hwnd, new_left, new_top, new_right - new_left, new_bottom - new_top)
+        self.position_calls += 1
+        lag = now - first_event
+        self.total_lag += lag
+        self.max_lag = max(self.max_lag, lag)
+
+    def stats(self):
+        return {
+            'events': self.events,
+            'flushes': self.flushes,
+            'position_calls': self.position_calls,
+            'mean_lag_ms': 1000 * self.total_lag / self.position_calls if self.position_calls else 0.0,
+            'max_lag_ms': 1000 * self.max_lag,
+        }
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and not self._pending:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                wait = self.time_until_due()
+                if wait:
+                    self._cond.wait(wait)
+                    continue
+            try:
+                self.flush()
+            except Exception as e:
+                log_event('error', f"Failed to move window: {e}", source='coalescer')
@@ -0,0 +1,273 @@
+import json
+import os
+import re
+import threading
+import time
+from event_log import log_event
+
+# Global variables
+default_move_pixels = 40  # Default value for moving pixels
+default_settings = {
+    'theme': 'dark',
+    'background_color': '#000000',
+    'font_color': '#00FF00'
+}
+settings_version = 1  # Layout of settings.json written by ConfigStore
+default_debounce = 0.25  # Seconds a burst of changes is collected before it is written in one go
+replace_attempts = 20  # Tries at swapping in a new settings.json while a reader on Windows has it open
+header_size = 64  # Bytes at the start of settings.json that hold the version and generation
+header_pattern = re.compile(rb'\{\s*"version":\s*(\d+),\s*"generation":\s*(\d+)')
+
+# settings.json holds every setting, move_pixels included, as one JSON object:
+#   {"version": 1, "generation": 12, "move_pixels": 40, "theme": "dark", ...}
+# version and generation are always written first. The generation goes up by one with every write,
+# so a reader can tell from the first few bytes whether it already has this content.
+# A settings.json without a version is the old layout; move_pixels then comes from move_pixels.txt.
+
+# Function to get a cheap change stamp for a file (None if it does not exist)
+def file_stamp(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+# Function to read move pixels from file
+def read_move_pixels(path):
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            try:
+                return int(f.read().strip())
+            except ValueError:
+                return default_move_pixels
+    return default_move_pixels
+
+# Function to read the generation from the start of settings.json without parsing the rest (None if it has none)
+def read_generation(path):
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(header_size)
+    except OSError:
+        return None
+    found = header_pattern.match(head)
+    return int(found.group(2)) if found else None
+
+# Function to read settings.json; returns (generation, values) and raises ValueError if it is broken.
+# A missing file or the old layout has generation None, and move_pixels is read from move_pixels_file.
+def read_config(path, move_pixels_file=None):
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        data = {}
+    if not isinstance(data, dict):
+        raise ValueError(f"{path} should hold a JSON object")
+    values = {'move_pixels': default_move_pixels}
+    values.update(default_settings)
+    generation = None
+    if 'version' in data:
+        data.pop('version')
+        generation = data.pop('generation', 0)
+    elif move_pixels_file:
+        values['move_pixels'] = read_move_pixels(move_pixels_file)
+    values.update(data)
+    return generation, values
+
+# Function to write settings.json in one step: the new content goes to a temporary file that is
+# flushed to disk before it replaces the old one, so a reader sees the old file or the new one, never half of it
+def write_config(path, generation, values):
+    data = {'version': settings_version, 'generation': generation}
+    data.update((key, value) for key, value in values.items() if key not in data)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(data, f, indent=1)
+        f.flush()
+        os.fsync(f.fileno())
+    for attempt in range(replace_attempts):
+        try:
+            os.replace(temp_path, path)
+            return
+        except PermissionError:
+            # Windows refuses to replace a file another process has open; readers only hold it for a moment
+            if attempt == replace_attempts - 1:
+                os.remove(temp_path)
+                raise
+            time.sleep(0.005)
+
+# In-memory copy of settings.json.
+# Values are read once and only re-read when the file's mtime/size changes, and not even then when
+# the generation at the start of the file is the one already loaded.
+# Changes made with set_move_pixels()/save_settings() apply in memory at once and are written
+# together `debounce` seconds after the first of them, so dragging through colors or holding the
+# pixel buttons costs one write. flush() writes anything pending straight away.
+# Subscribers are called with (key, value) for every value that changed.
+class ConfigStore:
+    def __init__(self, settings_file='settings.json', poll_interval=0.5, debounce=default_debounce, move_pixels_file='move_pixels.txt'):
+        self.settings_file = settings_file
+        self.move_pixels_file = move_pixels_file  # Only read while settings.json still has the old layout
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self.generation = 0
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()  # One reload or write of settings.json at a time
+        self._pending_lock = threading.Lock()
+        self._values = {'move_pixels': default_move_pixels}
+        self._values.update(default_settings)
+        self._stored = {}  # What settings.json holds, plus changes waiting to be written
+        self._dirty = False
+        self._timer = None
+        self._stamp = False
+        self._legacy = True
+        self._subscribers = []
+        self._watcher = None
+        self._stop = threading.Event()
+        self.changes = 0
+        self.writes = 0
+        self.parses = 0
+        self.skipped_parses = 0
+        self.reload()
+
+    def get(self, key, default=None):
+        return self._values.get(key, default)
+
+    def settings(self):
+        return {key: self._values[key] for key in self._values if key != 'move_pixels'}
+
+    def subscribe(self, callback):
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def _current_stamp(self):
+        stamp = file_stamp(self.settings_file)
+        if self._legacy:
+            return (stamp, file_stamp(self.move_pixels_file))
+        return stamp
+
+    # Re-read settings.json if its stamp changed since the last load.
+    # Changes not written yet win over the file, and a broken file leaves the values as they are.
+    def reload(self):
+        with self._io_lock:
+            stamp = self._current_stamp()
+            if stamp == self._stamp or self._dirty:
+                return {}
+            previous, self._stamp = self._stamp, stamp
+            # Same generation and size means the file was only touched or rewritten as it was
+            if (
+                not self._legacy and stamp is not None and previous
+                and stamp[1] == previous[1] and read_generation(self.settings_file) == self.generation
+            ):
+                self.skipped_parses += 1
+                return {}
+            try:
+                generation, values = read_config(self.settings_file, self.move_pixels_file)
+            except (OSError, ValueError):
+                return {}
+            self.parses += 1
+            self._legacy = generation is None
+            with self._pending_lock:
+                if self._dirty:
+                    return {}
+                self.generation = generation or 0
+                self._stored = values
+            return self._apply(values)
+
+    def set_move_pixels(self, value):
+        return self._store({'move_pixels': value})
+
+    def save_settings(self, settings):
+        return self._store(settings)
+
+    # Change values in memory now and write them to settings.json after the debounce
+    def _store(self, values):
+        with self._pending_lock:
+            self._stored = dict(self._stored, **values)
+            self._dirty = True
+            self.changes += 1
+            if self._timer is None:
+                self._timer = threading.Timer(self.debounce, self._flush_later)
+                self._timer.daemon = True
+                self._timer.start()
+        return self._apply(values)
+
+    def _flush_later(self):
+        try:
+            self.flush()
+        except OSError:
+            pass  # Still pending; the next change or flush() tries again
+
+    # Function to write pending changes now; returns True if settings.json was written
+    def flush(self):
+        with self._io_lock:
+            with self._pending_lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                if not self._dirty:
+                    return False
+                values = self._stored
+                generation = self.generation + 1
+                self._dirty = False
+            try:
+                write_config(self.settings_file, generation, values)
+            except OSError:
+                with self._pending_lock:
+                    self._dirty = True
+                raise
+            with self._pending_lock:
+                self.generation = generation
+            self._legacy = False
+            self._stamp = self._current_stamp()
+            self.writes += 1
+        return True
+
+    def stats(self):
+        return {
+            'generation': self.generation,
+            'changes': self.changes,
+            'writes': self.writes,
+            'parses': self.parses,
+            'skipped_parses': self.skipped_parses,
+        }
+
+    # Change values in memory only, e.g. when the GUI pushes new values to a running daemon
+    def update(self, values):
+        return self._apply(values)
+
+    def _apply(self, updates):
+        with self._lock:
+            changed = {key: value for key, value in updates.items() if self._values.get(key) != value}
+            if changed:
+                values = dict(self._values)
+                values.update(changed)
+                # Swap the whole dict so readers never see a half-applied update
+                self._values = values
+        for key, value in changed.items():
+            for callback in list(self._subscribers):
+                callback(key, value)
+        return changed
+
+    # Poll the files in the background at a low rate
+    def start_watching(self):
+        if self._watcher and self._watcher.is_alive():
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch, daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self):
+        self._stop.set()
+        if self._watcher:
+            self._watcher.join()
+            self._watcher = None
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.reload()
+            except OSError:
+                pass
+            except ValueError as e:
+                log_event('warning', f"Could not apply settings: {e}", source='config')
@@ -0,0 +1,216 @@
+import asyncio
+import hmac
+import json
+import os
+import secrets
+import socket
+import socketserver
+import threading
+
+# Global variables
+default_port = 47831  # Localhost port the hotkey daemon listens on
+token_folder = os.path.join(os.environ.get('LOCALAPPDATA') or os.path.expanduser('~'), 'togglewindows')  # Only the user can read it
+
+# Every request has to carry the token the daemon wrote for this session, so other local users
+# and processes that cannot read the user's files cannot drive the daemon.
+
+# Function to get the path of the token file for a control port
+def token_path(port):
+    return os.path.join(token_folder, f'control-{port}.token')
+
+# Function to make a new session token and write it where only the current user can read it
+def write_token(port):
+    token = secrets.token_hex(16)
+    os.makedirs(token_folder, mode=0o700, exist_ok=True)
+    path = token_path(port)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, 'w') as f:
+        f.write(token)
+    os.replace(temp_path, path)
+    return token
+
+# Function to read the token of the daemon on a port (None if there is none)
+def read_token(port):
+    try:
+        with open(token_path(port), 'r') as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+def remove_token(port):
+    try:
+        os.remove(token_path(port))
+    except OSError:
+        pass
+
+# Function to run one decoded request against a dict of command handlers.
+# With a token, requests that do not carry it are refused.
+def handle_request(handlers, request, token=None):
+    if not isinstance(request, dict) or not isinstance(request.get('args', {}), dict):
+        return {'ok': False, 'error': 'bad request: expected {"cmd": name, "args": {...}}'}
+    if token is not None and not hmac.compare_digest(str(request.get('token', '')).encode(), token.encode()):
+        return {'ok': False, 'error': "not authorized"}
+    command = request.get('cmd')
+    handler = handlers.get(command)
+    if handler is None:
+        return {'ok': False, 'error': f"unknown command: {command}"}
+    try:
+        result = handler(**request.get('args', {}))
+    except Exception as e:
+        return {'ok': False, 'error': str(e)}
+    response = {'ok': True}
+    if result is not None:
+        response['result'] = result
+    return response
+
+# Function to encode the response line for a request (None if it could not be decoded)
+def encode_response(request, response):
+    if isinstance(request, dict) and 'id' in request:
+        response['id'] = request['id']
+    return (json.dumps(response) + '\n').encode()
+
+# Function to decode one JSON line and encode the response line
+def handle_line(handlers, line, token=None):
+    try:
+        request = json.loads(line)
+    except ValueError as e:
+        return encode_response(None, {'ok': False, 'error': f"bad request: {e}"})
+    return encode_response(request, handle_request(handlers, request, token))
+
+class _LineHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if line.strip():
+                self.wfile.write(handle_line(self.server.handlers, line, self.server.token))
+                self.wfile.flush()
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+# JSON-lines control server on localhost.
+# Each line is {"cmd": name, "args": {...}, "token": ..., "id": optional} and gets one response line
+# {"ok": true, "result": ...} or {"ok": false, "error": "..."}.
+class ControlServer:
+    def __init__(self, handlers, port=default_port, token=None):
+        self.handlers = handlers
+        self.port = port
+        self.token = token
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        self._server = _Server(('127.0.0.1', self.port), _LineHandler)
+        self._server.handlers = self.handlers
+        self._server.token = self.token
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            self._thread = None
+
+# The same JSON-lines server on an asyncio event loop, for the headless daemon.
+# Commands in `inline` run on the loop itself and must not block; every other command runs in
+# `executor` (None is the loop's default executor). Requests on one connection are answered in order.
+class AsyncControlServer:
+    def __init__(self, handlers, port=default_port, executor=None, inline=(), token=None):
+        self.handlers = handlers
+        self.port = port
+        self.token = token
+        self.executor = executor
+        self.inline = frozenset(inline)
+        self._server = None
+        self._writers = set()
+        self.requests = 0
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._serve, '127.0.0.1', self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            for writer in list(self._writers):
+                writer.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _serve(self, reader, writer):
+        self._writers.add(writer)
+        writer.get_extra_info('socket').setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                self.requests += 1
+                try:
+                    request = json.loads(line)
+                except ValueError as e:
+                    writer.write(encode_response(None, {'ok': False, 'error': f"bad request: {e}"}))
+                else:
+                    if not isinstance(request, dict) or request.get('cmd') in self.inline:
+                        response = handle_request(self.handlers, request, self.token)
+                    else:
+                        response = await loop.run_in_executor(self.executor, handle_request, self.handlers, request, self.token)
+                    writer.write(encode_response(request, response))
+                await writer.drain()
+                # readline() and drain() return without yielding while data is buffered, so a client
+                # pipelining requests would otherwise keep every other task off the loop
+                await asyncio.sleep(0)
+        except (ConnectionError, OSError):
+            pass  # The client went away
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+# Client that keeps one connection to the control server open.
+# Without a token it reads the daemon's token file every time it connects.
+class ControlClient:
+    def __init__(self, port=default_port, timeout=1.0, token=None):
+        self.port = port
+        self.timeout = timeout
+        self.token = token
+        self._session_token = token
+        self._sock = None
+        self._file = None
+        self._lock = threading.Lock()
+
+    def connect(self):
+        self._session_token = self.token or read_token(self.port)
+        self._sock = socket.create_connection(('127.0.0.1', self.port), timeout=self.timeout)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._file = self._sock.makefile('rwb')
+
+    def close(self):
+        if self._sock:
+            self._file.close()
+            self._sock.close()
+            self._sock = None
+            self._file = None
+
+    # Function to send a command and wait for its response; raises OSError if the daemon is unreachable
+    def request(self, cmd, **args):
+        with self._lock:
+            if self._sock is None:
+                self.connect()
+            try:
+                self._file.write((json.dumps({'cmd': cmd, 'args': args, 'token': self._session_token}) + '\n').encode())
+                self._file.flush()
+                line = self._file.readline()
+            except OSError:
+                self.close()
+                raise
+            if not line:
+                self.close()
+                raise ConnectionError("control channel closed")
+        return json.loads(line)
@@ -0,0 +1,214 @@
+import threading
+import time
+from collections import deque
+from event_log import log_event
+
+# Global variables
+policies = ('keep', 'merge', 'replace')
+
+# One queued hotkey press: the callback, the window it targets (its lane key), how many presses it
+# stands for and when the first arrived
+class ActionRecord:
+    __slots__ = ('callback', 'target', 'policy', 'count', 'queued_at')
+
+    def __init__(self, callback, target, policy, queued_at):
+        self.callback = callback
+        self.target = target
+        self.policy = policy
+        self.count = 1
+        self.queued_at = queued_at
+
+# Runs hotkey actions off the keyboard hook thread.
+# submit() only appends a record to the lane of the window it targets and returns, so the
+# hook never waits on Win32 calls. A pool of workers drains the lanes: records in one lane
+# run one at a time in order, different lanes run in parallel. The callback is called with the
+# lane key, the window that was targeted at submit time, not whatever has the focus when it runs.
+# Queue policies per record:
+#   'keep'    always queue it
+#   'merge'   fold into the last record of the lane if it is the same action (it then runs count times)
+#   'replace' drop a queued record of the same action in the lane; only the latest press matters
+# Each lane holds at most max_lane records and all lanes together at most max_queued;
+# presses beyond that are dropped and counted.
+# Instead of start()ing the worker threads, something else can call run_next() or run_for(); it gets `waker`
+# called (from the submitting thread) whenever a lane becomes ready.
+# `on_start`, if set, is called with the seconds a record waited, on the running thread right before it runs.
+class Dispatcher:
+    def __init__(self, lane_key, workers=4, max_lane=32, max_queued=256, clock=time.monotonic):
+        self.lane_key = lane_key
+        self.worker_count = workers
+        self.max_lane = max_lane
+        self.max_queued = max_queued
+        self.clock = clock
+        self._lanes = {}  # lane key -> deque of ActionRecord
+        self._ready = deque()  # lane keys with records and no worker on them
+        self._scheduled = set()  # lane keys that are ready or being run by a worker
+        self._active = 0
+        self._queued = 0
+        self._cond = threading.Condition()
+        self._threads = []
+        self._running = False
+        self.waker = None
+        self.on_start = None
+        self.submitted = 0
+        self.merged = 0
+        self.replaced = 0
+        self.dropped = 0
+        self.executed = 0
+        self.errors = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    # Called on the hook thread: queue the press and return
+    def submit(self, callback, policy='keep'):
+        key = self.lane_key()
+        now = self.clock()
+        with self._cond:
+            self.submitted += 1
+            lane = self._lanes.get(key)
+            if lane:
+                if policy == 'merge' and lane[-1].callback is callback:
+                    lane[-1].count += 1
+                    self.merged += 1
+                    return True
+                if policy == 'replace':
+                    for record in lane:
+                        if record.callback is callback:
+                            lane.remove(record)
+                            self._queued -= 1
+                            self.replaced += 1
+                            break
+            if self._queued >= self.max_queued or (lane is not None and len(lane) >= self.max_lane):
+                self.dropped += 1
+                return False
+            if lane is None:
+                lane = self._lanes[key] = deque()
+            lane.append(ActionRecord(callback, key, policy, now))
+            self._queued += 1
+            if key in self._scheduled:
+                return True
+            self._scheduled.add(key)
+            self._ready.append(key)
+            self._cond.notify_all()
+        if self.waker is not None:
+            self.waker()
+        return True
+
+    # Function to take the next record from a ready lane; the lane stays scheduled until _finish()
+    def _take(self):
+        key = self._ready.popleft()
+        record = self._lanes[key].popleft()
+        self._queued -= 1
+        self._active += 1
+        wait = self.clock() - record.queued_at
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        return key, record, wait
+
+    def _finish(self, key):
+        self._active -= 1
+        self.executed += 1
+        if self._lanes[key]:
+            self._ready.append(key)
+        else:
+            del self._lanes[key]
+            self._scheduled.discard(key)
+        self._cond.notify_all()
+
+    def _run(self, record, wait):
+        for _ in range(record.count):
+            if self.on_start is not None:
+                self.on_start(wait)
+                wait = 0.0  # Merged presses after the first run right away
+            try:
+                record.callback(record.target)
+            except Exception as e:
+                with self._cond:
+                    self.errors += 1
+                log_event('error', f"Hotkey action {getattr(record.callback, '__name__', record.callback)} failed: {e}", source='dispatcher')
+
+    # Function to run one queued record on the calling thread; returns False if no lane was ready
+    def run_next(self):
+        with self._cond:
+            if not self._ready:
+                return False
+            key, record, wait = self._take()
+        try:
+            self._run(record, wait)
+        finally:
+            with self._cond:
+                self._finish(key)
+        return True
+
+    # Function to run records as they become ready until `seconds` have passed; returns how many ran.
+    # It waits for the next press in between, so during a storm the caller is not round-tripped per action.
+    def run_for(self, seconds):
+        deadline = time.monotonic() + seconds
+        ran = 0
+        while True:
+            if self.run_next():
+                ran += 1
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return ran
+            with self._cond:
+                if not self._ready:
+                    self._cond.wait(remaining)
+
+    def has_ready(self):
+        return bool(self._ready)
+
+    # Function to run queued records on the calling thread until the queue is empty
+    def drain(self):
+        while self.run_next():
+            pass
+
+    # Function to block until every queued record has run; returns False on timeout
+    def wait_idle(self, timeout=None):
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._scheduled, timeout)
+
+    def stats(self):
+        return {
+            'submitted': self.submitted,
+            'executed': self.executed,
+            'merged': self.merged,
+            'replaced': self.replaced,
+            'dropped': self.dropped,
+            'errors': self.errors,
+            'queued': self._queued,
+            'running': self._active,
+            'mean_wait_ms': 1000 * self.total_wait / self.executed if self.executed else 0.0,
+            'max_wait_ms': 1000 * self.max_wait,
+        }
+
+    def start(self):
+        if self._threads:
+            return
+        self._running = True
+        for i in range(self.worker_count):
+            thread = threading.Thread(target=self._worker, name=f"hotkey-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        self.drain()
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while self._running and not self._ready:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                key, record, wait = self._take()
+            try:
+                self._run(record, wait)
+            finally:
+                with self._cond:
+                    self._finish(key)
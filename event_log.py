@@ -0,0 +1,98 @@
+import json
+import sys
+import threading
+import time
+from collections import deque
+
+# Global variables
+default_capacity = 5000  # Lines a LogReader buffers before it drops the oldest
+log_levels = ('info', 'warning', 'error')
+
+# Writes daemon events one line at a time: the plain message for a terminal, or a JSON object
+# ({"time", "level", "source", "message"} plus any extra fields) when the GUI is reading them.
+# Each line is written and flushed under a lock, so events from different threads never interleave.
+class EventLog:
+    def __init__(self, stream=None, json_lines=False):
+        self.stream = stream  # None means whatever sys.stdout is at the time
+        self.json_lines = json_lines
+        self._lock = threading.Lock()
+
+    def write(self, level, message, source='daemon', **fields):
+        if self.json_lines:
+            event = {'time': time.time(), 'level': level, 'source': source, 'message': message}
+            event.update(fields)
+            line = json.dumps(event, separators=(',', ':'))
+        else:
+            line = message
+        stream = self.stream or sys.stdout
+        with self._lock:
+            stream.write(line + '\n')
+            stream.flush()
+
+event_log = EventLog()  # Shared by every daemon module; togglewindows.py switches it to JSON for the GUI
+
+# Function to log a daemon event through the shared EventLog
+def log_event(level, message, source='daemon', **fields):
+    event_log.write(level, message, source, **fields)
+
+# Function to turn one line of daemon output into an event.
+# Anything that is not a JSON event (a traceback on stderr, the startup profile) keeps its raw text.
+def parse_line(line):
+    line = line.rstrip('\r\n')
+    if line.startswith('{'):
+        try:
+            event = json.loads(line)
+        except ValueError:
+            event = None
+        if isinstance(event, dict) and 'message' in event:
+            event.setdefault('level', 'info')
+            event.setdefault('source', 'daemon')
+            event.setdefault('time', time.time())
+            return event
+    return {'time': time.time(), 'level': 'info', 'source': 'output', 'message': line}
+
+# Reads daemon output on its own thread into a bounded ring buffer.
+# The thread only reads and appends, so the pipe is always drained and the daemon never blocks
+# writing to it. When the consumer falls behind, the oldest lines are dropped (and counted), so
+# memory stays flat. drain() is meant to be called from the Tk main thread with after().
+class LogReader:
+    def __init__(self, stream, capacity=default_capacity):
+        self.stream = stream
+        self._buffer = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._thread = None
+        self.received = 0
+        self.dropped = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def is_alive(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        buffer = self._buffer
+        try:
+            for line in self.stream:
+                with self._lock:
+                    if len(buffer) == buffer.maxlen:
+                        self.dropped += 1
+                    buffer.append(line)
+                    self.received += 1
+        except (OSError, ValueError):
+            pass  # The pipe was closed under us
+
+    # Function to take the buffered events, oldest first.
+    # Only the newest `limit` lines are parsed; older ones are counted as dropped.
+    def drain(self, limit=None):
+        with self._lock:
+            lines = list(self._buffer)
+            self._buffer.clear()
+            if limit is not None and len(lines) > limit:
+                self.dropped += len(lines) - limit
+                lines = lines[-limit:]
+        return [parse_line(line) for line in lines]
+
+    def stats(self):
+        return {'received': self.received, 'dropped': self.dropped, 'buffered': len(self._buffer)}
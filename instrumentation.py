@@ -0,0 +1,293 @@
+import json
+import threading
+import time
+
+# Global variables
+bucket_count = 25  # Bucket i holds durations below 2**i microseconds; the last one also holds anything slower
+# Where the time from key event to window update goes:
+#   queue    waiting in the Dispatcher for a worker (0 when a handler is called directly)
+#   handler  the handler's own Python code
+#   frame    a coalesced/animated move waiting for the next frame
+#   foreground, read, write, overlay  backend and overlay calls, also those made later by the flush/frame thread
+phases = ('queue', 'handler', 'frame', 'foreground', 'read', 'write', 'overlay')
+phase_index = {phase: i for i, phase in enumerate(phases)}
+queue_phase, handler_phase, frame_phase = 0, 1, 2
+
+# Backend/overlay methods and the phase their time is charged to
+backend_phases = {
+    'get_foreground_window': 'foreground',
+    'get_window_rect': 'read',
+    'get_window_text': 'read',
+    'get_ex_style': 'read',
+    'get_layered_alpha': 'read',
+    'monitor_from_window': 'read',
+    'enum_monitors': 'read',
+    'get_monitor_dpi': 'read',
+    'enum_windows': 'read',
+    'get_window_process': 'read',
+    'get_process_name': 'read',
+    'get_class_name': 'read',
+    'set_foreground_window': 'write',
+    'set_window_pos': 'write',
+    'set_ex_style': 'write',
+    'set_layered_alpha': 'write',
+    'set_topmost': 'write',
+    'set_insert_after': 'write',
+}
+overlay_phases = {'show': 'overlay'}
+
+# Fixed-bucket latency histogram with power-of-two microsecond buckets
+class Histogram:
+    __slots__ = ('counts', 'count', 'total_ns', 'max_ns')
+
+    def __init__(self):
+        self.counts = [0] * bucket_count
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def record(self, ns):
+        bucket = (ns // 1000).bit_length()
+        self.counts[bucket if bucket < bucket_count else bucket_count - 1] += 1
+        self.count += 1
+        self.total_ns += ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+
+    def merge(self, other):
+        for i, count in enumerate(other.counts):
+            self.counts[i] += count
+        self.count += other.count
+        self.total_ns += other.total_ns
+        self.max_ns = max(self.max_ns, other.max_ns)
+
+    # Upper bound of the bucket holding the given fraction of samples, in microseconds
+    def percentile_us(self, fraction):
+        target = self.count * fraction
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= target:
+                return 2 ** i
+        return 0
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean_us': self.total_ns / self.count / 1000 if self.count else 0.0,
+            'p50_us': self.percentile_us(0.5),
+            'p99_us': self.percentile_us(0.99),
+            'max_us': self.max_ns / 1000,
+            'buckets': list(self.counts),
+        }
+
+# Counters for one action on one thread: latency histograms (key event to handler return, and key event
+# to the window update) plus time and hit counts per phase
+class ActionStats:
+    __slots__ = ('calls', 'errors', 'total', 'update', 'phase_ns', 'phase_hits')
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total = Histogram()
+        self.update = Histogram()
+        self.phase_ns = [0] * len(phases)
+        self.phase_hits = [0] * len(phases)
+
+# Hot-path timing for hotkey actions, from the key event to the window update.
+# Every thread writes only to its own shard of counters, so recording needs no locks;
+# snapshot() merges the shards on demand. The Dispatcher reports how long a press waited with
+# queued() right before the handler runs. Backend and overlay calls made while an action runs are
+# charged to their phase; whatever is left is charged to 'handler'.
+# A move handed to the coalescer or animator takes current() along; the thread that later writes it
+# brackets the write with begin_deferred()/end_deferred(), which charges the frame wait and the
+# backend calls to that action and records its update latency. A batch written for several
+# actions is charged in full to each of them.
+# Calls made outside any action or deferred write count as 'background'.
+class Instrumentation:
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._local = threading.local()
+        self._shards = []
+        self._shards_lock = threading.Lock()
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = {}
+            self._local.phase_ns = None
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    def _stats(self, shard, name):
+        stats = shard.get(name)
+        if stats is None:
+            stats = shard[name] = ActionStats()
+        return stats
+
+    # Function to wrap a hotkey callback so each call is timed as one action
+    def wrap(self, name, callback):
+        if not self.enabled:
+            return callback
+        local = self._local
+        clock = time.perf_counter_ns
+
+        def timed(*args, **kwargs):
+            shard = getattr(local, 'shard', None) or self._shard()
+            stats = shard.get(name) or self._stats(shard, name)
+            queue_ns = getattr(local, 'queue_ns', 0)
+            local.queue_ns = 0
+            phase_ns = local.phase_ns = [0, 0, 0, 0, 0, 0, 0]
+            local.deferred = False
+            start = clock()
+            local.action = (name, start - queue_ns)
+            try:
+                return callback(*args, **kwargs)
+            except Exception:
+                stats.errors += 1
+                raise
+            finally:
+                elapsed = clock() - start
+                local.phase_ns = local.action = None
+                phase_ns[handler_phase] = max(0, elapsed - sum(phase_ns))
+                phase_ns[queue_phase] = queue_ns
+                stats.calls += 1
+                stats.total.record(queue_ns + elapsed)
+                if not local.deferred:
+                    stats.update.record(queue_ns + elapsed)  # The window was written before the handler returned
+                totals = stats.phase_ns
+                hits = stats.phase_hits
+                for i, ns in enumerate(phase_ns):
+                    if ns:
+                        totals[i] += ns
+                        hits[i] += 1
+        timed.__name__ = getattr(callback, '__name__', name)
+        return timed
+
+    # Function for the Dispatcher: the next action on this thread waited `seconds` in the queue
+    def queued(self, seconds):
+        self._local.queue_ns = int(seconds * 1e9)
+
+    # Function for deferred writers (coalescer, animator): returns a token for the action running on
+    # this thread, to pass to end_deferred() once its write is done, or None outside an action
+    def current(self):
+        local = self._local
+        action = getattr(local, 'action', None)
+        if action is None:
+            return None
+        local.deferred = True
+        return action + (time.perf_counter_ns(),)
+
+    # Function to start charging this thread's backend calls to a deferred write; returns what to pass to end_deferred()
+    def begin_deferred(self):
+        local = self._local
+        saved = getattr(local, 'phase_ns', None)
+        local.phase_ns = [0, 0, 0, 0, 0, 0, 0]
+        return saved, time.perf_counter_ns()
+
+    # Function to charge a deferred write to the actions (current() tokens) that queued it
+    def end_deferred(self, begun, origins):
+        local = self._local
+        phase_ns = local.phase_ns
+        local.phase_ns, started = begun
+        if not origins:
+            for index, ns in enumerate(phase_ns):
+                if ns:
+                    self._charge(index, ns)
+            return
+        now = time.perf_counter_ns()
+        shard = getattr(local, 'shard', None) or self._shard()
+        for name, pressed, queued_at in origins:
+            stats = shard.get(name) or self._stats(shard, name)
+            phase_ns[frame_phase] = max(0, started - queued_at)
+            for index, ns in enumerate(phase_ns):
+                if ns:
+                    stats.phase_ns[index] += ns
+                    stats.phase_hits[index] += 1
+            stats.update.record(now - pressed)
+
+    # Function to wrap backend/overlay methods so their time is charged to a phase
+    def instrument_calls(self, target, method_phases):
+        if not self.enabled:
+            return target
+        return _PhaseProxy(self, target, method_phases)
+
+    def _charge(self, index, ns):
+        local = self._local
+        phase_ns = getattr(local, 'phase_ns', None)
+        if phase_ns is not None:
+            phase_ns[index] += ns
+        else:
+            shard = getattr(local, 'shard', None) or self._shard()
+            stats = shard.get('background') or self._stats(shard, 'background')
+            stats.calls += 1
+            stats.total.record(ns)
+            stats.phase_ns[index] += ns
+            stats.phase_hits[index] += 1
+
+    def snapshot(self):
+        merged = {}
+        with self._shards_lock:
+            shards = list(self._shards)
+        for shard in shards:
+            for name, stats in list(shard.items()):
+                total = merged.get(name)
+                if total is None:
+                    total = merged[name] = ActionStats()
+                total.calls += stats.calls
+                total.errors += stats.errors
+                total.total.merge(stats.total)
+                total.update.merge(stats.update)
+                for i in range(len(phases)):
+                    total.phase_ns[i] += stats.phase_ns[i]
+                    total.phase_hits[i] += stats.phase_hits[i]
+        return {
+            name: {
+                'calls': stats.calls,
+                'errors': stats.errors,
+                'latency': stats.total.summary(),
+                'update': stats.update.summary(),
+                'phases': {
+                    phase: {
+                        'hits': stats.phase_hits[i],
+                        'mean_us': stats.phase_ns[i] / stats.phase_hits[i] / 1000,
+                        'share': stats.phase_ns[i] / sum(stats.phase_ns),
+                    }
+                    for i, phase in enumerate(phases) if stats.phase_hits[i]
+                },
+            }
+            for name, stats in merged.items()
+        }
+
+    def snapshot_json(self):
+        return json.dumps(self.snapshot())
+
+# Stand-in for a backend/overlay whose listed methods are timed; other attributes pass through
+class _PhaseProxy:
+    def __init__(self, instrumentation, target, method_phases):
+        self._target = target
+        for method_name, phase in method_phases.items():
+            method = getattr(target, method_name, None)
+            if method is not None:
+                setattr(self, method_name, _timed_method(instrumentation, method, phase_index[phase]))
+
+    def __getattr__(self, name):
+        return getattr(self._target, name)
+
+# Function to build a timed version of one method; kept flat because it runs on every backend call
+def _timed_method(instrumentation, method, index):
+    local = instrumentation._local
+    charge = instrumentation._charge
+    clock = time.perf_counter_ns
+
+    def timed(*args, **kwargs):
+        start = clock()
+        result = method(*args, **kwargs)
+        phase_ns = getattr(local, 'phase_ns', None)
+        if phase_ns is not None:
+            phase_ns[index] += clock() - start
+        else:
+            charge(index, clock() - start)
+        return result
+    return timed
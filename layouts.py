@@ -0,0 +1,219 @@
+import mmap
+import os
+import struct
+from monitors import Monitor, map_rect
+from window_backend import HWND_TOP, WS_EX_LAYERED, WS_EX_TOPMOST
+
+# Global variables
+default_layout_file = 'layout.wcl'
+layout_magic = b'WCLY'
+layout_version = 1
+
+# File layout (little endian):
+#   header   magic, version, monitor count, window count, string table size
+#   monitors monitor rect and work area, left-to-right
+#   windows  one fixed-size record per window, topmost first (z-order)
+#   strings  length-prefixed UTF-8 process/class/title strings, each stored once
+header_struct = struct.Struct('<4sHHII')
+monitor_struct = struct.Struct('<8i')
+record_struct = struct.Struct('<4iBBHIII')
+string_length_struct = struct.Struct('<H')
+
+# Record flag bits
+flag_topmost = 0x01
+flag_layered = 0x02
+
+# One saved window: where it was, how it looked and how to recognise it again
+class LayoutRecord:
+    __slots__ = ('rect', 'alpha', 'topmost', 'layered', 'monitor', 'process', 'class_name', 'title')
+
+    def __init__(self, rect, alpha, topmost, layered, monitor, process, class_name, title):
+        self.rect = rect
+        self.alpha = alpha
+        self.topmost = topmost
+        self.layered = layered
+        self.monitor = monitor
+        self.process = process
+        self.class_name = class_name
+        self.title = title
+
+    def __repr__(self):
+        return f"LayoutRecord({self.process!r}, {self.class_name!r}, {self.title!r}, rect={self.rect})"
+
+# Saved monitors and windows, topmost window first
+class Layout:
+    def __init__(self, monitors, records):
+        self.monitors = monitors
+        self.records = records
+
+# Function to check that a window has a real position to save: a minimized window's rect is the
+# iconic (-32000, -32000) spot, cloaked windows sit on another virtual desktop, and zero-size ones are not drawn
+def is_placed(backend, hwnd, rect):
+    if rect[2] <= rect[0] or rect[3] <= rect[1]:
+        return False
+    try:
+        return not backend.is_minimized(hwnd) and not backend.is_cloaked(hwnd)
+    except Exception:
+        return False  # The window went away
+
+# Function to read every visible top-level window into a Layout.
+# backend is the (cached) window backend, index a WindowIndex and topology a MonitorTopology.
+def capture_layout(backend, index, topology):
+    records = []
+    for hwnd in backend.enum_windows():
+        info = index.get(hwnd) or index.add(hwnd)
+        if info is None:
+            continue
+        rect = tuple(backend.get_window_rect(hwnd))
+        if not is_placed(backend, hwnd, rect):
+            continue
+        style = backend.get_ex_style(hwnd)
+        layered = bool(style & WS_EX_LAYERED)
+        # Off-screen windows get the nearest monitor; with no monitors known the record keeps monitor 0,
+        # which place_rect() leaves alone because the layout then has no monitors either
+        monitor = topology.monitor_from_rect(rect)
+        records.append(LayoutRecord(
+            rect, backend.get_layered_alpha(hwnd) if layered else 255, bool(style & WS_EX_TOPMOST), layered,
+            monitor.index if monitor else 0, info.process, info.class_name, info.title
+        ))
+    return Layout([(monitor.rect, monitor.work) for monitor in topology.all()], records)
+
+# Function to write a layout in the binary format; the file is replaced in one step
+def save_layout(layout, path=default_layout_file):
+    strings = bytearray()
+    offsets = {}
+
+    def string_ref(text):
+        offset = offsets.get(text)
+        if offset is None:
+            encoded = text.encode('utf-8')[:0xFFFF]
+            offset = offsets[text] = len(strings)
+            strings.extend(string_length_struct.pack(len(encoded)))
+            strings.extend(encoded)
+        return offset
+
+    body = bytearray()
+    for rect, work in layout.monitors:
+        body.extend(monitor_struct.pack(*rect, *work))
+    for record in layout.records:
+        flags = (flag_topmost if record.topmost else 0) | (flag_layered if record.layered else 0)
+        body.extend(record_struct.pack(
+            *record.rect, record.alpha, flags, record.monitor,
+            string_ref(record.process), string_ref(record.class_name), string_ref(record.title)
+        ))
+    header = header_struct.pack(layout_magic, layout_version, len(layout.monitors), len(layout.records), len(strings))
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as file:
+        file.write(header)
+        file.write(body)
+        file.write(strings)
+    os.replace(temp_path, path)
+
+# Function to memory-map a saved layout and decode it; raises ValueError for files it cannot read
+def load_layout(path=default_layout_file):
+    with open(path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size < header_struct.size:
+            raise ValueError(f"{path} is not a layout file")
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            magic, version, monitor_count, window_count, strings_size = header_struct.unpack_from(data, 0)
+            if magic != layout_magic:
+                raise ValueError(f"{path} is not a layout file")
+            if version != layout_version:
+                raise ValueError(f"{path} has layout version {version}, expected {layout_version}")
+            strings_start = header_struct.size + monitor_count * monitor_struct.size + window_count * record_struct.size
+            if strings_start + strings_size > len(data):
+                raise ValueError(f"{path} is truncated")
+
+            decoded = {}
+
+            def string_at(offset):
+                text = decoded.get(offset)
+                if text is None:
+                    start = strings_start + offset
+                    length = string_length_struct.unpack_from(data, start)[0]
+                    start += string_length_struct.size
+                    text = decoded[offset] = data[start:start + length].decode('utf-8', 'replace')
+                return text
+
+            monitors = []
+            for values in monitor_struct.iter_unpack(data[header_struct.size:header_struct.size + monitor_count * monitor_struct.size]):
+                monitors.append((values[:4], values[4:]))
+            records = []
+            records_start = header_struct.size + monitor_count * monitor_struct.size
+            for left, top, right, bottom, alpha, flags, monitor, process, class_name, title in record_struct.iter_unpack(data[records_start:strings_start]):
+                records.append(LayoutRecord(
+                    (left, top, right, bottom), alpha, bool(flags & flag_topmost), bool(flags & flag_layered),
+                    monitor, string_at(process), string_at(class_name), string_at(title)
+                ))
+    return Layout(monitors, records)
+
+# Function to pair saved records with current windows: same process and class, preferring the same title.
+# Builds one lookup table from the index, so matching is linear in the number of windows.
+def match_windows(records, index):
+    groups = {}  # (process, class) -> {title: [hwnd, ...]}
+    for info in index.all():
+        groups.setdefault((info.process.lower(), info.class_name), {}).setdefault(info.title, []).append(info.hwnd)
+    matches = [None] * len(records)
+    # Exact title matches first, so a renamed window does not take another window's place
+    for i, record in enumerate(records):
+        titles = groups.get((record.process.lower(), record.class_name))
+        if titles:
+            hwnds = titles.get(record.title)
+            if hwnds:
+                matches[i] = hwnds.pop()
+                if not hwnds:
+                    del titles[record.title]
+    for i, record in enumerate(records):
+        if matches[i] is None:
+            titles = groups.get((record.process.lower(), record.class_name))
+            if titles:
+                title, hwnds = next(iter(titles.items()))
+                matches[i] = hwnds.pop()
+                if not hwnds:
+                    del titles[title]
+    return matches
+
+# Function to find where a saved rect goes on the current monitors: unchanged if the saved
+# monitor still has the same work area, otherwise scaled onto the monitor in the same position
+def place_rect(rect, saved_monitor, layout, topology):
+    monitors = topology.all()
+    if not monitors or saved_monitor >= len(layout.monitors):
+        return rect
+    saved_rect, saved_work = layout.monitors[saved_monitor]
+    target = monitors[min(saved_monitor, len(monitors) - 1)]
+    if tuple(target.work) == tuple(saved_work):
+        return rect
+    return map_rect(rect, Monitor(None, saved_rect, saved_work, None, saved_monitor), target)
+
+# Function to put matched windows back: every rect and the z-order go out in one deferred batch,
+# opacity is only written where it differs. Returns the number of windows restored.
+def restore_layout(layout, backend, index, topology):
+    matches = match_windows(layout.records, index)
+    restored = [(record, hwnd) for record, hwnd in zip(layout.records, matches) if hwnd is not None]
+    batch = backend.begin_defer(len(restored))
+    previous = {True: None, False: None}  # Last window placed in the topmost and normal bands
+    for record, hwnd in restored:
+        left, top, right, bottom = place_rect(record.rect, record.monitor, layout, topology)
+        batch.set_pos(hwnd, left, top, right - left, bottom - top)
+        # Records are topmost first: the first window of each band goes to its top, the rest follow in order.
+        # HWND_NOTOPMOST does not move a window that is already non-topmost, so those go to HWND_TOP.
+        above = previous[record.topmost]
+        if above is not None:
+            batch.set_insert_after(hwnd, above)
+        elif record.topmost or backend.get_ex_style(hwnd) & WS_EX_TOPMOST:
+            batch.set_topmost(hwnd, record.topmost)
+        else:
+            batch.set_insert_after(hwnd, HWND_TOP)
+        previous[record.topmost] = hwnd
+    batch.commit()
+
+    for record, hwnd in restored:
+        style = backend.get_ex_style(hwnd)
+        if record.layered:
+            if not style & WS_EX_LAYERED:
+                backend.set_ex_style(hwnd, style | WS_EX_LAYERED)
+            if backend.get_layered_alpha(hwnd) != record.alpha:
+                backend.set_layered_alpha(hwnd, record.alpha)
+        elif style & WS_EX_LAYERED:
+            backend.set_ex_style(hwnd, style & ~WS_EX_LAYERED)
+    return len(restored)
@@ -0,0 +1,228 @@
+import json
+import os
+import threading
+from monitors import map_rect
+from window_backend import WS_EX_LAYERED
+
+# Global variables
+default_macro_file = 'macros.json'  # Kept next to settings.json
+macro_slots = 9  # Macros are bound to Ctrl + Alt + Shift + 1..9
+macro_key_prefix = 'ctrl+alt+shift+'
+old_macro_key_prefix = 'ctrl+shift+'  # Used before; Ctrl + Shift + digit switches tabs and keyboard layouts in many apps
+
+# Recorded steps are JSON-friendly lists:
+#   ['move', dx, dy, left, top, right, bottom]  move and/or grow the sides outwards, in pixels
+#   ['opacity', delta]                          change alpha by delta, clamped to 0..255
+#   ['topmost', on]                             set or clear always on top
+#   ['monitor', step]                           move to the monitor `step` places further on
+step_kinds = ('move', 'opacity', 'topmost', 'monitor')
+
+# Function to get the hotkey a macro slot 1..macro_slots is played with
+def macro_key(slot):
+    return f'{macro_key_prefix}{slot}'
+
+# Function to clamp a value to low..high
+def clamp(value, low, high):
+    return low if value < low else high if value > high else value
+
+# A macro reduced to its net effect.
+# program holds the rect changes with adjacent moves summed into one delta and adjacent monitor
+# hops summed into one hop; alpha is (shift, low, high) so the final alpha is
+# clamp(start + shift, low, high) however the steps were clamped on the way; topmost is the last
+# always-on-top state set, or None.
+class CompiledMacro:
+    __slots__ = ('program', 'alpha', 'topmost', 'steps')
+
+    def __init__(self, program, alpha, topmost, steps):
+        self.program = program
+        self.alpha = alpha
+        self.topmost = topmost
+        self.steps = steps
+
+    # Function to work out where a window starting at rect ends up (topology is a MonitorTopology)
+    def final_rect(self, rect, topology):
+        left, top, right, bottom = rect
+        for op in self.program:
+            if op[0] == 'move':
+                dx, dy, grow_left, grow_top, grow_right, grow_bottom = op[1]
+                left, top, right, bottom = left + dx - grow_left, top + dy - grow_top, right + dx + grow_right, bottom + dy + grow_bottom
+            else:
+                current = topology.monitor_from_rect((left, top, right, bottom))
+                target = topology.next_monitor(current, op[1])
+                if target is not None and target is not current:
+                    left, top, right, bottom = map_rect((left, top, right, bottom), current, target)
+        return (left, top, right, bottom)
+
+    def final_alpha(self, alpha):
+        shift, low, high = self.alpha
+        return clamp(alpha + shift, low, high)
+
+# Function to compile recorded steps into a CompiledMacro; raises ValueError for unknown steps
+def compile_macro(steps):
+    program = []
+    alpha = None
+    topmost = None
+    for step in steps:
+        kind = step[0]
+        if kind == 'move':
+            delta = tuple(step[1:7])
+            if program and program[-1][0] == 'move':
+                delta = tuple(a + b for a, b in zip(program[-1][1], delta))
+                program[-1] = ('move', delta)
+            else:
+                program.append(('move', delta))
+        elif kind == 'monitor':
+            if program and program[-1][0] == 'monitor':
+                program[-1] = ('monitor', program[-1][1] + step[1])
+            else:
+                program.append(('monitor', step[1]))
+        elif kind == 'opacity':
+            delta = step[1]
+            if alpha is None:
+                alpha = (delta, 0, 255)
+            else:
+                # clamp(clamp(x + s, lo, hi) + d, 0, 255) == clamp(x + s + d, clamp(lo + d), clamp(hi + d))
+                shift, low, high = alpha
+                alpha = (shift + delta, clamp(low + delta, 0, 255), clamp(high + delta, 0, 255))
+        elif kind == 'topmost':
+            topmost = bool(step[1])
+        else:
+            raise ValueError(f"unknown macro step: {kind!r}")
+    return CompiledMacro(program, alpha, topmost, len(steps))
+
+# Function to replay a compiled macro on windows: every rect and topmost change goes out in one
+# deferred batch, then opacity is written only where it ends up different. Returns the number of windows.
+def apply_macro(compiled, hwnds, backend, topology):
+    batch = backend.begin_defer(len(hwnds))
+    for hwnd in hwnds:
+        if compiled.program:
+            rect = tuple(backend.get_window_rect(hwnd))
+            left, top, right, bottom = compiled.final_rect(rect, topology)
+            if (left, top, right, bottom) != rect:
+                batch.set_pos(hwnd, left, top, right - left, bottom - top)
+        if compiled.topmost is not None:
+            batch.set_topmost(hwnd, compiled.topmost)
+    batch.commit()
+    if compiled.alpha is not None:
+        for hwnd in hwnds:
+            style = backend.get_ex_style(hwnd)
+            layered = bool(style & WS_EX_LAYERED)
+            current = backend.get_layered_alpha(hwnd) if layered else 255  # Not layered means fully opaque
+            alpha = compiled.final_alpha(current)
+            if alpha != current:
+                if not layered:
+                    backend.set_ex_style(hwnd, style | WS_EX_LAYERED)
+                backend.set_layered_alpha(hwnd, alpha)
+    return len(hwnds)
+
+# Collects the steps applied to one window while a macro is being recorded.
+# The hotkey functions call record() for every window they change; only the recorded window counts.
+class MacroRecorder:
+    def __init__(self):
+        self.hwnd = None
+        self.steps = []
+        self._lock = threading.Lock()
+
+    def is_recording(self):
+        return self.hwnd is not None
+
+    def start(self, hwnd):
+        with self._lock:
+            self.hwnd = hwnd
+            self.steps = []
+
+    # Function to stop recording; returns the recorded steps
+    def stop(self):
+        with self._lock:
+            steps = self.steps
+            self.hwnd = None
+            self.steps = []
+        return steps
+
+    def record(self, hwnd, *step):
+        if hwnd == self.hwnd:
+            with self._lock:
+                if hwnd == self.hwnd:
+                    self.steps.append(list(step))
+
+# One saved macro and the hotkey it is bound to
+class Macro:
+    __slots__ = ('name', 'key', 'steps', 'compiled')
+
+    def __init__(self, name, key, steps):
+        self.name = name
+        self.key = key
+        self.steps = steps
+        self.compiled = compile_macro(steps)
+
+# Named macros saved in macros.json; every macro is compiled when it is loaded or added,
+# so replaying one never looks at its steps again
+class MacroStore:
+    def __init__(self, path=default_macro_file):
+        self.path = path
+        self.macros = {}  # name -> Macro
+        self._lock = threading.Lock()
+
+    # Function to read macros.json; a missing file means no macros, a broken one raises ValueError
+    def load(self):
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            data = {}
+        macros = {}
+        for name, entry in data.get('macros', {}).items():
+            key = entry.get('key')
+            if key and key.startswith(old_macro_key_prefix):
+                key = macro_key_prefix + key[len(old_macro_key_prefix):]
+            macros[name] = Macro(name, key, entry['steps'])
+        with self._lock:
+            self.macros = macros
+        return len(macros)
+
+    # Function to write macros.json; the file is replaced in one step
+    def save(self):
+        with self._lock:
+            data = {'macros': {name: {'key': macro.key, 'steps': macro.steps} for name, macro in self.macros.items()}}
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(data, f, indent=1)
+        os.replace(temp_path, self.path)
+
+    # Function to add or replace a macro; a macro already using the key loses it
+    def add(self, name, steps, key=None):
+        macro = Macro(name, key, steps)
+        with self._lock:
+            macros = dict(self.macros)
+            if key is not None:
+                for other in macros.values():
+                    if other.key == key and other.name != name:
+                        other.key = None
+            macros[name] = macro
+            self.macros = macros
+        return macro
+
+    def remove(self, name):
+        with self._lock:
+            macros = dict(self.macros)
+            removed = macros.pop(name, None)
+            self.macros = macros
+        return removed
+
+    def get(self, name):
+        return self.macros.get(name)
+
+    def by_key(self, key):
+        for macro in self.macros.values():
+            if macro.key == key:
+                return macro
+        return None
+
+    # Function to find the first Ctrl + Alt + Shift + digit key no macro is bound to, or None
+    def free_key(self):
+        used = {macro.key for macro in self.macros.values()}
+        for slot in range(1, macro_slots + 1):
+            key = macro_key(slot)
+            if key not in used:
+                return key
+        return None
@@ -0,0 +1,114 @@
+from bisect import bisect_right
+
+# One display in the cached topology
+class Monitor:
+    __slots__ = ('handle', 'rect', 'work', 'dpi', 'index')
+
+    def __init__(self, handle, rect, work, dpi, index):
+        self.handle = handle
+        self.rect = rect
+        self.work = work
+        self.dpi = dpi
+        self.index = index
+
+    def __repr__(self):
+        return f"Monitor({self.handle}, rect={self.rect}, work={self.work}, dpi={self.dpi})"
+
+# Cached monitor layout: work areas, DPI and left-to-right ordering.
+# It is rebuilt lazily after invalidate(), which the backend calls on display changes.
+# Next/previous lookups are list indexing; point lookups go through a grid built
+# from the monitor edges, so they cost two bisects no matter how many windows move.
+class MonitorTopology:
+    def __init__(self, backend):
+        self.backend = backend
+        self.monitors = []
+        self.rebuilds = 0
+        self._stale = True
+        self._by_handle = {}
+        self._xs = []
+        self._ys = []
+        self._grid = []
+
+    def invalidate(self):
+        self._stale = True
+
+    def rebuild(self):
+        found = []
+        for handle, rect, work in self.backend.enum_monitors():
+            found.append((tuple(rect), tuple(work), handle, self.backend.get_monitor_dpi(handle)))
+        found.sort(key=lambda monitor: (monitor[0][0], monitor[0][1]))
+        self.monitors = [Monitor(handle, rect, work, dpi, i) for i, (rect, work, handle, dpi) in enumerate(found)]
+        self._by_handle = {monitor.handle: monitor for monitor in self.monitors}
+
+        # Grid cells between every distinct monitor edge, each mapped to the monitor covering it
+        self._xs = sorted({x for monitor in self.monitors for x in (monitor.rect[0], monitor.rect[2])})
+        self._ys = sorted({y for monitor in self.monitors for y in (monitor.rect[1], monitor.rect[3])})
+        self._grid = [[None] * max(len(self._xs) - 1, 0) for _ in range(max(len(self._ys) - 1, 0))]
+        for monitor in self.monitors:
+            left, top, right, bottom = monitor.rect
+            for row in range(self._ys.index(top), self._ys.index(bottom)):
+                for column in range(self._xs.index(left), self._xs.index(right)):
+                    self._grid[row][column] = monitor
+        self._stale = False
+        self.rebuilds += 1
+
+    def _ensure(self):
+        if self._stale:
+            self.rebuild()
+
+    def get(self, handle):
+        self._ensure()
+        return self._by_handle.get(handle)
+
+    # Function to get every monitor, left to right
+    def all(self):
+        self._ensure()
+        return self.monitors
+
+    # Function to step through monitors in left-to-right order, wrapping around
+    def next_monitor(self, monitor, step=1):
+        self._ensure()
+        if not self.monitors:
+            return None
+        return self.monitors[(monitor.index + step) % len(self.monitors)]
+
+    def previous_monitor(self, monitor):
+        return self.next_monitor(monitor, -1)
+
+    def monitor_from_point(self, x, y):
+        self._ensure()
+        column = bisect_right(self._xs, x) - 1
+        row = bisect_right(self._ys, y) - 1
+        if 0 <= row < len(self._grid) and 0 <= column < len(self._grid[row]):
+            monitor = self._grid[row][column]
+            if monitor is not None:
+                return monitor
+        return self.nearest_monitor(x, y)
+
+    # Function to find the monitor a window belongs to, using the centre of its rect
+    def monitor_from_rect(self, rect):
+        return self.monitor_from_point((rect[0] + rect[2]) // 2, (rect[1] + rect[3]) // 2)
+
+    # Fallback for points in the gaps between monitors
+    def nearest_monitor(self, x, y):
+        self._ensure()
+        nearest = None
+        for monitor in self.monitors:
+            left, top, right, bottom = monitor.rect
+            dx = max(left - x, 0, x - right + 1)
+            dy = max(top - y, 0, y - bottom + 1)
+            if nearest is None or dx * dx + dy * dy < nearest[0]:
+                nearest = (dx * dx + dy * dy, monitor)
+        return nearest[1] if nearest else None
+
+# Function to map a rect from one monitor's work area onto another's, keeping relative position and size
+def map_rect(rect, source, target):
+    src_left, src_top, src_right, src_bottom = source.work
+    dst_left, dst_top, dst_right, dst_bottom = target.work
+    scale_x = (dst_right - dst_left) / (src_right - src_left)
+    scale_y = (dst_bottom - dst_top) / (src_bottom - src_top)
+    left = dst_left + round((rect[0] - src_left) * scale_x)
+    top = dst_top + round((rect[1] - src_top) * scale_y)
+    width = round((rect[2] - rect[0]) * scale_x)
+    height = round((rect[3] - rect[1]) * scale_y)
+    return (left, top, left + width, top + height)
@@ -0,0 +1,209 @@
+import queue
+import threading
+from event_log import log_event
+
+# Long-lived overlay that shows toast messages from one Tk root on its own thread.
+# show() only puts the message on a queue, so it never blocks the hotkey thread.
+# Toast windows are pooled and reused; a toast with the same key is replaced,
+# other toasts stack below each other at the same anchor.
+# The same thread also hosts the window switcher popup.
+class OverlayService:
+    def __init__(self, duration_ms=2000, max_toasts=4, poll_ms=15):
+        self.duration_ms = duration_ms
+        self.max_toasts = max_toasts
+        self.poll_ms = poll_ms
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._failed = False
+        self._active = []  # Visible toasts, oldest first
+        self._pool = []  # Hidden toasts ready for reuse
+        self._switcher = None
+        self.shown = 0
+        self.created = 0
+
+    # Function to queue a toast at screen position (x, y)
+    def show(self, x, y, text, key=None):
+        if self._failed:
+            return
+        if self._thread is None:
+            self.start()
+        self._queue.put(('toast', (x, y, text, key)))
+
+    # Function to open the switcher: search(query) returns WindowInfo matches, activate(hwnd) focuses one
+    def show_switcher(self, search, activate):
+        if self._failed:
+            return
+        if self._thread is None:
+            self.start()
+        self._queue.put(('switcher', (search, activate)))
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._queue.put(None)
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        try:
+            import tkinter as tk
+            self._tk = tk
+            self._root = tk.Tk()
+        except Exception as e:
+            self._failed = True
+            log_event('warning', f"Overlay disabled: {e}", source='overlay')
+            return
+        self._root.withdraw()
+        self._root.after(self.poll_ms, self._drain)
+        self._root.mainloop()
+
+    def _drain(self):
+        while True:
+            try:
+                message = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if message is None:
+                self._root.destroy()
+                return
+            kind, args = message
+            if kind == 'toast':
+                self._show_toast(*args)
+            elif kind == 'switcher':
+                self._show_switcher(*args)
+        self._root.after(self.poll_ms, self._drain)
+
+    def _show_toast(self, x, y, text, key):
+        toast = None
+        if key is not None:
+            toast = next((t for t in self._active if t['key'] == key), None)
+        if toast is None:
+            if len(self._active) >= self.max_toasts:
+                self._hide_toast(self._active[0])
+            toast = self._pool.pop() if self._pool else self._create_toast()
+            toast['key'] = key
+            self._active.append(toast)
+        else:
+            self._root.after_cancel(toast['timer'])
+        toast['anchor'] = (x, y)
+        toast['label'].configure(text=text)
+        toast['timer'] = self._root.after(self.duration_ms, lambda: self._hide_toast(toast))
+        toast['window'].deiconify()
+        toast['window'].lift()
+        self._layout()
+        self.shown += 1
+
+    def _create_toast(self):
+        tk = self._tk
+        window = tk.Toplevel(self._root)
+        window.withdraw()
+        window.overrideredirect(True)
+        window.attributes("-topmost", True)
+        label = tk.Label(window, font=('Helvetica', 12), bg='yellow', fg='black')
+        label.pack()
+        self.created += 1
+        return {'window': window, 'label': label, 'key': None, 'anchor': (0, 0), 'timer': None}
+
+    def _hide_toast(self, toast):
+        if toast not in self._active:
+            return
+        self._root.after_cancel(toast['timer'])
+        self._active.remove(toast)
+        toast['window'].withdraw()
+        self._pool.append(toast)
+        self._layout()
+
+    # Stack toasts that share an anchor below each other
+    def _layout(self):
+        offsets = {}
+        for toast in self._active:
+            x, y = toast['anchor']
+            offset = offsets.get((x, y), 0)
+            toast['window'].update_idletasks()
+            toast['window'].geometry(f"+{x}+{y + offset}")
+            offsets[(x, y)] = offset + toast['window'].winfo_reqheight()
+
+    def _show_switcher(self, search, activate):
+        tk = self._tk
+        if self._switcher is None:
+            window = tk.Toplevel(self._root)
+            window.withdraw()
+            window.overrideredirect(True)
+            window.attributes("-topmost", True)
+            query = tk.StringVar()
+            entry = tk.Entry(window, textvariable=query, font=('Helvetica', 14), width=50, bg='yellow', fg='black')
+            entry.pack(fill='x')
+            listbox = tk.Listbox(window, font=('Helvetica', 11), height=10, activestyle='none')
+            listbox.pack(fill='both')
+            self._switcher = {'window': window, 'query': query, 'entry': entry, 'listbox': listbox, 'results': []}
+            query.trace_add('write', lambda *_: self._refresh_switcher())
+            entry.bind('<Return>', lambda _: self._choose_switcher())
+            entry.bind('<Escape>', lambda _: window.withdraw())
+            entry.bind('<FocusOut>', lambda _: window.withdraw())
+            entry.bind('<Down>', lambda _: self._move_switcher(1))
+            entry.bind('<Up>', lambda _: self._move_switcher(-1))
+        switcher = self._switcher
+        switcher['search'] = search
+        switcher['activate'] = activate
+        switcher['query'].set('')
+        self._refresh_switcher()
+        window = switcher['window']
+        window.update_idletasks()
+        x = (window.winfo_screenwidth() - window.winfo_reqwidth()) // 2
+        window.geometry(f"+{x}+{window.winfo_screenheight() // 4}")
+        window.deiconify()
+        window.lift()
+        window.focus_force()
+        switcher['entry'].focus_set()
+
+    def _refresh_switcher(self):
+        switcher = self._switcher
+        results = switcher['search'](switcher['query'].get())
+        switcher['results'] = results
+        listbox = switcher['listbox']
+        listbox.delete(0, 'end')
+        for info in results:
+            listbox.insert('end', f"{info.title} - {info.process}")
+        if results:
+            listbox.selection_set(0)
+
+    def _move_switcher(self, step):
+        listbox = self._switcher['listbox']
+        size = listbox.size()
+        if not size:
+            return
+        current = listbox.curselection()
+        index = ((current[0] if current else -1) + step) % size
+        listbox.selection_clear(0, 'end')
+        listbox.selection_set(index)
+        listbox.see(index)
+
+    def _choose_switcher(self):
+        switcher = self._switcher
+        selected = switcher['listbox'].curselection()
+        switcher['window'].withdraw()
+        if selected and switcher['results']:
+            try:
+                switcher['activate'](switcher['results'][selected[0]].hwnd)
+            except Exception as e:
+                log_event('error', f"Failed to switch window: {e}", source='overlay')
+
+# Overlay that draws nothing, for benchmarks and headless runs
+class NullOverlay:
+    def show(self, x, y, text, key=None):
+        pass
+
+    def show_switcher(self, search, activate):
+        pass
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
@@ -0,0 +1,276 @@
+import json
+import re
+import threading
+import time
+try:
+    import re._parser as sre_parse  # Python 3.11+
+except ImportError:
+    import sre_parse
+from monitors import map_rect
+from window_backend import WS_EX_LAYERED
+
+# Global variables
+default_rules_file = 'rules.json'  # Kept next to settings.json
+gram_size = 3  # Title-only rules are indexed on one substring of this length their pattern requires
+
+# rules.json holds {"rules": [...]} where every rule has a name, at least one of
+#   "process"  executable name, e.g. "WindowsTerminal.exe" (case-insensitive)
+#   "class"    window class name, exact
+#   "title"    regular expression searched in the title (case-insensitive)
+# and at least one of
+#   "rect"     [left, top, right, bottom]; relative to the work area of "monitor" if given, else screen coordinates
+#   "monitor"  monitor index, left to right from 0; without "rect" the window keeps its relative position
+#   "opacity"  0-255
+#   "topmost"  true or false
+# Rules are checked in file order and the first one that matches a new window is applied to it.
+
+# One rule from rules.json; order is its position in the file
+class Rule:
+    __slots__ = ('order', 'name', 'process', 'class_name', 'title', 'pattern', 'rect', 'monitor', 'opacity', 'topmost')
+
+    def __init__(self, order, entry):
+        self.order = order
+        self.name = entry.get('name', f"Rule {order + 1}")
+        self.process = entry['process'].lower() if entry.get('process') else None
+        self.class_name = entry.get('class') or None
+        self.title = entry.get('title') or None
+        try:
+            self.pattern = re.compile(self.title, re.IGNORECASE) if self.title else None
+        except re.error as e:
+            raise ValueError(f"{self.name}: bad title pattern: {e}")
+        self.rect = tuple(entry['rect']) if entry.get('rect') else None
+        self.monitor = entry.get('monitor')
+        self.opacity = entry.get('opacity')
+        self.topmost = entry.get('topmost')
+        if self.process is None and self.class_name is None and self.pattern is None:
+            raise ValueError(f"{self.name}: needs a process, class or title to match")
+        if self.rect is None and self.monitor is None and self.opacity is None and self.topmost is None:
+            raise ValueError(f"{self.name}: needs a rect, monitor, opacity or topmost to apply")
+        if self.rect is not None and len(self.rect) != 4:
+            raise ValueError(f"{self.name}: rect needs left, top, right and bottom")
+
+    def __repr__(self):
+        return f"Rule({self.order}, {self.name!r})"
+
+    def matches(self, info):
+        return (
+            (self.process is None or info.process.lower() == self.process)
+            and (self.class_name is None or info.class_name == self.class_name)
+            and (self.pattern is None or self.pattern.search(info.title) is not None)
+        )
+
+# Function to read rules.json; a missing file means no rules, a broken one raises ValueError
+def load_rules(path=default_rules_file):
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return []
+    entries = data.get('rules', []) if isinstance(data, dict) else None
+    if not isinstance(entries, list) or not all(isinstance(entry, dict) for entry in entries):
+        raise ValueError(f"{path} should hold {{\"rules\": [{{...}}, ...]}}")
+    return [Rule(order, entry) for order, entry in enumerate(entries)]
+
+# Function to find the longest run of plain characters that every match of a pattern contains, lowercased.
+# Only looks at the top level of the pattern; returns '' when there is no such run.
+def required_literal(pattern):
+    try:
+        parsed = sre_parse.parse(pattern.pattern, pattern.flags)
+    except Exception:
+        return ''
+    longest = ''
+    run = ''
+    for op, value in parsed:
+        if op is sre_parse.LITERAL:
+            run += chr(value).lower()
+            if len(run) > len(longest):
+                longest = run
+        else:
+            run = ''
+    return longest
+
+# Rules indexed so a new window is only checked against rules that can match it.
+# Rules naming a process sit in a dict keyed on the lowercase process name, rules naming only a
+# class in a dict keyed on the class. A rule matching on the title alone is keyed on one
+# gram_size-character piece of text its pattern requires, so only rules whose piece occurs in the
+# title are tried. The few title patterns without such text are compiled into one regex whose
+# alternatives are tried in rule order, so a single match() call finds the first that fits.
+class RuleIndex:
+    def __init__(self, rules=()):
+        self.rules = list(rules)
+        self.by_process = {}
+        self.by_class = {}
+        self.by_gram = {}  # gram -> [(rule, required literal)]
+        title_rules = []
+        self.loose_title_rules = []  # Title patterns with their own groups, which cannot be combined
+        literals = []
+        for rule in self.rules:
+            if rule.process is not None:
+                self.by_process.setdefault(rule.process, []).append(rule)
+            elif rule.class_name is not None:
+                self.by_class.setdefault(rule.class_name, []).append(rule)
+            else:
+                literal = required_literal(rule.pattern)
+                if len(literal) >= gram_size:
+                    literals.append((rule, literal, {literal[i:i + gram_size] for i in range(len(literal) - gram_size + 1)}))
+                elif rule.pattern.groups:
+                    self.loose_title_rules.append(rule)
+                else:
+                    title_rules.append(rule)
+        # Key every rule on the piece of its literal that the fewest literals contain, so a common
+        # word shared by many patterns does not make all of them candidates for every title with it
+        gram_counts = {}
+        for rule, literal, grams in literals:
+            for gram in grams:
+                gram_counts[gram] = gram_counts.get(gram, 0) + 1
+        for rule, literal, grams in literals:
+            gram = min(sorted(grams), key=gram_counts.get)
+            self.by_gram.setdefault(gram, []).append((rule, literal))
+        # Each alternative looks ahead for one pattern, then matches an empty group named after the
+        # rule; the group that took part in the match says which rule it was
+        self.title_rules = {f'r{rule.order}': rule for rule in title_rules}
+        self.title_regex = None
+        if title_rules:
+            combined = '|'.join(f'(?=.*?(?:{rule.title}))(?P<r{rule.order}>)' for rule in title_rules)
+            try:
+                self.title_regex = re.compile(combined, re.IGNORECASE | re.DOTALL)
+            except re.error:
+                self.loose_title_rules = sorted(self.loose_title_rules + title_rules, key=lambda rule: rule.order)
+                self.title_rules = {}
+
+    def __len__(self):
+        return len(self.rules)
+
+    # Function to find the first rule (in file order) that matches a WindowInfo, or None
+    def match(self, info):
+        best = None
+        for rule in self.by_process.get(info.process.lower(), ()):
+            if rule.matches(info):
+                best = rule
+                break
+        for rule in self.by_class.get(info.class_name, ()):
+            if best is not None and rule.order > best.order:
+                break
+            if rule.matches(info):
+                best = rule
+                break
+        if self.by_gram:
+            title = info.title.lower()
+            candidates = []
+            for gram in {title[i:i + gram_size] for i in range(len(title) - gram_size + 1)}:
+                entries = self.by_gram.get(gram)
+                if entries:
+                    # A substring test on the whole literal rules most of them out before any regex runs
+                    candidates.extend(rule for rule, literal in entries if literal in title)
+            if candidates:
+                candidates.sort(key=lambda rule: rule.order)
+                for rule in candidates:
+                    if best is not None and rule.order > best.order:
+                        break
+                    if rule.pattern.search(info.title) is not None:
+                        best = rule
+                        break
+        if self.title_regex is not None:
+            found = self.title_regex.match(info.title)
+            if found is not None:
+                rule = self.title_rules[found.lastgroup]
+                if best is None or rule.order < best.order:
+                    best = rule
+        for rule in self.loose_title_rules:
+            if best is not None and rule.order > best.order:
+                break
+            if rule.matches(info):
+                best = rule
+                break
+        return best
+
+# Function to apply a rule to a window: rect/monitor and topmost in one deferred batch, then opacity
+def apply_rule(rule, hwnd, backend, topology):
+    batch = backend.begin_defer(1)
+    if rule.rect is not None or rule.monitor is not None:
+        monitors = topology.all()
+        target = monitors[min(rule.monitor, len(monitors) - 1)] if rule.monitor is not None and monitors else None
+        if rule.rect is not None:
+            left, top, right, bottom = rule.rect
+            if target is not None:
+                left, top, right, bottom = left + target.work[0], top + target.work[1], right + target.work[0], bottom + target.work[1]
+            batch.set_pos(hwnd, left, top, right - left, bottom - top)
+        elif target is not None:
+            rect = tuple(backend.get_window_rect(hwnd))
+            source = topology.monitor_from_rect(rect)
+            if source is not target:
+                left, top, right, bottom = map_rect(rect, source, target)
+                batch.set_pos(hwnd, left, top, right - left, bottom - top)
+    if rule.topmost is not None:
+        batch.set_topmost(hwnd, bool(rule.topmost))
+    batch.commit()
+    if rule.opacity is not None:
+        style = backend.get_ex_style(hwnd)
+        if not style & WS_EX_LAYERED:
+            backend.set_ex_style(hwnd, style | WS_EX_LAYERED)
+        backend.set_layered_alpha(hwnd, max(0, min(255, rule.opacity)))
+
+# Applies the first matching rule to every window that appears.
+# It listens to window events after the WindowIndex (which reads process, class and title);
+# a window is checked when it is first shown, and again on title changes while it is visible until
+# a rule matched it, since many apps only set their title after the window exists. 'create' is left
+# out: the app still places the window itself before showing it, and hidden helper windows get it too.
+class RuleEngine:
+    def __init__(self, backend=None, index=None, topology=None, rules=()):
+        self.backend = backend
+        self.index = index
+        self.topology = topology
+        self.rule_index = RuleIndex(rules)
+        self.handled = set()  # Windows a rule was applied to
+        self._lock = threading.Lock()
+        self.evaluations = 0
+        self.applied = 0
+        self.match_ns = 0
+        self.max_match_ns = 0
+
+    def set_rules(self, rules):
+        self.rule_index = RuleIndex(rules)
+
+    # Function to (re)load rules.json; returns the number of rules
+    def load(self, path=default_rules_file):
+        self.set_rules(load_rules(path))
+        return len(self.rule_index)
+
+    def on_event(self, event, hwnd):
+        if event == 'destroy':
+            self.handled.discard(hwnd)
+        elif event in ('show', 'name_change') and self.rule_index.rules and hwnd not in self.handled:
+            # The index only holds visible windows, so a title change of a hidden window finds nothing
+            info = self.index.get(hwnd)
+            if info is None and event == 'show':
+                info = self.index.add(hwnd)
+            if info is not None:
+                self.evaluate(info)
+
+    # Function to match one window against the rules and apply the rule that fits; returns it or None
+    def evaluate(self, info):
+        start = time.perf_counter_ns()
+        rule = self.rule_index.match(info)
+        elapsed = time.perf_counter_ns() - start
+        with self._lock:
+            self.evaluations += 1
+            self.match_ns += elapsed
+            if elapsed > self.max_match_ns:
+                self.max_match_ns = elapsed
+            if rule is not None:
+                if info.hwnd in self.handled:
+                    return None
+                self.handled.add(info.hwnd)
+                self.applied += 1
+        if rule is not None:
+            apply_rule(rule, info.hwnd, self.backend, self.topology)
+        return rule
+
+    def stats(self):
+        return {
+            'rules': len(self.rule_index),
+            'evaluations': self.evaluations,
+            'applied': self.applied,
+            'mean_match_us': self.match_ns / self.evaluations / 1000 if self.evaluations else 0.0,
+            'max_match_us': self.max_match_ns / 1000,
+        }
@@ -0,0 +1,193 @@
+import struct
+import threading
+import time
+
+# Global variables
+default_trace_file = 'session.wct'
+trace_magic = b'WCTR'
+trace_version = 1
+
+# File layout (little endian): a header, then records as they happen, each record_struct
+# (kind, string id, ns since the trace started, value) optionally followed by a payload.
+# Strings are defined by a record the first time they are used, so the file can be written as a
+# stream and a trace cut short by a crash is still readable up to its last whole record.
+header_struct = struct.Struct('<4sHHd')  # magic, version, unused, wall-clock start time
+record_struct = struct.Struct('<BIQI')
+monitor_struct = struct.Struct('<8iI')  # monitor rect, work area, dpi
+window_struct = struct.Struct('<4iIIII')  # rect, pid, title/class/process string ids
+
+# Record kinds
+kind_string = 0  # id: new string id; value: byte length, followed by the UTF-8 bytes
+kind_monitor = 1  # followed by monitor_struct
+kind_window = 2  # value: hwnd, followed by window_struct; the windows open when tracing started
+kind_hotkey = 3  # id: combo; value: foreground window when the key was pressed
+kind_call = 4  # id: backend method; value: duration in ns; time: when the call started
+kind_event = 5  # id: window event name; value: hwnd
+traced_events = ('create', 'destroy', 'show', 'hide', 'foreground', 'name_change')  # location_change is left out: it echoes every move
+
+# Writes a compact binary trace of a session: the monitors and windows at the start, every
+# hotkey press, every window event and every backend call with its duration.
+# All writes go through one lock into a buffered file; nothing is read back while recording.
+class TraceRecorder:
+    def __init__(self, path=default_trace_file, clock=time.perf_counter_ns):
+        self.path = path
+        self.clock = clock
+        self.file = open(path, 'wb', buffering=1 << 16)
+        self.file.write(header_struct.pack(trace_magic, trace_version, 0, time.time()))
+        self.started = clock()
+        self.records = 0
+        self._strings = {}
+        self._lock = threading.Lock()
+
+    # Function to get the id of a string, writing its definition the first time; call with the lock held
+    def _string(self, text):
+        string_id = self._strings.get(text)
+        if string_id is None:
+            string_id = self._strings[text] = len(self._strings)
+            encoded = text.encode('utf-8')
+            self.file.write(record_struct.pack(kind_string, string_id, 0, len(encoded)))
+            self.file.write(encoded)
+        return string_id
+
+    def _write(self, kind, text, at, value, payload=b''):
+        with self._lock:
+            if self.file.closed:
+                return
+            self.file.write(record_struct.pack(kind, self._string(text) if text is not None else 0, max(0, at - self.started), value & 0xFFFFFFFF))
+            if payload:
+                self.file.write(payload)
+            self.records += 1
+
+    # Function to record the monitors and the windows that are open now
+    def snapshot(self, backend, index, topology):
+        for monitor in topology.all():
+            self._write(kind_monitor, None, self.clock(), 0, monitor_struct.pack(*monitor.rect, *monitor.work, monitor.dpi or 96))
+        for info in index.all():
+            try:
+                rect = tuple(backend.get_window_rect(info.hwnd))
+            except Exception:
+                continue  # Closed while we were looking
+            with self._lock:
+                payload = window_struct.pack(*rect, info.pid, self._string(info.title), self._string(info.class_name), self._string(info.process))
+            self._write(kind_window, None, self.clock(), info.hwnd, payload)
+
+    def hotkey(self, combo, hwnd):
+        self._write(kind_hotkey, combo, self.clock(), hwnd or 0)
+
+    def call(self, name, start, duration):
+        self._write(kind_call, name, start, min(duration, 0xFFFFFFFF))
+
+    def event(self, event, hwnd):
+        if event in traced_events:
+            self._write(kind_event, event, self.clock(), hwnd or 0)
+
+    # Function to wrap a backend so the listed methods (and deferred batch commits) are recorded
+    def trace_calls(self, backend, method_names):
+        return _TraceProxy(self, backend, method_names)
+
+    def close(self):
+        with self._lock:
+            if not self.file.closed:
+                self.file.close()
+
+# Stand-in for a backend whose listed methods are recorded; other attributes pass through
+class _TraceProxy:
+    def __init__(self, recorder, target, method_names):
+        self._recorder = recorder
+        self._target = target
+        for method_name in method_names:
+            method = getattr(target, method_name, None)
+            if method is not None:
+                setattr(self, method_name, _traced_method(recorder, method, method_name))
+
+    def __getattr__(self, name):
+        return getattr(self._target, name)
+
+    # Deferred batches do their work in commit(), so that is what gets recorded
+    def begin_defer(self, count):
+        batch = self._target.begin_defer(count)
+        commit = batch.commit
+        recorder = self._recorder
+
+        def traced_commit():
+            start = recorder.clock()
+            commit()
+            recorder.call('commit_defer', start, recorder.clock() - start)
+
+        batch.commit = traced_commit
+        return batch
+
+# Function to build a recorded version of one method; kept flat because it runs on every backend call
+def _traced_method(recorder, method, name):
+    clock = recorder.clock
+    record = recorder.call
+
+    def traced(*args, **kwargs):
+        start = clock()
+        result = method(*args, **kwargs)
+        record(name, start, clock() - start)
+        return result
+    return traced
+
+# A trace read back from a file. Times are ns since the trace started.
+class Trace:
+    def __init__(self):
+        self.started_at = 0.0  # Wall-clock time the trace started
+        self.monitors = []  # (rect, work, dpi)
+        self.windows = []  # (hwnd, rect, pid, title, class name, process)
+        self.hotkeys = []  # (time, combo, hwnd)
+        self.calls = []  # (time, method, duration)
+        self.events = []  # (time, event, hwnd)
+        self.truncated = False
+
+# Function to read a trace file; raises ValueError for files it cannot read
+def load_trace(path=default_trace_file):
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < header_struct.size:
+        raise ValueError(f"{path} is not a trace file")
+    magic, version, _, started_at = header_struct.unpack_from(data, 0)
+    if magic != trace_magic:
+        raise ValueError(f"{path} is not a trace file")
+    if version != trace_version:
+        raise ValueError(f"{path} has trace version {version}, expected {trace_version}")
+    trace = Trace()
+    trace.started_at = started_at
+    strings = []
+    offset = header_struct.size
+    end = len(data)
+    while offset < end:
+        if offset + record_struct.size > end:
+            trace.truncated = True
+            break
+        kind, string_id, at, value = record_struct.unpack_from(data, offset)
+        offset += record_struct.size
+        if kind == kind_string:
+            if offset + value > end:
+                trace.truncated = True
+                break
+            strings.append(data[offset:offset + value].decode('utf-8', 'replace'))
+            offset += value
+        elif kind == kind_call:
+            trace.calls.append((at, strings[string_id], value))
+        elif kind == kind_hotkey:
+            trace.hotkeys.append((at, strings[string_id], value))
+        elif kind == kind_event:
+            trace.events.append((at, strings[string_id], value))
+        elif kind == kind_window:
+            if offset + window_struct.size > end:
+                trace.truncated = True
+                break
+            left, top, right, bottom, pid, title, class_name, process = window_struct.unpack_from(data, offset)
+            offset += window_struct.size
+            trace.windows.append((value, (left, top, right, bottom), pid, strings[title], strings[class_name], strings[process]))
+        elif kind == kind_monitor:
+            if offset + monitor_struct.size > end:
+                trace.truncated = True
+                break
+            values = monitor_struct.unpack_from(data, offset)
+            offset += monitor_struct.size
+            trace.monitors.append((values[:4], values[4:8], values[8]))
+        else:
+            raise ValueError(f"{path} has an unknown record kind {kind} at byte {offset - record_struct.size}")
+    return trace
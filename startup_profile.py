@@ -0,0 +1,56 @@
+import builtins
+import sys
+import threading
+import time
+
+# Records how long startup takes: every module imported for the first time (nested under the
+# module that imported it) and named init steps marked with mark().
+# It hooks builtins.__import__ only when enabled, so it costs nothing otherwise.
+class StartupProfile:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.started = time.perf_counter()
+        self.imports = []  # [depth, module name, seconds], in the order the imports started
+        self.marks = []  # (label, seconds since started)
+        self._depth = 0
+        self._thread = threading.get_ident()
+        self._original_import = builtins.__import__
+        if enabled:
+            builtins.__import__ = self._import
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules or threading.get_ident() != self._thread:
+            return self._original_import(name, globals, locals, fromlist, level)
+        entry = [self._depth, name, 0.0]
+        self.imports.append(entry)
+        self._depth += 1
+        start = time.perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            entry[2] = time.perf_counter() - start
+            self._depth -= 1
+
+    # Function to note that an init step finished
+    def mark(self, label):
+        if self.enabled:
+            self.marks.append((label, time.perf_counter() - self.started))
+
+    def stop(self):
+        if builtins.__import__ == self._import:
+            builtins.__import__ = self._original_import
+
+    # Function to print imports slower than min_ms and the time between marks
+    def report(self, min_ms=1.0, file=None):
+        if not self.enabled:
+            return
+        self.stop()
+        file = file or sys.stdout
+        print("Startup profile (ms):", file=file)
+        for depth, name, seconds in self.imports:
+            if seconds * 1000 >= min_ms:
+                print(f"  {'  ' * depth}import {name:{max(1, 30 - 2 * depth)}s} {seconds * 1000:8.1f}", file=file)
+        previous = 0.0
+        for label, seconds in self.marks:
+            print(f"  {label:38s} {(seconds - previous) * 1000:8.1f}  (at {seconds * 1000:.1f})", file=file)
+            previous = seconds
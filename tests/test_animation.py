@@ -0,0 +1,89 @@
+from animation import Animator
+
+# Fake window backend that records every SetWindowPos
+class FakeWindows:
+    def __init__(self):
+        self.rects = {}
+        self.writes = []
+
+    def get_window_rect(self, hwnd):
+        return self.rects.setdefault(hwnd, (0, 0, 100, 100))
+
+    def set_window_pos(self, hwnd, x, y, width, height):
+        self.rects[hwnd] = (x, y, x + width, y + height)
+        self.writes.append((hwnd, self.rects[hwnd]))
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+# Function to build an animator at 100 frames per second with a linear 100 ms step
+def make_animator():
+    windows = FakeWindows()
+    clock = Clock()
+    animator = Animator(windows, rate=100, duration=0.1, easing=lambda t: t, clock=clock)
+    return animator, windows, clock
+
+# Function to draw every frame on time until nothing moves
+def run(animator, clock):
+    while animator.time_until_due(clock.now) is not None:
+        clock.now += animator.time_until_due(clock.now)
+        animator.poll(clock.now)
+
+def test_frames_on_time_drop_nothing():
+    animator, windows, clock = make_animator()
+    animator.add(1, dx=100)
+    run(animator, clock)
+    assert windows.rects[1] == (100, 0, 200, 100)
+    assert animator.stats()['dropped_frames'] == 0
+    assert len(windows.writes) == 10  # One per 10 ms frame of the 100 ms step
+
+def test_late_frames_are_skipped_not_queued():
+    animator, windows, clock = make_animator()
+    animator.add(1, dx=100)
+    animator.poll(clock.now)  # First frame right away
+    clock.now = 0.05  # The app was busy for five frames
+    animator.poll(clock.now)
+    assert windows.rects[1] == (50, 0, 150, 100)  # Where the clock says, not one frame further
+    assert animator.stats()['dropped_frames'] == 4
+    clock.now = 0.1
+    animator.poll(clock.now)
+    assert windows.rects[1] == (100, 0, 200, 100)
+    assert len(windows.writes) == 2  # The first frame is still at the start rect
+    assert not animator.is_animating()
+
+def test_press_while_moving_retargets_from_current_position():
+    animator, windows, clock = make_animator()
+    animator.add(1, dx=100)
+    animator.poll(clock.now)
+    clock.now = 0.05
+    animator.poll(clock.now)
+    animator.add(1, dx=100)
+    assert animator.stats()['retargets'] == 1
+    run(animator, clock)
+    assert windows.rects[1] == (200, 0, 300, 100)
+    xs = [rect[0] for _, rect in windows.writes]
+    assert xs == sorted(xs)  # Never jumps back to where the first step started
+
+def test_each_window_written_once_per_frame():
+    animator, windows, clock = make_animator()
+    animator.add(1, dx=100)
+    animator.add(2, dy=100)
+    animator.add(1, dy=50)
+    run(animator, clock)
+    frames = animator.stats()['frames']
+    assert sum(1 for hwnd, _ in windows.writes if hwnd == 1) <= frames
+    assert sum(1 for hwnd, _ in windows.writes if hwnd == 2) <= frames
+    assert windows.rects[1] == (100, 50, 200, 150)
+    assert windows.rects[2] == (0, 100, 100, 200)
+
+def test_finish_puts_windows_at_their_target():
+    animator, windows, clock = make_animator()
+    animator.add(1, right=40)
+    animator.poll(clock.now)
+    animator.finish()
+    assert windows.rects[1] == (0, 0, 140, 100)
+    assert animator.time_until_due(clock.now) is None
@@ -0,0 +1,99 @@
+import json
+import os
+import pytest
+import config_store
+from config_store import ConfigStore, read_config, read_generation, write_config
+
+# Function to make a store on files in tmp_path; the debounce is long so only flush() writes
+def make_store(tmp_path, **options):
+    options.setdefault('debounce', 60)
+    return ConfigStore(str(tmp_path / 'settings.json'), move_pixels_file=str(tmp_path / 'move_pixels.txt'), **options)
+
+# Function to give a file a new mtime, so its stamp changes even on coarse file system clocks
+def bump_mtime(path, seconds=10):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + seconds * 10 ** 9))
+
+def test_write_config_puts_version_and_generation_first(tmp_path):
+    path = str(tmp_path / 'settings.json')
+    write_config(path, 7, {'theme': 'light', 'generation': 99, 'move_pixels': 10})
+    assert read_generation(path) == 7
+    assert read_config(path) == (7, {'move_pixels': 10, 'theme': 'light', 'background_color': '#000000', 'font_color': '#00FF00'})
+    assert os.listdir(tmp_path) == ['settings.json']  # No temporary file left behind
+
+def test_failed_replace_keeps_the_old_file(tmp_path, monkeypatch):
+    path = str(tmp_path / 'settings.json')
+    write_config(path, 1, {'theme': 'dark'})
+
+    def refuse(source, target):
+        raise PermissionError("file is open")
+    monkeypatch.setattr(config_store.os, 'replace', refuse)
+    monkeypatch.setattr(config_store.time, 'sleep', lambda seconds: None)
+    with pytest.raises(PermissionError):
+        write_config(path, 2, {'theme': 'light'})
+    assert read_config(path)[0] == 1
+    assert os.listdir(tmp_path) == ['settings.json']
+
+def test_burst_of_changes_is_written_once(tmp_path):
+    store = make_store(tmp_path)
+    for pixels in range(10, 60, 10):
+        store.set_move_pixels(pixels)
+    store.save_settings({'theme': 'light'})
+    assert store.get('move_pixels') == 50  # Applied in memory right away
+    assert store.stats()['writes'] == 0
+    assert store.flush()
+    assert not store.flush()
+    assert store.stats()['writes'] == 1
+    assert read_config(store.settings_file) == (1, dict(store._values))
+
+def test_touched_file_with_the_same_generation_is_not_parsed(tmp_path):
+    store = make_store(tmp_path)
+    store.save_settings({'theme': 'light'})
+    store.flush()
+    parses = store.stats()['parses']
+    bump_mtime(store.settings_file)
+    assert store.reload() == {}
+    assert store.stats()['parses'] == parses
+    assert store.stats()['skipped_parses'] == 1
+
+def test_new_generation_is_parsed_and_announced(tmp_path):
+    store = make_store(tmp_path)
+    store.save_settings({'theme': 'dark'})
+    store.flush()
+    changes = []
+    store.subscribe(lambda key, value: changes.append((key, value)))
+    write_config(store.settings_file, store.generation + 1, dict(store._values, font_color='#FFFFFF'))
+    bump_mtime(store.settings_file)
+    assert store.reload() == {'font_color': '#FFFFFF'}
+    assert changes == [('font_color', '#FFFFFF')]
+    assert store.generation == 2
+
+def test_pending_changes_win_over_the_file(tmp_path):
+    store = make_store(tmp_path)
+    store.save_settings({'theme': 'light'})
+    write_config(store.settings_file, 5, {'theme': 'dark'})
+    assert store.reload() == {}
+    assert store.get('theme') == 'light'
+    store.flush()
+    assert read_config(store.settings_file)[1]['theme'] == 'light'
+
+def test_broken_file_keeps_the_values(tmp_path):
+    store = make_store(tmp_path)
+    store.save_settings({'theme': 'light'})
+    store.flush()
+    with open(store.settings_file, 'w') as f:
+        f.write('{"version": 1, "generation": 9, "theme": ')
+    bump_mtime(store.settings_file)
+    assert store.reload() == {}
+    assert store.get('theme') == 'light'
+
+def test_old_layout_reads_move_pixels_txt_until_written(tmp_path):
+    with open(tmp_path / 'settings.json', 'w') as f:
+        json.dump({'theme': 'light'}, f)
+    with open(tmp_path / 'move_pixels.txt', 'w') as f:
+        f.write('25')
+    store = make_store(tmp_path)
+    assert store.get('move_pixels') == 25 and store.get('theme') == 'light'
+    store.set_move_pixels(30)
+    store.flush()
+    assert read_config(store.settings_file) == (1, dict(store._values))
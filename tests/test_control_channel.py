@@ -0,0 +1,68 @@
+import asyncio
+import json
+import os
+import socket
+import control_channel
+from control_channel import AsyncControlServer, ControlClient, ControlServer, handle_line, handle_request, read_token, write_token
+
+handlers = {'echo': lambda text='': text}
+
+def test_request_with_the_token_runs():
+    assert handle_request(handlers, {'cmd': 'echo', 'args': {'text': 'hi'}, 'token': 'secret'}, 'secret') == {'ok': True, 'result': 'hi'}
+
+def test_request_without_or_with_a_wrong_token_is_refused():
+    for request in ({'cmd': 'echo'}, {'cmd': 'echo', 'token': 'guess'}, {'cmd': 'echo', 'token': None}, {'cmd': 'echo', 'token': 'secret!'}):
+        assert handle_request(handlers, request, 'secret') == {'ok': False, 'error': "not authorized"}
+
+def test_no_token_configured_accepts_any_request():
+    assert handle_request(handlers, {'cmd': 'echo', 'args': {'text': 'x'}}) == {'ok': True, 'result': 'x'}
+
+def test_refused_request_keeps_its_id():
+    response = json.loads(handle_line(handlers, json.dumps({'cmd': 'echo', 'id': 7}).encode(), 'secret'))
+    assert response == {'ok': False, 'error': "not authorized", 'id': 7}
+
+def test_token_file_round_trip(tmp_path, monkeypatch):
+    monkeypatch.setattr(control_channel, 'token_folder', str(tmp_path))
+    assert read_token(1234) is None
+    token = write_token(1234)
+    assert read_token(1234) == token
+    assert write_token(1234) != token  # Every session gets a new one
+    if os.name == 'posix':
+        assert os.stat(control_channel.token_path(1234)).st_mode & 0o777 == 0o600
+
+# Function to send raw request lines and read one response per line
+def exchange(port, requests):
+    with socket.create_connection(('127.0.0.1', port), timeout=5) as sock:
+        stream = sock.makefile('rwb')
+        for request in requests:
+            stream.write((json.dumps(request) + '\n').encode())
+        stream.flush()
+        return [json.loads(stream.readline()) for _ in requests]
+
+def test_threaded_server_checks_the_token():
+    server = ControlServer(handlers, port=0, token='secret')
+    server.start()
+    try:
+        assert exchange(server.port, [{'cmd': 'echo', 'args': {'text': 'a'}}, {'cmd': 'echo', 'args': {'text': 'b'}, 'token': 'secret'}]) == [
+            {'ok': False, 'error': "not authorized"}, {'ok': True, 'result': 'b'}]
+        client = ControlClient(server.port, token='secret')
+        assert client.request('echo', text='c') == {'ok': True, 'result': 'c'}
+        client.close()
+    finally:
+        server.stop()
+
+def test_async_server_checks_the_token_inline_and_in_the_executor():
+    async def run():
+        server = AsyncControlServer(handlers, port=0, inline=('echo',), token='secret')
+        await server.start()
+        try:
+            requests = [{'cmd': 'echo', 'token': 'wrong'}, {'cmd': 'echo', 'args': {'text': 'ok'}, 'token': 'secret'}]
+            inline = await asyncio.to_thread(exchange, server.port, requests)
+            server.inline = frozenset()
+            in_executor = await asyncio.to_thread(exchange, server.port, requests)
+        finally:
+            await server.stop()
+        return inline, in_executor
+
+    expected = [{'ok': False, 'error': "not authorized"}, {'ok': True, 'result': 'ok'}]
+    assert asyncio.run(run()) == (expected, expected)
@@ -0,0 +1,133 @@
+import threading
+from overlay import OverlayService
+
+# Stand-ins for the tkinter objects the overlay thread uses, so the queue can be tested without a display
+class FakeRoot:
+    def __init__(self):
+        self.timers = {}
+        self.destroyed = False
+
+    def after(self, ms, callback):
+        timer = len(self.timers) + 1
+        self.timers[timer] = callback
+        return timer
+
+    def after_cancel(self, timer):
+        self.timers.pop(timer, None)
+
+    def destroy(self):
+        self.destroyed = True
+
+class FakeToplevel:
+    def __init__(self, root):
+        self.visible = False
+        self.position = None
+
+    def withdraw(self):
+        self.visible = False
+
+    def deiconify(self):
+        self.visible = True
+
+    def overrideredirect(self, flag):
+        pass
+
+    def attributes(self, *args):
+        pass
+
+    def lift(self):
+        pass
+
+    def update_idletasks(self):
+        pass
+
+    def geometry(self, spec):
+        self.position = tuple(int(part) for part in spec.split('+')[1:])
+
+    def winfo_reqheight(self):
+        return 20
+
+class FakeLabel:
+    def __init__(self, window, **options):
+        self.text = None
+
+    def pack(self):
+        pass
+
+    def configure(self, text):
+        self.text = text
+
+class FakeTk:
+    Toplevel = FakeToplevel
+    Label = FakeLabel
+
+# Function to build an overlay whose thread is "running" on fakes; messages are handled by _drain()
+def make_overlay(**options):
+    overlay = OverlayService(**options)
+    overlay._thread = threading.current_thread()
+    overlay._tk = FakeTk
+    overlay._root = FakeRoot()
+    return overlay
+
+def texts(overlay):
+    return [toast['label'].text for toast in overlay._active]
+
+def test_show_only_queues():
+    overlay = make_overlay()
+    overlay.show(10, 20, "moved")
+    assert overlay._queue.qsize() == 1
+    assert overlay.shown == 0 and overlay.created == 0
+    overlay._drain()
+    assert overlay._queue.empty()
+    assert texts(overlay) == ["moved"]
+    assert overlay._active[0]['window'].visible
+
+def test_same_key_replaces_toast():
+    overlay = make_overlay()
+    overlay.show(10, 20, "opacity 90%", key='opacity')
+    overlay.show(10, 20, "opacity 80%", key='opacity')
+    overlay._drain()
+    assert texts(overlay) == ["opacity 80%"]
+    assert overlay.created == 1
+    assert overlay.shown == 2
+
+def test_other_toasts_stack_below_each_other():
+    overlay = make_overlay()
+    overlay.show(10, 20, "first")
+    overlay.show(10, 20, "second")
+    overlay._drain()
+    assert [toast['window'].position for toast in overlay._active] == [(10, 20), (10, 40)]
+
+def test_oldest_toast_makes_room_and_windows_are_reused():
+    overlay = make_overlay(max_toasts=2)
+    for text in ("a", "b", "c"):
+        overlay.show(0, 0, text)
+    overlay._drain()
+    assert texts(overlay) == ["b", "c"]
+    assert overlay.created == 2
+
+def test_expired_toast_goes_back_to_the_pool():
+    overlay = make_overlay()
+    overlay.show(0, 0, "gone soon")
+    overlay._drain()
+    toast = overlay._active[0]
+    overlay._root.timers[toast['timer']]()
+    assert overlay._active == [] and overlay._pool == [toast]
+    assert not toast['window'].visible
+    overlay.show(0, 0, "again")
+    overlay._drain()
+    assert overlay._active == [toast] and overlay.created == 1
+
+def test_stop_message_destroys_root():
+    overlay = make_overlay()
+    overlay.show(0, 0, "last")
+    overlay._queue.put(None)
+    overlay._drain()
+    assert overlay._root.destroyed
+    assert texts(overlay) == ["last"]
+
+def test_show_after_failure_is_dropped():
+    overlay = make_overlay()
+    overlay._failed = True
+    overlay.show(0, 0, "nobody sees this")
+    assert overlay._queue.empty()
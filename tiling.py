@@ -0,0 +1,123 @@
+import numpy as np
+
+# Global variables
+tile_layouts = ('grid', 'columns', 'master_stack', 'golden')
+default_gap = 8  # Pixels between windows at 96 DPI
+default_margin = 8  # Pixels between windows and the work area edge at 96 DPI
+default_master_ratio = 0.6  # Share of the width the master window gets in master_stack
+golden_ratio = (5 ** 0.5 - 1) / 2  # 0.618...
+golden_depth = 4  # Windows laid out as a spiral before the rest share a grid
+skipped_classes = {'Shell_TrayWnd', 'Shell_SecondaryTrayWnd', 'Progman', 'WorkerW'}  # Taskbars and the desktop
+
+# Function to number the windows of each monitor 0, 1, 2... in the order they were given
+def rank_within_monitor(monitor, counts):
+    order = np.argsort(monitor, kind='stable')
+    starts = np.cumsum(counts) - counts
+    rank = np.empty_like(monitor)
+    rank[order] = np.arange(len(monitor)) - starts[monitor[order]]
+    return rank
+
+# Cells for every window as fractions (x, y, width, height) of its monitor's tiling area
+def grid_cells(rank, n):
+    cols = np.ceil(np.sqrt(n))
+    rows = np.ceil(n / cols)
+    row = rank // cols
+    col = rank - row * cols
+    # The last row may be short; its windows share the full width
+    in_row = np.where(row == rows - 1, n - cols * (rows - 1), cols)
+    return col / in_row, row / rows, 1 / in_row, 1 / rows
+
+def column_cells(rank, n):
+    return rank / n, np.zeros_like(rank), 1 / n, np.ones_like(rank)
+
+def master_stack_cells(rank, n, master_ratio):
+    alone = n == 1
+    master = rank == 0
+    stack = np.maximum(n - 1, 1)
+    width = np.where(alone, 1.0, np.where(master, master_ratio, 1 - master_ratio))
+    x = np.where(master, 0.0, master_ratio)
+    y = np.where(master, 0.0, (rank - 1) / stack)
+    height = np.where(master, 1.0, 1 / stack)
+    return x, y, width, height
+
+# Each window takes the golden share of what is left, splitting width and height in turn.
+# After golden_depth windows (or at the last window) the remainder is shared as a grid,
+# so large counts do not end in slivers.
+def golden_cells(rank, n):
+    splits = np.minimum(n - 1, golden_depth)
+    spiral = rank < splits
+    step = np.minimum(rank, splits)
+    remaining = 1 - golden_ratio
+    left_width = remaining ** ((step + 1) // 2)
+    left_height = remaining ** (step // 2)
+    x = 1 - left_width
+    y = 1 - left_height
+    split_width = spiral & (step % 2 == 0)
+    split_height = spiral & (step % 2 == 1)
+    width = np.where(split_width, left_width * golden_ratio, left_width)
+    height = np.where(split_height, left_height * golden_ratio, left_height)
+    # The remainder after `splits` steps is the same rect for every window past the spiral
+    grid_x, grid_y, grid_width, grid_height = grid_cells(np.maximum(rank - splits, 0), np.maximum(n - splits, 1))
+    x = np.where(spiral, x, x + grid_x * width)
+    y = np.where(spiral, y, y + grid_y * height)
+    width = np.where(spiral, width, grid_width * width)
+    height = np.where(spiral, height, grid_height * height)
+    return x, y, width, height
+
+# Function to compute tiled rects for many windows at once.
+# monitor[i] is the index into work_areas/dpis of the monitor window i is tiled on; windows keep
+# their order within a monitor (the first one gets the master/largest cell).
+# work_areas is (M, 4) left, top, right, bottom; dpis is (M,). gap and margin are at 96 DPI and
+# scaled per monitor. Returns an (N, 4) int array of left, top, right, bottom.
+def tile_rects(layout, monitor, work_areas, dpis, gap=default_gap, margin=default_margin, master_ratio=default_master_ratio):
+    monitor = np.asarray(monitor, dtype=np.intp)
+    work_areas = np.asarray(work_areas, dtype=np.float64)
+    scale = np.asarray(dpis, dtype=np.float64) / 96
+    counts = np.bincount(monitor, minlength=len(work_areas))
+    rank = rank_within_monitor(monitor, counts).astype(np.float64)
+    n = counts[monitor].astype(np.float64)
+
+    if layout == 'grid':
+        x, y, width, height = grid_cells(rank, n)
+    elif layout == 'columns':
+        x, y, width, height = column_cells(rank, n)
+    elif layout == 'master_stack':
+        x, y, width, height = master_stack_cells(rank, n, master_ratio)
+    elif layout == 'golden':
+        x, y, width, height = golden_cells(rank, n)
+    else:
+        raise ValueError(f"unknown layout: {layout}")
+
+    # Tile the work area grown back by half a gap, then shrink every cell by half a gap:
+    # neighbours end up one gap apart and the outer edges one margin from the work area
+    half_gap = (gap * scale / 2)[monitor]
+    inset = (margin * scale)[monitor] - half_gap
+    area = work_areas[monitor]
+    area_left = area[:, 0] + inset
+    area_top = area[:, 1] + inset
+    area_width = area[:, 2] - area[:, 0] - 2 * inset
+    area_height = area[:, 3] - area[:, 1] - 2 * inset
+
+    rects = np.empty((len(monitor), 4))
+    rects[:, 0] = area_left + x * area_width + half_gap
+    rects[:, 1] = area_top + y * area_height + half_gap
+    rects[:, 2] = area_left + (x + width) * area_width - half_gap
+    rects[:, 3] = area_top + (y + height) * area_height - half_gap
+    return np.rint(rects).astype(np.int64)
+
+# Function to tile windows through the backend in one deferred batch.
+# hwnds are tiled in the given order on the monitor each one is on now (topology is a MonitorTopology).
+def apply_tiling(layout, hwnds, backend, topology, gap=default_gap, margin=default_margin, master_ratio=default_master_ratio):
+    monitors = topology.all()
+    if not hwnds or not monitors:
+        return 0
+    monitor = [topology.monitor_from_rect(backend.get_window_rect(hwnd)).index for hwnd in hwnds]
+    rects = tile_rects(
+        layout, monitor, [m.work for m in monitors], [m.dpi or 96 for m in monitors],
+        gap=gap, margin=margin, master_ratio=master_ratio
+    )
+    batch = backend.begin_defer(len(hwnds))
+    for hwnd, (left, top, right, bottom) in zip(hwnds, rects.tolist()):
+        batch.set_pos(hwnd, left, top, right - left, bottom - top)
+    batch.commit()
+    return len(hwnds)
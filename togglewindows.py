@@ -1,212 +1,761 @@
-import win32gui
-import win32con
-import keyboard
+import sys
+from startup_profile import StartupProfile
+startup = StartupProfile(enabled='--profile-startup' in sys.argv)  # Times the imports below, so it comes first
+import argparse
 import os
-import tkinter as tk
+import threading
+import time
+from config_store import ConfigStore
+from animation import Animator, default_duration
+from coalescer import MoveCoalescer
+from dispatcher import Dispatcher
+from event_log import event_log, log_event
+from overlay import NullOverlay, OverlayService
+from control_channel import ControlServer, default_port, remove_token, write_token
+from instrumentation import Instrumentation, backend_phases, overlay_phases
+from layouts import capture_layout, default_layout_file, load_layout, restore_layout, save_layout
+from macros import MacroRecorder, MacroStore, apply_macro, default_macro_file, macro_key, macro_slots
+from monitors import MonitorTopology, map_rect
+from rules import RuleEngine, default_rules_file
+from session_trace import TraceRecorder
+from window_index import WindowIndex
+from window_state import WindowStateCache, default_ttl
+from window_backend import WS_EX_LAYERED, WS_EX_TOOLWINDOW, SimulatedBackend, Win32Backend
 
 # Global variables
-default_move_pixels = 40  # Default value for moving pixels
+default_refresh_rate = 60  # Used when the monitor refresh rate cannot be read
 resize_pixels = 1  # Fixed pixel increase for resizing
-
-# Function to read move pixels from file
+config = ConfigStore()  # Cached settings.json, reloaded only when it changes
+instrumentation = Instrumentation(enabled=config.get('instrumentation', True))  # Per-action latency histograms
+overlay = instrumentation.instrument_calls(OverlayService(), overlay_phases)  # One Tk root on its own thread for on-screen messages
+paused = False  # Hotkeys are unhooked while paused
+started_at = time.monotonic()
+shutdown_requested = threading.Event()
+backend = None  # WindowBackend used by every handler, set with set_backend()
+window_state = None  # WindowStateCache in front of the backend; it is what `backend` points at
+monitors = None  # Cached MonitorTopology for the current backend
+selection = []  # Saved window selection used by the group hotkeys
+window_index = None  # Event-driven WindowIndex of visible top-level windows
+simulated = False  # With --simulated, hotkeys are kept in simulated_keys instead of hooking the keyboard
+simulated_keys = {}  # combo -> (hook callback, args), pressed with the 'press' control command
+tile_layout = None  # Name of the tiling layout applied last
+macro_recorder = MacroRecorder()  # Records what the hotkeys do to one window while Ctrl + Alt + Shift + R is on
+macro_store = MacroStore(os.path.join(os.path.dirname(config.settings_file), default_macro_file))  # Saved next to settings.json
+rules_file = os.path.join(os.path.dirname(config.settings_file), default_rules_file)  # Per-app rules, next to settings.json
+rule_engine = RuleEngine()  # Applies rules.json to windows as they appear
+tracer = None  # TraceRecorder when started with --trace
+headless = None  # AsyncDaemon running everything on one event loop when started with --headless
+coalescer = MoveCoalescer(None, rate=default_refresh_rate)  # At most one SetWindowPos per window per frame
+animator = Animator(None, rate=default_refresh_rate, duration=config.get('animation_ms', default_duration * 1000) / 1000)  # Eased moves when 'animate' is on
+
+# Function to pick the dispatch lane for a hotkey press: the foreground window as last reported by window events
+def get_lane():
+    return window_index.foreground if window_index else None
+
+dispatcher = Dispatcher(get_lane)  # Runs hotkey actions on worker threads so the keyboard hook returns at once
+
+# Function to get the flush rate: 'refresh_rate' from settings, else the primary monitor's refresh rate
+def get_refresh_rate():
+    rate = config.get('refresh_rate')
+    if rate:
+        return rate
+    return (backend and backend.get_refresh_rate()) or default_refresh_rate
+
+# Function to choose the window backend (Win32 or simulated)
+def set_backend(new_backend):
+    global backend, monitors, window_index, window_state
+    if tracer:
+        new_backend = tracer.trace_calls(new_backend, backend_phases)
+        new_backend.watch_window_events(tracer.event)
+    instrumented = instrumentation.instrument_calls(new_backend, backend_phases)
+    window_state = WindowStateCache(instrumented, ttl=config.get('state_ttl', default_ttl))
+    instrumented.watch_window_events(window_state.on_event)
+    backend = window_state
+    coalescer.backend = backend
+    animator.backend = backend
+    # Queue waits and the deferred window writes are charged to the hotkey action they belong to
+    tracked = instrumentation if instrumentation.enabled else None
+    coalescer.instrumentation = animator.instrumentation = tracked
+    dispatcher.on_start = tracked.queued if tracked else None
+    monitors = MonitorTopology(backend)
+    backend.watch_display_changes(monitors.invalidate)
+    if window_index:
+        window_index.stop()
+    window_index = WindowIndex(backend)
+    window_index.start()
+    rule_engine.backend = backend
+    rule_engine.index = window_index
+    rule_engine.topology = monitors
+    backend.watch_window_events(rule_engine.on_event)  # After the index, so new windows are already read
+    coalescer.set_rate(get_refresh_rate())
+    animator.set_rate(get_refresh_rate())
+
+# Function to get move pixels from the cached config
 def get_move_pixels():
-    if os.path.exists('move_pixels.txt'):
-        with open('move_pixels.txt', 'r') as f:
-            try:
-                return int(f.read().strip())
-            except ValueError:
-                return default_move_pixels
-    return default_move_pixels
+    return config.get('move_pixels')
+
+# Function to pick what applies moves and resizes: the animator if 'animate' is set in settings.json, else the coalescer
+def get_mover():
+    return animator if config.get('animate') else coalescer
+
+# Function to follow refresh rate changes in settings.json
+def on_config_changed(key, value):
+    log_event('info', f"Setting {key} changed to {value}", source='config')
+    if key == 'refresh_rate':
+        coalescer.set_rate(get_refresh_rate())
+        animator.set_rate(get_refresh_rate())
+    elif key == 'animation_ms':
+        animator.duration = (value if value is not None else default_duration * 1000) / 1000
+    elif key == 'state_ttl' and window_state:
+        window_state.ttl = default_ttl if value is None else value
+
+# Function to move and/or resize a window through the mover, recording the step if a macro is being recorded
+def move_window(hwnd, dx=0, dy=0, left=0, top=0, right=0, bottom=0):
+    macro_recorder.record(hwnd, 'move', dx, dy, left, top, right, bottom)
+    get_mover().add(hwnd, dx=dx, dy=dy, left=left, top=top, right=right, bottom=bottom)
 
 # Function to move the window up
 def move_window_up(hwnd):
-    move_pixels = get_move_pixels()
-    rect = win32gui.GetWindowRect(hwnd)
-    win32gui.SetWindowPos(
-        hwnd, None, rect[0], rect[1] - move_pixels, rect[2] - rect[0], rect[3] - rect[1], win32con.SWP_NOZORDER
-    )
+    move_window(hwnd, dy=-get_move_pixels())
 
 # Function to move the window down
 def move_window_down(hwnd):
-    move_pixels = get_move_pixels()
-    rect = win32gui.GetWindowRect(hwnd)
-    win32gui.SetWindowPos(
-        hwnd, None, rect[0], rect[1] + move_pixels, rect[2] - rect[0], rect[3] - rect[1], win32con.SWP_NOZORDER
-    )
+    move_window(hwnd, dy=get_move_pixels())
 
 # Function to move the window left
 def move_window_left(hwnd):
-    move_pixels = get_move_pixels()
-    rect = win32gui.GetWindowRect(hwnd)
-    win32gui.SetWindowPos(
-        hwnd, None, rect[0] - move_pixels, rect[1], rect[2] - rect[0], rect[3] - rect[1], win32con.SWP_NOZORDER
-    )
+    move_window(hwnd, dx=-get_move_pixels())
 
 # Function to move the window right
 def move_window_right(hwnd):
-    move_pixels = get_move_pixels()
-    rect = win32gui.GetWindowRect(hwnd)
-    win32gui.SetWindowPos(
-        hwnd, None, rect[0] + move_pixels, rect[1], rect[2] - rect[0], rect[3] - rect[1], win32con.SWP_NOZORDER
-    )
+    move_window(hwnd, dx=get_move_pixels())
 
 # Function to resize window
 def resize_window(hwnd, left, right, top, bottom):
     move_pixels = get_move_pixels()
-    rect = win32gui.GetWindowRect(hwnd)
-    new_left = rect[0] - (left * move_pixels)
-    new_top = rect[1] - (top * move_pixels)
-    new_right = rect[2] + (right * move_pixels)
-    new_bottom = rect[3] + (bottom * move_pixels)
-    win32gui.SetWindowPos(
-        hwnd, None, new_left, new_top,
-        new_right - new_left, new_bottom - new_top, win32con.SWP_NOZORDER
+    move_window(
+        hwnd, left=left * move_pixels, top=top * move_pixels,
+        right=right * move_pixels, bottom=bottom * move_pixels
     )
 
-# Function to change opacity
+# Function to change opacity; style and alpha come from the state cache, so repeated steps only write
 def change_opacity(hwnd, increase=True):
-    current_style = win32gui.GetWindowLong(hwnd, win32con.GWL_EXSTYLE)
-    if not current_style & win32con.WS_EX_LAYERED:
-        win32gui.SetWindowLong(hwnd, win32con.GWL_EXSTYLE, current_style | win32con.WS_EX_LAYERED)
+    macro_recorder.record(hwnd, 'opacity', 25 if increase else -25)
+    current_style = backend.get_ex_style(hwnd)
+    if not current_style & WS_EX_LAYERED:
+        if increase:
+            return  # Not layered means fully opaque already
+        backend.set_ex_style(hwnd, current_style | WS_EX_LAYERED)
         new_opacity = 255  # Start with 100% opacity
     else:
-        new_opacity = win32gui.GetLayeredWindowAttributes(hwnd)[1]
+        new_opacity = backend.get_layered_alpha(hwnd)
 
     new_opacity = min(255, new_opacity + 25) if increase else max(0, new_opacity - 25)
-    win32gui.SetLayeredWindowAttributes(hwnd, 0, new_opacity, win32con.LWA_ALPHA)
+    backend.set_layered_alpha(hwnd, new_opacity)
 
 # Function to display a message on the screen
 def display_message(hwnd, message):
-    title = win32gui.GetWindowText(hwnd)
-    rect = win32gui.GetWindowRect(hwnd)
-
-    overlay = tk.Tk()
-    overlay.overrideredirect(True)
-    overlay.attributes("-topmost", True)
-    overlay.geometry(f"+{rect[0]}+{rect[1]}")
-
-    label = tk.Label(overlay, text=f"{title}\n{message}", font=('Helvetica', 12), bg='yellow', fg='black')
-    label.pack()
-
-    overlay.update_idletasks()
-    overlay.lift()
-    overlay.after(2000, overlay.destroy)
-    overlay.mainloop()
+    info = window_index.get(hwnd)
+    title = info.title if info else backend.get_window_text(hwnd)  # The index follows title changes
+    rect = backend.get_window_rect(hwnd)
+    overlay.show(rect[0], rect[1], f"{title}\n{message}", key=hwnd)
 
 # Function to toggle always on top
 def toggle_always_on_top(hwnd, always_on_top=True):
-    win32gui.SetWindowPos(
-        hwnd, win32con.HWND_TOPMOST if always_on_top else win32con.HWND_NOTOPMOST,
-        0, 0, 0, 0,
-        win32con.SWP_NOMOVE | win32con.SWP_NOSIZE
-    )
+    macro_recorder.record(hwnd, 'topmost', always_on_top)
+    backend.set_topmost(hwnd, always_on_top)
     display_message(hwnd, "Always on top turned on" if always_on_top else "Always on top turned off")
 
-# Function to move window to another monitor
-def move_to_next_monitor():
-    hwnd = win32gui.GetForegroundWindow()
+# Function to move window to another monitor, keeping its relative position and size
+def move_to_monitor(hwnd, step):
+    macro_recorder.record(hwnd, 'monitor', step)
+    # Moves still waiting for the next frame go out first, or they would be added to the old rect afterwards
+    coalescer.flush_window(hwnd)
+    animator.finish(hwnd)
+    rect = backend.get_window_rect(hwnd)
+    current_monitor = monitors.monitor_from_rect(rect)
+    next_monitor = monitors.next_monitor(current_monitor, step)
+    if next_monitor is not current_monitor:
+        left, top, right, bottom = map_rect(rect, current_monitor, next_monitor)
+        backend.set_window_pos(hwnd, left, top, right - left, bottom - top)
+
+def move_to_next_monitor(hwnd):
     if hwnd:
-        rect = win32gui.GetWindowRect(hwnd)
-        current_monitor = win32api.MonitorFromWindow(hwnd)
-        monitors = win32api.EnumDisplayMonitors()
-
-        next_monitor = None
-        for i, monitor in enumerate(monitors):
-            if monitor[0] == current_monitor and i + 1 < len(monitors):
-                next_monitor = monitors[i + 1]
-                break
+        move_to_monitor(hwnd, 1)
 
-        if next_monitor:
-            next_monitor_rect = next_monitor[2]
-            new_x = next_monitor_rect[0] + (rect[0] - rect[2]) // 2
-            new_y = next_monitor_rect[1] + (rect[1] - rect[3]) // 2
-            win32gui.SetWindowPos(hwnd, None, new_x, new_y, 0, 0, win32con.SWP_NOSIZE | win32con.SWP_NOZORDER)
+def move_to_previous_monitor(hwnd):
+    if hwnd:
+        move_to_monitor(hwnd, -1)
 
 # Hotkey functions
-def move_foreground_window_up():
-    hwnd = win32gui.GetForegroundWindow()
+def move_foreground_window_up(hwnd):
     if hwnd:
         move_window_up(hwnd)
 
-def move_foreground_window_down():
-    hwnd = win32gui.GetForegroundWindow()
+def move_foreground_window_down(hwnd):
     if hwnd:
         move_window_down(hwnd)
 
-def move_foreground_window_left():
-    hwnd = win32gui.GetForegroundWindow()
+def move_foreground_window_left(hwnd):
     if hwnd:
         move_window_left(hwnd)
 
-def move_foreground_window_right():
-    hwnd = win32gui.GetForegroundWindow()
+def move_foreground_window_right(hwnd):
     if hwnd:
         move_window_right(hwnd)
 
-def increase_left_side():
-    hwnd = win32gui.GetForegroundWindow()
+def increase_left_side(hwnd):
     if hwnd:
         resize_window(hwnd, 1, 0, 0, 0)
 
-def increase_right_side():
-    hwnd = win32gui.GetForegroundWindow()
+def increase_right_side(hwnd):
     if hwnd:
         resize_window(hwnd, 0, 1, 0, 0)
 
-def increase_bottom_side():
-    hwnd = win32gui.GetForegroundWindow()
+def increase_bottom_side(hwnd):
     if hwnd:
         resize_window(hwnd, 0, 0, 0, 1)
 
-def increase_top_side():
-    hwnd = win32gui.GetForegroundWindow()
+def increase_top_side(hwnd):
     if hwnd:
         resize_window(hwnd, 0, 0, 1, 0)
 
-def increase_opacity():
-    hwnd = win32gui.GetForegroundWindow()
+def increase_opacity(hwnd):
     if hwnd:
         change_opacity(hwnd, increase=True)
 
-def decrease_opacity():
-    hwnd = win32gui.GetForegroundWindow()
+def decrease_opacity(hwnd):
     if hwnd:
         change_opacity(hwnd, increase=False)
 
-def set_always_on_top():
-    hwnd = win32gui.GetForegroundWindow()
+def set_always_on_top(hwnd):
     if hwnd:
         toggle_always_on_top(hwnd, always_on_top=True)
 
-def remove_always_on_top():
-    hwnd = win32gui.GetForegroundWindow()
+def remove_always_on_top(hwnd):
     if hwnd:
         toggle_always_on_top(hwnd, always_on_top=False)
 
+# Function to get the group of the foreground window: the saved selection, else every window of its process
+def get_window_group(hwnd):
+    if selection:
+        return list(selection)
+    info = window_index.get(hwnd) or window_index.add(hwnd)
+    return window_index.windows_of_pid(info.pid) if info else [hwnd]
+
+# Function to run a per-window action on every window in hwnd's group.
+# Moves and resizes go through the coalescer, which commits the whole group as one deferred batch.
+def apply_to_group(hwnd, action, *args):
+    if hwnd:
+        for member in get_window_group(hwnd):
+            action(member, *args)
+
+# Function to set or clear always on top for a whole group in one deferred batch
+def change_group_always_on_top(hwnd, always_on_top):
+    if hwnd:
+        group = get_window_group(hwnd)
+        batch = backend.begin_defer(len(group))
+        for member in group:
+            macro_recorder.record(member, 'topmost', always_on_top)
+            batch.set_topmost(member, always_on_top)
+        batch.commit()
+        display_message(hwnd, f"Always on top turned {'on' if always_on_top else 'off'} for {len(group)} windows")
+
+# Group hotkey functions
+def move_group_up(hwnd):
+    apply_to_group(hwnd, move_window_up)
+
+def move_group_down(hwnd):
+    apply_to_group(hwnd, move_window_down)
+
+def move_group_left(hwnd):
+    apply_to_group(hwnd, move_window_left)
+
+def move_group_right(hwnd):
+    apply_to_group(hwnd, move_window_right)
+
+def increase_group_left_side(hwnd):
+    apply_to_group(hwnd, resize_window, 1, 0, 0, 0)
+
+def increase_group_right_side(hwnd):
+    apply_to_group(hwnd, resize_window, 0, 1, 0, 0)
+
+def increase_group_bottom_side(hwnd):
+    apply_to_group(hwnd, resize_window, 0, 0, 0, 1)
+
+def increase_group_top_side(hwnd):
+    apply_to_group(hwnd, resize_window, 0, 0, 1, 0)
+
+def increase_group_opacity(hwnd):
+    apply_to_group(hwnd, change_opacity, True)
+
+def decrease_group_opacity(hwnd):
+    apply_to_group(hwnd, change_opacity, False)
+
+def set_group_always_on_top(hwnd):
+    change_group_always_on_top(hwnd, True)
+
+def remove_group_always_on_top(hwnd):
+    change_group_always_on_top(hwnd, False)
+
+# Function to add the foreground window to the saved selection, or remove it if already selected
+def toggle_selected(hwnd):
+    if hwnd:
+        if hwnd in selection:
+            selection.remove(hwnd)
+            display_message(hwnd, f"Removed from selection ({len(selection)} selected)")
+        else:
+            selection.append(hwnd)
+            display_message(hwnd, f"Added to selection ({len(selection)} selected)")
+
+# Function to open the fuzzy window switcher
+def open_window_switcher(hwnd):
+    overlay.show_switcher(window_index.search, backend.set_foreground_window)
+
+def clear_selection(hwnd):
+    selection.clear()
+    if hwnd:
+        display_message(hwnd, "Selection cleared")
+
+# Function to show how a layout save/restore went on hwnd, or in the log without a window
+def report_layout(message, start, hwnd):
+    message = f"{message} in {(time.perf_counter() - start) * 1000:.0f} ms"
+    if hwnd:
+        display_message(hwnd, message)
+    else:
+        log_event('info', message)
+
+# Function to check that a window can be tiled: shown, not minimized, not a tool window and not cloaked by DWM
+def is_tileable(hwnd):
+    try:
+        return (
+            backend.is_window_visible(hwnd)
+            and not backend.is_minimized(hwnd)
+            and not backend.get_ex_style(hwnd) & WS_EX_TOOLWINDOW
+            and not backend.is_cloaked(hwnd)
+        )
+    except Exception:
+        return False  # The window went away
+
+# Function to get the windows to tile: the selection, else every titled window, most recently focused first
+def get_tiling_windows(skipped_classes):
+    if selection:
+        return [hwnd for hwnd in selection if is_tileable(hwnd)]
+    return [info.hwnd for info in window_index.by_recency() if info.title and info.class_name not in skipped_classes and is_tileable(info.hwnd)]
+
+# Function to tile the windows with the next/previous layout in tiling.tile_layouts
+def cycle_tiling(step, hwnd):
+    global tile_layout
+    try:
+        from tiling import apply_tiling, skipped_classes, tile_layouts  # NumPy is only needed once tiling is used
+    except ImportError as e:
+        log_event('warning', f"Tiling is unavailable: {e}")
+        return
+    if tile_layout is None:
+        tile_layout = tile_layouts[0 if step > 0 else -1]
+    else:
+        tile_layout = tile_layouts[(tile_layouts.index(tile_layout) + step) % len(tile_layouts)]
+    options = {}
+    for name in ('gap', 'margin', 'master_ratio'):
+        value = config.get(f'tile_{name}')
+        if value is not None:
+            options[name] = value
+    count = apply_tiling(tile_layout, get_tiling_windows(skipped_classes), backend, monitors, **options)
+    if hwnd:
+        display_message(hwnd, f"Tiled {count} windows: {tile_layout.replace('_', ' ')}")
+
+def tile_next_layout(hwnd):
+    cycle_tiling(1, hwnd)
+
+def tile_previous_layout(hwnd):
+    cycle_tiling(-1, hwnd)
+
+# Function to get the layout file; a relative layout_file setting is taken from the folder settings.json is in
+def get_layout_file():
+    return os.path.join(os.path.dirname(config.settings_file), config.get('layout_file', default_layout_file))
+
+# Function to save position, monitor, opacity, topmost and z-order of every visible window; the result is shown on hwnd
+def save_current_layout(hwnd=None):
+    start = time.perf_counter()
+    layout = capture_layout(backend, window_index, monitors)
+    save_layout(layout, get_layout_file())
+    report_layout(f"Saved layout of {len(layout.records)} windows", start, hwnd)
+    return len(layout.records)
+
+# Function to put every window that is still open back where the saved layout had it
+def restore_saved_layout(hwnd=None):
+    start = time.perf_counter()
+    try:
+        layout = load_layout(get_layout_file())
+    except (OSError, ValueError) as e:
+        report_layout(f"Could not load layout: {e}", start, hwnd)
+        return 0
+    count = restore_layout(layout, backend, window_index, monitors)
+    report_layout(f"Restored {count} of {len(layout.records)} windows", start, hwnd)
+    return count
+
+# Function to start recording a macro on a window (the foreground window by default); returns the window
+def start_macro(hwnd=None):
+    hwnd = hwnd or backend.get_foreground_window()
+    if not hwnd:
+        return None
+    macro_recorder.start(hwnd)
+    return hwnd
+
+# Function to stop recording and save the macro, bound to `key` or the first free Ctrl + Alt + Shift + digit.
+# Returns the saved Macro, or None if nothing was recorded.
+def save_macro(name=None, key=None):
+    steps = macro_recorder.stop()
+    if not steps:
+        return None
+    key = key or macro_store.free_key()
+    name = name or (f"Macro {key.rsplit('+', 1)[1]}" if key else f"Macro {len(macro_store.macros) + 1}")
+    macro = macro_store.add(name, steps, key)
+    macro_store.save()
+    return macro
+
+# Function to replay a saved macro on windows (the foreground window by default); returns the number of windows
+def play_macro(name, hwnds=None):
+    macro = macro_store.get(name)
+    if macro is None:
+        raise ValueError(f"no macro named {name!r}")
+    if hwnds is None:
+        hwnd = backend.get_foreground_window()
+        hwnds = [hwnd] if hwnd else []
+    return apply_macro(macro.compiled, hwnds, backend, monitors) if hwnds else 0
+
+def toggle_macro_recording(hwnd):
+    if macro_recorder.is_recording():
+        macro = save_macro()
+        if macro is None:
+            message = "Macro discarded: nothing was recorded"
+        elif macro.key:
+            message = f"Saved {macro.name} ({len(macro.steps)} steps) on {macro.key.replace('+', ' + ').title()}"
+        else:
+            message = f"Saved {macro.name} ({len(macro.steps)} steps); all {macro_slots} macro keys are taken"
+        if hwnd:
+            display_message(hwnd, message)
+    elif hwnd:
+        start_macro(hwnd)
+        display_message(hwnd, "Recording macro, Ctrl + Alt + Shift + R to stop")
+
+# Function to make the hotkey function that replays the macro bound to a Ctrl + Alt + Shift + digit key
+def macro_hotkey(slot):
+    key = macro_key(slot)
+
+    def play_macro_slot(hwnd):
+        macro = macro_store.by_key(key)
+        if macro and hwnd:
+            apply_macro(macro.compiled, [hwnd], backend, monitors)
+
+    play_macro_slot.__name__ = f'play_macro_{slot}'
+    return play_macro_slot
+
+# Hotkey table, also used to replay scripted key streams in benchmarks.
+# Every function takes the window that was in front when the key was pressed (None if there was none);
+# the Dispatcher reads it once on the hook thread, so queued presses still go to that window after the focus moved.
+hotkeys = {
+    'up': move_foreground_window_up,
+    'down': move_foreground_window_down,
+    'left': move_foreground_window_left,
+    'right': move_foreground_window_right,
+    'shift+left': increase_left_side,
+    'shift+right': increase_right_side,
+    'shift+down': increase_bottom_side,
+    'shift+up': increase_top_side,
+    'ctrl+up': increase_opacity,
+    'ctrl+down': decrease_opacity,
+    'ctrl+left': remove_always_on_top,
+    'ctrl+right': set_always_on_top,
+    'ctrl+shift+m': move_to_next_monitor,
+    'ctrl+alt+shift+m': move_to_previous_monitor,
+    'ctrl+alt+shift+up': move_group_up,  # Not Alt + arrows: those are Back/Forward/Up in browsers and Explorer
+    'ctrl+alt+shift+down': move_group_down,
+    'ctrl+alt+shift+left': move_group_left,
+    'ctrl+alt+shift+right': move_group_right,
+    # Group resize, opacity and always on top stay under Ctrl + Alt + Shift too: Alt + Shift + arrows
+    # select and move lines in editors, Ctrl + Alt + arrows rotate the screen on some graphics drivers
+    'ctrl+alt+shift+home': increase_group_left_side,
+    'ctrl+alt+shift+end': increase_group_right_side,
+    'ctrl+alt+shift+page down': increase_group_bottom_side,
+    'ctrl+alt+shift+page up': increase_group_top_side,
+    'ctrl+alt+shift+=': increase_group_opacity,
+    'ctrl+alt+shift+-': decrease_group_opacity,
+    'ctrl+alt+shift+[': remove_group_always_on_top,
+    'ctrl+alt+shift+]': set_group_always_on_top,
+    'ctrl+alt+s': toggle_selected,
+    'ctrl+alt+x': clear_selection,
+    'ctrl+shift+space': open_window_switcher,
+    'ctrl+alt+shift+s': save_current_layout,  # Ctrl + Shift + S is Save As in most apps, Ctrl + Shift + L a filter/list command
+    'ctrl+alt+shift+l': restore_saved_layout,
+    'ctrl+alt+shift+t': tile_next_layout,  # Ctrl + Shift + T reopens the last tab in browsers
+    'ctrl+alt+shift+y': tile_previous_layout,
+    'ctrl+alt+shift+r': toggle_macro_recording,  # Ctrl + Shift + R is a hard reload in browsers
+}
+hotkeys.update({macro_key(slot): macro_hotkey(slot) for slot in range(1, macro_slots + 1)})
+
+# Queue policy per hotkey action (see Dispatcher); anything not listed is always queued
+dispatch_policies = {
+    'move_foreground_window_up': 'merge',
+    'move_foreground_window_down': 'merge',
+    'move_foreground_window_left': 'merge',
+    'move_foreground_window_right': 'merge',
+    'increase_left_side': 'merge',
+    'increase_right_side': 'merge',
+    'increase_bottom_side': 'merge',
+    'increase_top_side': 'merge',
+    'increase_opacity': 'merge',
+    'decrease_opacity': 'merge',
+    'set_always_on_top': 'replace',
+    'remove_always_on_top': 'replace',
+    'move_to_next_monitor': 'merge',
+    'move_to_previous_monitor': 'merge',
+    'move_group_up': 'merge',
+    'move_group_down': 'merge',
+    'move_group_left': 'merge',
+    'move_group_right': 'merge',
+    'increase_group_left_side': 'merge',
+    'increase_group_right_side': 'merge',
+    'increase_group_bottom_side': 'merge',
+    'increase_group_top_side': 'merge',
+    'increase_group_opacity': 'merge',
+    'decrease_group_opacity': 'merge',
+    'set_group_always_on_top': 'replace',
+    'remove_group_always_on_top': 'replace',
+    'open_window_switcher': 'replace',
+    'save_current_layout': 'replace',
+    'restore_saved_layout': 'replace',
+    'tile_next_layout': 'merge',
+    'tile_previous_layout': 'merge',
+}
+
+# Function to get the hotkey callbacks wrapped with instrumentation
+def instrumented_hotkeys():
+    return {combo: instrumentation.wrap(callback.__name__, callback) for combo, callback in hotkeys.items()}
+
 # Registering hotkeys
 def check_hotkeys():
-    keyboard.add_hotkey('up', move_foreground_window_up)
-    keyboard.add_hotkey('down', move_foreground_window_down)
-    keyboard.add_hotkey('left', move_foreground_window_left)
-    keyboard.add_hotkey('right', move_foreground_window_right)
-    keyboard.add_hotkey('shift+left', increase_left_side)
-    keyboard.add_hotkey('shift+right', increase_right_side)
-    keyboard.add_hotkey('shift+down', increase_bottom_side)
-    keyboard.add_hotkey('shift+up', increase_top_side)
-    keyboard.add_hotkey('ctrl+up', increase_opacity)
-    keyboard.add_hotkey('ctrl+down', decrease_opacity)
-    keyboard.add_hotkey('ctrl+left', remove_always_on_top)
-    keyboard.add_hotkey('ctrl+right', set_always_on_top)
-    keyboard.add_hotkey('ctrl+shift+m', move_to_next_monitor)
+    if simulated:
+        add_hotkey = add_simulated_hotkey
+    else:
+        import keyboard
+        add_hotkey = keyboard.add_hotkey
+    # The hook thread only queues the press; the dispatcher workers make the Win32 calls
+    for combo, callback in instrumented_hotkeys().items():
+        policy = dispatch_policies.get(callback.__name__, 'keep')
+        if tracer:
+            add_hotkey(combo, traced_hotkey, args=(combo, callback, policy))
+        else:
+            add_hotkey(combo, dispatcher.submit, args=(callback, policy))
+
+# Function the keyboard hook calls instead of dispatcher.submit() while tracing: record the press, then queue it
+def traced_hotkey(combo, callback, policy):
+    tracer.hotkey(combo, get_lane())
+    dispatcher.submit(callback, policy)
+
+def unhook_hotkeys():
+    if simulated:
+        simulated_keys.clear()
+    else:
+        import keyboard
+        keyboard.unhook_all_hotkeys()
+
+# Stand-in for keyboard.add_hotkey() when there is no real keyboard hook
+def add_simulated_hotkey(combo, callback, args=()):
+    simulated_keys[combo] = (callback, args)
+
+# Function to press a hotkey registered with add_simulated_hotkey(), the way the keyboard hook would
+def press_key(combo):
+    if combo not in simulated_keys:
+        raise ValueError(f"no simulated hotkey {combo!r}")
+    callback, args = simulated_keys[combo]
+    callback(*args)
+
+# Settings the control channel may change, with the types they accept
+settable_config = {
+    'move_pixels': int,
+    'animate': bool,
+    'animation_ms': (int, float),
+    'refresh_rate': (int, float),
+    'state_ttl': (int, float),
+    'tile_gap': int,
+    'tile_margin': int,
+    'tile_master_ratio': (int, float),
+}
+
+# Control channel commands
+def set_config(**values):
+    for key, value in values.items():
+        kind = settable_config.get(key)
+        if kind is None:
+            raise ValueError(f"{key} cannot be set through the control channel")
+        # bool is an int in Python, so it has to be ruled out for the number settings
+        if not isinstance(value, kind) or (kind is not bool and isinstance(value, bool)) or (kind is not bool and value < 0):
+            raise ValueError(f"bad value for {key}: {value!r}")
+    return config.update(values)
+
+def pause_hotkeys():
+    global paused
+    if not paused:
+        unhook_hotkeys()
+        paused = True
+
+def resume_hotkeys():
+    global paused
+    if paused:
+        check_hotkeys()
+        paused = False
+
+def query_status():
+    return {
+        'pid': os.getpid(),
+        'paused': paused,
+        'uptime': time.monotonic() - started_at,
+        'move_pixels': get_move_pixels(),
+    }
+
+def get_stats():
+    stats = {'coalescer': coalescer.stats(), 'dispatcher': dispatcher.stats(), 'animator': animator.stats(), 'window_state': window_state.stats(), 'rules': rule_engine.stats(), 'actions': instrumentation.snapshot()}
+    if headless:
+        stats['loop'] = headless.stats()
+    return stats
+
+# Function to stop recording and save the macro; returns its name, or None if nothing was recorded
+def stop_macro(name=None, key=None):
+    macro = save_macro(name, key)
+    return macro.name if macro else None
+
+def reload_rules():
+    return rule_engine.load(rules_file)
+
+def list_macros():
+    return {name: {'key': macro.key, 'steps': len(macro.steps)} for name, macro in macro_store.macros.items()}
+
+def shutdown():
+    shutdown_requested.set()
+    if headless:
+        headless.stop()
+
+control_handlers = {
+    'set_config': set_config,
+    'pause': pause_hotkeys,
+    'resume': resume_hotkeys,
+    'status': query_status,
+    'stats': get_stats,
+    'press': press_key,
+    'save_layout': save_current_layout,
+    'restore_layout': restore_saved_layout,
+    'record_macro': start_macro,
+    'stop_macro': stop_macro,
+    'play_macro': play_macro,
+    'macros': list_macros,
+    'reload_rules': reload_rules,
+    'shutdown': shutdown,
+}
+loop_commands = ('press', 'status', 'shutdown')  # Cheap enough to run on the --headless event loop itself
+
+# Function to log that the daemon is ready, with the hotkey overview
+def announce_ready():
+    startup.report()
+    log_event('info', "Hotkey listener started.")
+    log_event('info', "Use arrow keys to move the window and 'Shift + Arrow keys' to resize the window.")
+    log_event('info', "Use 'Ctrl + Up/Down' to change opacity, 'Ctrl + Left/Right' to toggle always on top.")
+    log_event('info', "Use 'Ctrl + Shift + M' to move the window to the next monitor, 'Ctrl + Alt + Shift + M' for the previous one.")
+    log_event('info', "Use 'Ctrl + Shift + Space' to search for a window by title or app and switch to it.")
+    log_event('info', "Use 'Ctrl + Alt + Shift + S' to save the layout of all windows and 'Ctrl + Alt + Shift + L' to restore it.")
+    log_event('info', "Use 'Ctrl + Alt + Shift + T' to tile windows, pressing again for the next layout ('Ctrl + Alt + Shift + Y' for the previous one).")
+    log_event('info', "Use 'Ctrl + Alt + Shift + R' to start and stop recording a macro, 'Ctrl + Alt + Shift + 1..9' to play one back.")
+    log_event('info', "Use 'Ctrl + Alt + Shift + Arrow keys' to move every window of the same app, or the selection made with 'Ctrl + Alt + S'.")
+    log_event('info', "Use 'Ctrl + Alt + Shift + Home/End/Page Up/Page Down' to grow them left/right/up/down, 'Ctrl + Alt + Shift + =/-' to change their opacity, "
+                      "'Ctrl + Alt + Shift + ]/[' to set/remove always on top.")
+
+# Function to run every component as a task on one asyncio event loop until shutdown
+def run_headless(port, token):
+    global headless, overlay
+    import asyncio
+    from async_daemon import AsyncDaemon
+    overlay = NullOverlay()  # No Tk without a desktop session to show it on
+    config.subscribe(on_config_changed)
+    headless = AsyncDaemon(dispatcher, (coalescer, animator), config, control_handlers, port=port, inline_commands=loop_commands, workers=dispatcher.worker_count, token=token)
+    check_hotkeys()
+    startup.mark("hotkeys registered")
+
+    def ready():
+        startup.mark("event loop, control channel and tasks")
+        announce_ready()
+    try:
+        asyncio.run(headless.run(ready))
+    except KeyboardInterrupt:
+        pass
 
 def main():
+    global simulated, tracer
+    startup.mark("imports")
+    parser = argparse.ArgumentParser(description="Window control hotkey daemon")
+    parser.add_argument('--control-port', type=int, default=default_port, help="localhost port for the control channel (0 to disable)")
+    parser.add_argument('--simulated', action='store_true', help="drive an in-memory simulated window manager instead of Win32")
+    parser.add_argument('--log-json', action='store_true', help="write log events as JSON lines (used by the GUI)")
+    parser.add_argument('--trace', metavar='PATH', help="record hotkeys, window events and backend calls to a binary trace file")
+    parser.add_argument('--profile-startup', action='store_true', help="print import and init timings once hotkeys are ready")
+    parser.add_argument('--headless', action='store_true', help="run hotkeys, timers and the control channel on one asyncio event loop, without overlays")
+    args = parser.parse_args()
+    simulated = args.simulated
+    event_log.json_lines = args.log_json
+    if args.trace:
+        tracer = TraceRecorder(args.trace)
+
+    set_backend(SimulatedBackend(window_count=10) if args.simulated else Win32Backend())
+    try:
+        macro_store.load()
+    except (OSError, ValueError, KeyError) as e:
+        log_event('warning', f"Could not load macros: {e}")
+    try:
+        rule_engine.load(rules_file)
+    except (OSError, ValueError, TypeError) as e:
+        log_event('warning', f"Could not load rules: {e}")
+    if tracer:
+        tracer.snapshot(backend, window_index, monitors)
+    startup.mark("backend, monitors and window index")
+    # Clients have to send this token, which only the current user can read from the token file
+    token = write_token(args.control_port) if args.control_port else None
+    if args.headless:
+        run_headless(args.control_port, token)
+        stop_components()
+        remove_token(args.control_port)
+        return
+    config.subscribe(on_config_changed)
+    config.start_watching()
+    coalescer.start()
+    animator.start()
+    dispatcher.start()
+    startup.mark("config watcher and worker threads")
+    if args.control_port:
+        control = ControlServer(control_handlers, port=args.control_port, token=token)
+        try:
+            control.start()
+        except OSError as e:
+            log_event('warning', f"Control channel disabled: {e}")
+    startup.mark("control channel")
     check_hotkeys()
-    print("Hotkey listener started.")
-    print("Use arrow keys to move the window and 'Shift + Arrow keys' to resize the window.")
-    print("Use 'Ctrl + Up/Down' to change opacity, 'Ctrl + Left/Right' to toggle always on top.")
-    print("Use 'Ctrl + Shift + M' to move the window to the next monitor.")
-    # Prevent the script from exiting
-    keyboard.wait()
+    startup.mark("hotkeys registered")
+    # Tk is only needed for the first message; load it in the background now that hotkeys work
+    overlay.start()
+    announce_ready()
+    # Prevent the script from exiting until the control channel asks us to shut down
+    shutdown_requested.wait()
+    stop_components()
+    if args.control_port:
+        remove_token(args.control_port)
+
+# Function to stop taking hotkeys and finish every queued action and window move
+def stop_components():
+    unhook_hotkeys()
+    dispatcher.stop()
+    animator.stop()
+    coalescer.stop()
+    if tracer:
+        tracer.close()
+        log_event('info', f"Wrote {tracer.records} trace records to {tracer.path}")
 
 if __name__ == "__main__":
     main()
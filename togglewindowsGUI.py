@@ -1,34 +1,40 @@
 import tkinter as tk
 from tkinter import ttk, colorchooser
-from PIL import Image, ImageTk
-import subprocess
-import threading
 import os
-import json
+import subprocess
+import time
+from collections import deque
+from config_store import ConfigStore
+from control_channel import ControlClient
+from event_log import LogReader, log_levels
 
 # Global variables
 background_process = None
 move_pixels = 40  # Default value for moving pixels
-settings_file = 'settings.json'
-default_settings = {
-    'theme': 'dark',
-    'background_color': '#000000',
-    'font_color': '#00FF00'
-}
+config = ConfigStore()  # Shared in-memory view of settings.json; changes are written after a short debounce
+control = ControlClient()  # Live connection to the running hotkey daemon
+log_reader = None  # LogReader on the daemon's merged stdout/stderr
+log_history = deque(maxlen=2000)  # Newest daemon events, shown in the event log window
+log_views = []  # Callbacks of open event log windows, given each batch of new events
+log_interval_ms = 100  # How often the Tk thread drains the log buffer
+
+# Function to load a toggle icon at size x size pixels.
+# The resized copy is kept next to the original (on.png -> on_40.png) and loaded by Tk directly;
+# Pillow is only imported to (re)build it when it is missing or older than the original.
+def load_icon(path, size=40):
+    name, extension = os.path.splitext(path)
+    resized_path = f"{name}_{size}{extension}"
+    if not os.path.exists(resized_path) or os.path.getmtime(resized_path) < os.path.getmtime(path):
+        from PIL import Image
+        Image.open(path).resize((size, size)).save(resized_path)
+    return tk.PhotoImage(file=resized_path)
 
 def load_settings():
-    if os.path.exists(settings_file):
-        with open(settings_file, 'r') as f:
-            settings = json.load(f)
-            # Ensure default settings are present
-            for key, value in default_settings.items():
-                settings.setdefault(key, value)
-            return settings
-    return default_settings
+    config.reload()
+    return config.settings()
 
 def save_settings(settings):
-    with open(settings_file, 'w') as f:
-        json.dump(settings, f)
+    config.save_settings(settings)
 
 def apply_settings(settings):
     global background_color, font_color
@@ -42,6 +48,8 @@ def apply_settings(settings):
     move_pixels_entry.configure(style="Custom.TEntry")
     help_button.configure(bg=background_color, fg=font_color)
     theme_button.configure(bg=background_color, fg=font_color)
+    stats_button.configure(bg=background_color, fg=font_color)
+    log_button.configure(bg=background_color, fg=font_color)
     confirm_button.configure(bg=background_color, fg=font_color)
     toggle_button.configure(bg=background_color)
     
@@ -60,11 +68,18 @@ def update_theme_window(window):
         except tk.TclError:
             pass
 
-def start_or_restart_script():
-    global background_process
+# Function to send a command to the running daemon; returns None if it cannot be reached
+def send_to_daemon(cmd, **args):
+    if not (background_process and background_process.poll() is None):
+        return None
+    try:
+        response = control.request(cmd, **args)
+    except OSError:
+        return None
+    return response if response.get('ok') else None
 
-    if background_process and background_process.poll() is None:
-        background_process.terminate()
+def start_or_restart_script():
+    global background_process, log_reader
 
     try:
         global move_pixels
@@ -76,16 +91,35 @@ def start_or_restart_script():
         move_pixels_entry.insert(0, move_pixels)
         return
 
-    with open('move_pixels.txt', 'w') as f:
-        f.write(str(move_pixels))
+    config.set_move_pixels(move_pixels)
 
-    background_process = subprocess.Popen(['python', 'togglewindows.py'], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-    threading.Thread(target=read_output, daemon=True).start()
+    # Reconfigure a running daemon in place instead of restarting it
+    if send_to_daemon('set_config', move_pixels=move_pixels):
+        console_output.set(f"Move pixels updated to {move_pixels}")
+        return
+    if background_process and background_process.poll() is None:
+        background_process.terminate()
+    control.close()
+    config.flush()  # The new daemon reads settings.json when it starts
+
+    # stderr goes into the same pipe, so tracebacks show up in the log and that pipe can never fill up
+    background_process = subprocess.Popen(
+        ['python', '-u', 'togglewindows.py', '--log-json'],
+        stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, errors='replace'
+    )
+    log_reader = LogReader(background_process.stdout)
+    log_reader.start()
     console_output.set("")
     update_status_indicator()
 
 def stop_script():
     global background_process
+    if send_to_daemon('shutdown'):
+        try:
+            background_process.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            pass
+    control.close()
     if background_process and background_process.poll() is None:
         background_process.terminate()
     console_output.set("Script stopped")
@@ -95,8 +129,8 @@ def update_move_pixels():
     global move_pixels
     try:
         move_pixels = int(move_pixels_entry.get())
-        with open('move_pixels.txt', 'w') as f:
-            f.write(str(move_pixels))
+        config.set_move_pixels(move_pixels)
+        send_to_daemon('set_config', move_pixels=move_pixels)
         console_output.set(f"Move pixels updated to {move_pixels}")
     except ValueError:
         console_output.set("Invalid input for pixels. Please enter a valid number.")
@@ -125,18 +159,125 @@ def toggle_script():
     else:
         stop_script()
 
-def read_output():
-    global background_process
-    while background_process and background_process.poll() is None:
-        output_line = background_process.stdout.readline()
-        if output_line:
-            console_output.set(output_line.strip())
-            update_status_indicator()
+# Function to move new daemon events from the reader's buffer into the GUI; runs on the Tk thread every log_interval_ms
+def drain_log():
+    if log_reader:
+        events = log_reader.drain(log_history.maxlen)
+        if events:
+            log_history.extend(events)
+            for view in log_views:
+                view(events)
+            if background_process and background_process.poll() is None:
+                console_output.set(events[-1]['message'])
+                update_status_indicator()
+    root.after(log_interval_ms, drain_log)
+
+# Function to format one daemon event as a line of the event log
+def format_event(event):
+    clock = time.strftime('%H:%M:%S', time.localtime(event['time']))
+    return f"{clock} {event['level']:7s} {event['source']}: {event['message']}\n"
+
+def show_log():
+    log_window = tk.Toplevel(root)
+    log_window.title("Event Log")
+    log_window.geometry("640x400")
+    log_window.configure(bg=background_color)
+
+    filter_frame = tk.Frame(log_window, bg=background_color)
+    filter_frame.pack(fill='x', padx=5, pady=5)
+    search_text = tk.StringVar()
+    level = tk.StringVar(value='all')
+    ttk.Label(filter_frame, text="Filter:", background=background_color, foreground=font_color).pack(side='left')
+    ttk.Entry(filter_frame, textvariable=search_text).pack(side='left', fill='x', expand=True, padx=5)
+    ttk.Combobox(filter_frame, textvariable=level, values=('all',) + log_levels, state='readonly', width=8).pack(side='left')
+
+    text_frame = tk.Frame(log_window, bg=background_color)
+    text_frame.pack(fill='both', expand=True, padx=5, pady=5)
+    scrollbar = tk.Scrollbar(text_frame)
+    scrollbar.pack(side='right', fill='y')
+    log_text = tk.Text(text_frame, font=('Courier', 9), bg=background_color, fg=font_color, wrap='none', yscrollcommand=scrollbar.set)
+    log_text.pack(side='left', fill='both', expand=True)
+    scrollbar.configure(command=log_text.yview)
+
+    def matches(event):
+        search = search_text.get().lower()
+        return (level.get() == 'all' or event['level'] == level.get()) and (not search or search in format_event(event).lower())
+
+    def add_events(events):
+        lines = "".join(format_event(event) for event in events if matches(event))
+        if not lines:
+            return
+        at_bottom = log_text.yview()[1] >= 1.0
+        log_text.insert(tk.END, lines)
+        # Keep the widget as bounded as the history behind it
+        excess = int(log_text.index('end-1c').split('.')[0]) - log_history.maxlen
+        if excess > 0:
+            log_text.delete('1.0', f"{excess + 1}.0")
+        if at_bottom:
+            log_text.see(tk.END)
+
+    def refilter(*_):
+        log_text.delete('1.0', tk.END)
+        add_events(log_history)
+
+    def on_close():
+        log_views.remove(add_events)
+        log_window.destroy()
+
+    search_text.trace_add('write', refilter)
+    level.trace_add('write', refilter)
+    log_views.append(add_events)
+    log_window.protocol("WM_DELETE_WINDOW", on_close)
+    refilter()
+
+# Function to format a stats snapshot from the daemon as a text table
+def format_stats(stats):
+    # p50/p99/max: key event until the handler returned; 'update p99': key event until the window was written
+    lines = [f"{'action':28s} {'calls':>6s} {'p50':>6s} {'p99':>6s} {'max':>8s} {'update p99':>10s}"]
+    for name, action in sorted(stats['actions'].items()):
+        latency = action['latency']
+        update = action.get('update') or {'p99_us': 0}
+        lines.append(f"{name:28s} {action['calls']:6d} {latency['p50_us']:6d} {latency['p99_us']:6d} {latency['max_us']:8.0f} {update['p99_us']:10d}")
+        for phase, summary in action['phases'].items():
+            lines.append(f"  {phase:26s} mean {summary['mean_us']:8.1f} ({summary['share']:.0%})")
+    coalescer = stats['coalescer']
+    lines.append("")
+    lines.append(f"coalescer: {coalescer['events']} events, {coalescer['position_calls']} writes, mean lag {coalescer['mean_lag_ms']:.1f} ms")
+    animator = stats['animator']
+    if animator['frames']:
+        lines.append(f"animation: {animator['fps']:.0f} fps, {animator['dropped_frames']} dropped frames, {animator['retargets']} retargets")
+    window_state = stats['window_state']
+    lines.append(f"state cache: {window_state['hits']} hits, {window_state['misses']} misses ({window_state['hit_rate']:.0%}), {window_state['invalidations']} invalidated")
+    dispatcher = stats['dispatcher']
+    rules = stats['rules']
+    if rules['rules']:
+        lines.append(f"rules: {rules['rules']} rules, {rules['applied']} applied to {rules['evaluations']} windows, mean match {rules['mean_match_us']:.1f} us")
+    lines.append(f"dispatcher: {dispatcher['submitted']} presses, {dispatcher['merged']} merged, {dispatcher['dropped']} dropped, mean wait {dispatcher['mean_wait_ms']:.1f} ms")
+    lines.append("Action and phase times in microseconds; lag and wait in milliseconds")
+    return "\n".join(lines)
+
+def show_stats():
+    stats_window = tk.Toplevel(root)
+    stats_window.title("Live Stats")
+    stats_window.geometry("600x400")
+    stats_window.configure(bg=background_color)
+    stats_text = tk.Text(stats_window, font=('Courier', 9), bg=background_color, fg=font_color, wrap='none')
+    stats_text.pack(fill='both', expand=True, padx=5, pady=5)
+
+    def refresh():
+        if not stats_window.winfo_exists():
+            return
+        response = send_to_daemon('stats')
+        stats_text.delete('1.0', tk.END)
+        stats_text.insert('1.0', format_stats(response['result']) if response else "Script is not running")
+        stats_window.after(1000, refresh)
+
+    refresh()
 
 def show_help():
     help_window = tk.Toplevel(root)
     help_window.title("Help")
-    help_window.geometry("300x400")
+    help_window.geometry("300x610")
     help_window.configure(bg=background_color)
     help_text = (
         "Window Control Tool Help\n\n"
@@ -146,11 +287,28 @@ def show_help():
         "- Ctrl + Up: Increase opacity\n"
         "- Ctrl + Down: Decrease opacity\n"
         "- Ctrl + Left: Remove always on top\n"
-        "- Ctrl + Right: Set always on top\n\n"
+        "- Ctrl + Right: Set always on top\n"
+        "- Ctrl + Shift + M: Move to next monitor\n"
+        "- Ctrl + Alt + Shift + M: Move to previous monitor\n"
+        "- Ctrl + Alt + Shift + Arrow keys: Move all windows of the app (or the selection)\n"
+        "- Ctrl + Alt + Shift + Home/End/PgUp/PgDn: Resize them\n"
+        "- Ctrl + Alt + Shift + = / -: Change their opacity\n"
+        "- Ctrl + Alt + Shift + ] / [: Set/remove always on top for them\n"
+        "- Ctrl + Alt + S: Add/remove window from selection\n"
+        "- Ctrl + Alt + X: Clear selection\n"
+        "- Ctrl + Shift + Space: Switch to a window by name\n"
+        "- Ctrl + Alt + Shift + S: Save the layout of all windows\n"
+        "- Ctrl + Alt + Shift + L: Restore the saved layout\n"
+        "- Ctrl + Alt + Shift + T: Tile windows / next tiling layout\n"
+        "- Ctrl + Alt + Shift + Y: Previous tiling layout\n"
+        "- Ctrl + Alt + Shift + R: Start/stop recording a macro\n"
+        "- Ctrl + Alt + Shift + 1..9: Play a recorded macro\n\n"
         "Buttons:\n"
         "- Start: Start the script\n"
         "- Stop: Stop the script\n"
         "- Confirm: Update move pixels value\n"
+        "- Live Stats: Show hotkey timings\n"
+        "- Event Log: Show and filter daemon messages\n"
     )
     ttk.Label(help_window, text=help_text, background=background_color, foreground=font_color, justify='left', wraplength=280).pack(pady=10, padx=10)
     update_theme_window(help_window)
@@ -219,23 +377,18 @@ def show_custom_mode_options(theme_window, update_theme_window):
     ttk.Button(theme_window, text="Font Color", command=lambda: set_custom_color('font_color')).pack(pady=5)
 
 def main():
-    global move_pixels_entry, background_process, console_output, toggle_button, root, on_image, off_image, background_color, font_color, style, help_button, theme_button, confirm_button, output_label, console_output_label, author_label, decrease_button_1, decrease_button_5, increase_button_1, increase_button_5, label_move_pixels, label_default, settings, frame
+    global move_pixels_entry, background_process, console_output, toggle_button, root, on_image, off_image, background_color, font_color, style, help_button, theme_button, stats_button, log_button, confirm_button, output_label, console_output_label, author_label, decrease_button_1, decrease_button_5, increase_button_1, increase_button_5, label_move_pixels, label_default, settings, frame
 
     settings = load_settings()
     background_color = settings['background_color']
     font_color = settings['font_color']
 
-    # Read initial move_pixels value from file
-    if os.path.exists('move_pixels.txt'):
-        with open('move_pixels.txt', 'r') as f:
-            try:
-                move_pixels = int(f.read().strip())
-            except ValueError:
-                move_pixels = 40
+    # Read initial move_pixels value from the config store
+    move_pixels = config.get('move_pixels')
 
     root = tk.Tk()
     root.title("Window Control Tool")
-    root.geometry("300x500")
+    root.geometry("300x580")
     root.pack_propagate(False)
 
     style = ttk.Style(root)
@@ -279,8 +432,8 @@ def main():
     label_default.pack(pady=5)
 
     # Load images for toggle button
-    on_image = ImageTk.PhotoImage(Image.open("on.png").resize((40, 40)))
-    off_image = ImageTk.PhotoImage(Image.open("off.png").resize((40, 40)))
+    on_image = load_icon("on.png")
+    off_image = load_icon("off.png")
 
     # Create toggle button with image
     toggle_button = tk.Button(root, image=off_image, command=toggle_script, bg=background_color)
@@ -304,6 +457,14 @@ def main():
     theme_button = tk.Button(root, text="Theme Settings", command=show_theme_settings, bg=background_color, fg=font_color)
     theme_button.pack(pady=5)
 
+    # Live stats button
+    stats_button = tk.Button(root, text="Live Stats", command=show_stats, bg=background_color, fg=font_color)
+    stats_button.pack(pady=5)
+
+    # Event log button
+    log_button = tk.Button(root, text="Event Log", command=show_log, bg=background_color, fg=font_color)
+    log_button.pack(pady=5)
+
     # Author label
     author_label = ttk.Label(root, text="Made by Stefan M.", background=background_color, foreground=font_color, anchor='center', justify='center')
     author_label.place(relx=0.5, rely=1.0, anchor='s', y=-5)
@@ -313,10 +474,12 @@ def main():
 
     def on_closing():
         stop_script()
+        config.flush()
         root.destroy()
 
     root.protocol("WM_DELETE_WINDOW", on_closing)
     apply_settings(settings)
+    drain_log()
     root.mainloop()
 
 if __name__ == "__main__":
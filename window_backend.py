@@ -0,0 +1,647 @@
+import os
+import threading
+import time
+from collections import Counter
+from event_log import log_event
+
+# Win32 values shared by every backend
+WS_EX_TOPMOST = 0x00000008
+WS_EX_TOOLWINDOW = 0x00000080
+WS_EX_LAYERED = 0x00080000
+HWND_TOP = 0
+DWMWA_CLOAKED = 14
+SPI_SETWORKAREA = 0x002F
+default_dpi = 96
+
+# WinEvent hooks and the names passed to watch_window_events() callbacks
+EVENT_SYSTEM_FOREGROUND = 0x0003
+EVENT_OBJECT_CREATE = 0x8000
+EVENT_OBJECT_NAMECHANGE = 0x800C
+win_events = {
+    0x0003: 'foreground',
+    0x8000: 'create',
+    0x8001: 'destroy',
+    0x8002: 'show',
+    0x8003: 'hide',
+    0x800B: 'location_change',
+    0x800C: 'name_change',
+}
+
+# Deferred-position transaction: queue moves/resizes and z-order changes for many windows,
+# then commit() applies them together, in the order the windows were first queued.
+# Several ops on one window are merged into one.
+class WindowTransaction:
+    def __init__(self, backend):
+        self.backend = backend
+        self.ops = {}  # hwnd -> [rect or None, topmost or None, insert_after or None]
+
+    def set_pos(self, hwnd, x, y, width, height):
+        self.ops.setdefault(hwnd, [None, None, None])[0] = (x, y, width, height)
+
+    def set_topmost(self, hwnd, topmost):
+        self.ops.setdefault(hwnd, [None, None, None])[1] = topmost
+
+    # Place hwnd directly below insert_after in the z-order (it joins insert_after's topmost band)
+    def set_insert_after(self, hwnd, insert_after):
+        self.ops.setdefault(hwnd, [None, None, None])[2] = insert_after
+
+    def commit(self):
+        ops = self.ops
+        self.ops = {}
+        if ops:
+            self._apply(ops)
+
+    # Fallback: one call per change
+    def _apply(self, ops):
+        for hwnd, (rect, topmost, insert_after) in ops.items():
+            if rect is not None:
+                self.backend.set_window_pos(hwnd, *rect)
+            if topmost is not None:
+                self.backend.set_topmost(hwnd, topmost)
+            if insert_after is not None:
+                self.backend.set_insert_after(hwnd, insert_after)
+
+# Interface for the window calls used by togglewindows.py.
+# Rects are (left, top, right, bottom); monitors are (handle, monitor_rect, work_rect).
+class WindowBackend:
+    def get_foreground_window(self):
+        raise NotImplementedError
+
+    def get_window_rect(self, hwnd):
+        raise NotImplementedError
+
+    def set_window_pos(self, hwnd, x, y, width, height):
+        raise NotImplementedError
+
+    def get_window_text(self, hwnd):
+        raise NotImplementedError
+
+    def get_ex_style(self, hwnd):
+        raise NotImplementedError
+
+    def set_ex_style(self, hwnd, style):
+        raise NotImplementedError
+
+    def get_layered_alpha(self, hwnd):
+        raise NotImplementedError
+
+    def set_layered_alpha(self, hwnd, alpha):
+        raise NotImplementedError
+
+    def set_topmost(self, hwnd, topmost):
+        raise NotImplementedError
+
+    # Function to place hwnd directly below insert_after in the z-order
+    def set_insert_after(self, hwnd, insert_after):
+        raise NotImplementedError
+
+    # Function to start a deferred-position transaction sized for count windows
+    def begin_defer(self, count):
+        return WindowTransaction(self)
+
+    # Function to list visible top-level windows, topmost first
+    def enum_windows(self):
+        raise NotImplementedError
+
+    def get_window_process(self, hwnd):
+        raise NotImplementedError
+
+    # Function to get the executable name (e.g. 'notepad.exe') of a process id
+    def get_process_name(self, pid):
+        raise NotImplementedError
+
+    def get_class_name(self, hwnd):
+        raise NotImplementedError
+
+    # Function to check the WS_VISIBLE state of a window (hidden IME/tooltip/helper windows are False)
+    def is_window_visible(self, hwnd):
+        raise NotImplementedError
+
+    def is_minimized(self, hwnd):
+        raise NotImplementedError
+
+    # Function to check whether DWM hides the window although it is visible (other virtual desktops, suspended UWP apps)
+    def is_cloaked(self, hwnd):
+        return False
+
+    def set_foreground_window(self, hwnd):
+        raise NotImplementedError
+
+    # Function to call callback(event, hwnd) for top-level window events named in win_events
+    def watch_window_events(self, callback):
+        pass
+
+    def monitor_from_window(self, hwnd):
+        raise NotImplementedError
+
+    def enum_monitors(self):
+        raise NotImplementedError
+
+    def get_monitor_dpi(self, handle):
+        return default_dpi
+
+    # Function to call callback() whenever the display layout or a work area changes
+    def watch_display_changes(self, callback):
+        pass
+
+    def get_refresh_rate(self):
+        return None
+
+# Backend that calls the real Win32 API through pywin32
+class Win32Backend(WindowBackend):
+    def __init__(self):
+        import win32api
+        import win32con
+        import win32gui
+        self.win32api = win32api
+        self.win32con = win32con
+        self.win32gui = win32gui
+        self._display_callbacks = []
+        self._display_thread = None
+        self._event_callbacks = []
+        self._event_thread = None
+
+    def get_foreground_window(self):
+        return self.win32gui.GetForegroundWindow()
+
+    def get_window_rect(self, hwnd):
+        return self.win32gui.GetWindowRect(hwnd)
+
+    def set_window_pos(self, hwnd, x, y, width, height):
+        self.win32gui.SetWindowPos(hwnd, None, x, y, width, height, self.win32con.SWP_NOZORDER)
+
+    def get_window_text(self, hwnd):
+        return self.win32gui.GetWindowText(hwnd)
+
+    def get_ex_style(self, hwnd):
+        return self.win32gui.GetWindowLong(hwnd, self.win32con.GWL_EXSTYLE)
+
+    def set_ex_style(self, hwnd, style):
+        self.win32gui.SetWindowLong(hwnd, self.win32con.GWL_EXSTYLE, style)
+
+    def get_layered_alpha(self, hwnd):
+        return self.win32gui.GetLayeredWindowAttributes(hwnd)[1]
+
+    def set_layered_alpha(self, hwnd, alpha):
+        self.win32gui.SetLayeredWindowAttributes(hwnd, 0, alpha, self.win32con.LWA_ALPHA)
+
+    def set_topmost(self, hwnd, topmost):
+        self.win32gui.SetWindowPos(
+            hwnd, self.win32con.HWND_TOPMOST if topmost else self.win32con.HWND_NOTOPMOST,
+            0, 0, 0, 0,
+            self.win32con.SWP_NOMOVE | self.win32con.SWP_NOSIZE
+        )
+
+    def set_insert_after(self, hwnd, insert_after):
+        self.win32gui.SetWindowPos(
+            hwnd, insert_after, 0, 0, 0, 0,
+            self.win32con.SWP_NOMOVE | self.win32con.SWP_NOSIZE | self.win32con.SWP_NOACTIVATE
+        )
+
+    def begin_defer(self, count):
+        return Win32Transaction(self, count)
+
+    def enum_windows(self):
+        hwnds = []
+
+        def collect(hwnd, _):
+            if self.win32gui.IsWindowVisible(hwnd):
+                hwnds.append(hwnd)
+            return True
+        self.win32gui.EnumWindows(collect, None)
+        return hwnds
+
+    def is_window_visible(self, hwnd):
+        return bool(self.win32gui.IsWindowVisible(hwnd))
+
+    def is_minimized(self, hwnd):
+        return bool(self.win32gui.IsIconic(hwnd))
+
+    def is_cloaked(self, hwnd):
+        import ctypes
+        from ctypes import wintypes
+        cloaked = wintypes.DWORD(0)
+        result = ctypes.windll.dwmapi.DwmGetWindowAttribute(
+            wintypes.HWND(hwnd), DWMWA_CLOAKED, ctypes.byref(cloaked), ctypes.sizeof(cloaked)
+        )
+        return result == 0 and bool(cloaked.value)
+
+    def get_window_process(self, hwnd):
+        import win32process
+        return win32process.GetWindowThreadProcessId(hwnd)[1]
+
+    def get_process_name(self, pid):
+        import ctypes
+        from ctypes import wintypes
+        kernel32 = ctypes.windll.kernel32
+        # PROCESS_QUERY_LIMITED_INFORMATION works for elevated processes too
+        handle = kernel32.OpenProcess(0x1000, False, pid)
+        if not handle:
+            return ''
+        try:
+            size = wintypes.DWORD(260)
+            buffer = ctypes.create_unicode_buffer(size.value)
+            if kernel32.QueryFullProcessImageNameW(handle, 0, buffer, ctypes.byref(size)):
+                return os.path.basename(buffer.value)
+            return ''
+        finally:
+            kernel32.CloseHandle(handle)
+
+    def get_class_name(self, hwnd):
+        return self.win32gui.GetClassName(hwnd)
+
+    def set_foreground_window(self, hwnd):
+        if self.win32gui.IsIconic(hwnd):
+            self.win32gui.ShowWindow(hwnd, self.win32con.SW_RESTORE)
+        self.win32gui.SetForegroundWindow(hwnd)
+
+    def watch_window_events(self, callback):
+        self._event_callbacks.append(callback)
+        if self._event_thread is None:
+            self._event_thread = threading.Thread(target=self._event_loop, daemon=True)
+            self._event_thread.start()
+
+    # SetWinEventHook needs a thread with a message loop; pywin32 does not wrap it, so use ctypes
+    def _event_loop(self):
+        import ctypes
+        from ctypes import wintypes
+        user32 = ctypes.windll.user32
+        win_event_proc = ctypes.WINFUNCTYPE(
+            None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+            wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD
+        )
+        user32.SetWinEventHook.restype = wintypes.HANDLE
+        user32.SetWinEventHook.argtypes = [
+            wintypes.UINT, wintypes.UINT, wintypes.HMODULE, win_event_proc,
+            wintypes.DWORD, wintypes.DWORD, wintypes.UINT
+        ]
+        user32.GetAncestor.restype = wintypes.HWND
+        user32.GetAncestor.argtypes = [wintypes.HWND, wintypes.UINT]
+
+        def on_event(hook, event, hwnd, id_object, id_child, thread, time_ms):
+            # Only whole windows (OBJID_WINDOW, CHILDID_SELF), and only top-level ones (GA_ROOT)
+            if not hwnd or id_object != 0 or id_child != 0:
+                return
+            name = win_events.get(event)
+            if name is None:
+                return
+            if name != 'destroy' and user32.GetAncestor(hwnd, 2) != hwnd:
+                return
+            for callback in list(self._event_callbacks):
+                try:
+                    callback(name, hwnd)
+                except Exception as e:
+                    log_event('error', f"Window event handler failed: {e}", source='backend')
+
+        # Keep a reference so the callback is not garbage collected
+        self._event_proc = win_event_proc(on_event)
+        flags = 0x0002  # WINEVENT_OUTOFCONTEXT (0) | WINEVENT_SKIPOWNPROCESS (2)
+        user32.SetWinEventHook(EVENT_SYSTEM_FOREGROUND, EVENT_SYSTEM_FOREGROUND, None, self._event_proc, 0, 0, flags)
+        user32.SetWinEventHook(EVENT_OBJECT_CREATE, EVENT_OBJECT_NAMECHANGE, None, self._event_proc, 0, 0, flags)
+        message = wintypes.MSG()
+        while user32.GetMessageW(ctypes.byref(message), None, 0, 0) > 0:
+            user32.TranslateMessage(ctypes.byref(message))
+            user32.DispatchMessageW(ctypes.byref(message))
+
+    def monitor_from_window(self, hwnd):
+        return int(self.win32api.MonitorFromWindow(hwnd, self.win32con.MONITOR_DEFAULTTONEAREST))
+
+    def enum_monitors(self):
+        monitors = []
+        for handle, _, rect in self.win32api.EnumDisplayMonitors():
+            info = self.win32api.GetMonitorInfo(handle)
+            monitors.append((int(handle), tuple(rect), tuple(info['Work'])))
+        return monitors
+
+    def get_monitor_dpi(self, handle):
+        import ctypes
+        dpi_x = ctypes.c_uint()
+        dpi_y = ctypes.c_uint()
+        try:
+            # MDT_EFFECTIVE_DPI = 0
+            if ctypes.windll.shcore.GetDpiForMonitor(ctypes.c_void_p(handle), 0, ctypes.byref(dpi_x), ctypes.byref(dpi_y)) == 0:
+                return dpi_x.value
+        except (AttributeError, OSError):
+            pass
+        return default_dpi
+
+    def watch_display_changes(self, callback):
+        self._display_callbacks.append(callback)
+        if self._display_thread is None:
+            self._display_thread = threading.Thread(target=self._display_loop, daemon=True)
+            self._display_thread.start()
+
+    # Hidden top-level window that receives the WM_DISPLAYCHANGE / WM_SETTINGCHANGE broadcasts
+    def _display_loop(self):
+        win32gui = self.win32gui
+        win32con = self.win32con
+
+        def on_display_change(hwnd, msg, wparam, lparam):
+            for callback in list(self._display_callbacks):
+                callback()
+            return 0
+
+        def on_setting_change(hwnd, msg, wparam, lparam):
+            if wparam == SPI_SETWORKAREA:
+                on_display_change(hwnd, msg, wparam, lparam)
+            return 0
+
+        window_class = win32gui.WNDCLASS()
+        window_class.lpszClassName = 'WindowControlDisplayWatcher'
+        window_class.hInstance = self.win32api.GetModuleHandle(None)
+        window_class.lpfnWndProc = {
+            win32con.WM_DISPLAYCHANGE: on_display_change,
+            win32con.WM_SETTINGCHANGE: on_setting_change,
+        }
+        atom = win32gui.RegisterClass(window_class)
+        win32gui.CreateWindow(atom, 'Window Control Display Watcher', 0, 0, 0, 0, 0, 0, 0, window_class.hInstance, None)
+        win32gui.PumpMessages()
+
+    def get_refresh_rate(self):
+        try:
+            return self.win32api.EnumDisplaySettings(None, self.win32con.ENUM_CURRENT_SETTINGS).DisplayFrequency
+        except Exception:
+            return None
+
+# BeginDeferWindowPos/DeferWindowPos/EndDeferWindowPos: every queued window moves in one repaint
+class Win32Transaction(WindowTransaction):
+    def __init__(self, backend, count):
+        WindowTransaction.__init__(self, backend)
+        self.count = count
+
+    def _apply(self, ops):
+        win32gui = self.backend.win32gui
+        win32con = self.backend.win32con
+        try:
+            hdwp = win32gui.BeginDeferWindowPos(max(self.count, len(ops)))
+            for hwnd, (rect, topmost, insert_after) in ops.items():
+                flags = win32con.SWP_NOACTIVATE
+                if rect is None:
+                    rect = (0, 0, 0, 0)
+                    flags |= win32con.SWP_NOMOVE | win32con.SWP_NOSIZE
+                if topmost is not None:
+                    insert_after = win32con.HWND_TOPMOST if topmost else win32con.HWND_NOTOPMOST
+                elif insert_after is None:
+                    flags |= win32con.SWP_NOZORDER
+                hdwp = win32gui.DeferWindowPos(hdwp, hwnd, insert_after, *rect, flags)
+            win32gui.EndDeferWindowPos(hdwp)
+        except win32gui.error:
+            # A window in the batch went away; apply the rest one by one
+            WindowTransaction._apply(self, {hwnd: op for hwnd, op in ops.items() if win32gui.IsWindow(hwnd)})
+
+# One window held by the simulated window manager
+class SimulatedWindow:
+    __slots__ = ('hwnd', 'rect', 'title', 'ex_style', 'alpha', 'pid', 'class_name', 'visible', 'minimized', 'cloaked')
+
+    def __init__(self, hwnd, rect, title, pid=0, class_name='SimulatedWindow', visible=True):
+        self.hwnd = hwnd
+        self.rect = rect
+        self.title = title
+        self.ex_style = 0
+        self.alpha = 255
+        self.pid = pid
+        self.class_name = class_name
+        self.visible = visible
+        self.minimized = False
+        self.cloaked = False
+
+# Simulated deferred transaction: one round trip and one repaint for the whole batch
+class SimulatedTransaction(WindowTransaction):
+    def _apply(self, ops):
+        backend = self.backend
+        backend._call('end_defer_window_pos')
+        backend.repaints += 1
+        for hwnd, (rect, topmost, insert_after) in ops.items():
+            window = backend.windows.get(hwnd)
+            if window is None:
+                continue
+            if rect is not None:
+                x, y, width, height = rect
+                window.rect = (x, y, x + width, y + height)
+                backend._emit('location_change', hwnd)
+            if topmost is not None:
+                backend._raise(window, topmost)
+            elif insert_after is not None:
+                backend._place_after(window, insert_after)
+
+# Pure-Python window manager for benchmarks and tests off Windows.
+# Every call is counted in self.calls and can be slowed down with call_latency (seconds).
+class SimulatedBackend(WindowBackend):
+    def __init__(self, window_count=0, monitors=None, call_latency=0.0, refresh_rate=60, monitor_dpis=None):
+        self.windows = {}
+        self.z_order = []  # hwnds, topmost first
+        self.monitors = monitors or [(1, (0, 0, 1920, 1080), (0, 0, 1920, 1040))]
+        self.monitor_dpis = monitor_dpis or {}
+        self.display_callbacks = []
+        self.event_callbacks = []
+        self.process_names = {}  # pid -> executable name; defaults to app<pid>.exe
+        self.call_latency = call_latency
+        self.refresh_rate = refresh_rate
+        self.foreground = None
+        self.calls = Counter()
+        self.repaints = 0  # Repaint passes: one per position write or per committed transaction
+        self._next_hwnd = 0x10000
+        for i in range(window_count):
+            self.add_window((100 + i % 50 * 10, 100 + i % 40 * 10, 900 + i % 50 * 10, 700 + i % 40 * 10), f"Window {i}", pid=1000 + i % 20)
+
+    # Like Win32, a window created visible reports 'create' and then 'show'
+    def add_window(self, rect, title='', pid=0, class_name='SimulatedWindow', visible=True):
+        hwnd = self._next_hwnd
+        self._next_hwnd += 4
+        self.windows[hwnd] = SimulatedWindow(hwnd, tuple(rect), title, pid, class_name, visible)
+        self.z_order.append(hwnd)
+        if self.foreground is None and visible:
+            self.foreground = hwnd
+        self._emit('create', hwnd)
+        if visible:
+            self._emit('show', hwnd)
+        return hwnd
+
+    def remove_window(self, hwnd):
+        del self.windows[hwnd]
+        self.z_order.remove(hwnd)
+        if self.foreground == hwnd:
+            self.foreground = self.z_order[0] if self.z_order else None
+        self._emit('destroy', hwnd)
+
+    def set_title(self, hwnd, title):
+        self.windows[hwnd].title = title
+        self._emit('name_change', hwnd)
+
+    # Function to show or hide a window the way ShowWindow would
+    def show_window(self, hwnd, visible):
+        self.windows[hwnd].visible = visible
+        self._emit('show' if visible else 'hide', hwnd)
+
+    # Function to move a window the way the user or the app would, without going through this backend's API
+    def drag_window(self, hwnd, rect):
+        self.windows[hwnd].rect = tuple(rect)
+        self._emit('location_change', hwnd)
+
+    def _emit(self, event, hwnd):
+        for callback in list(self.event_callbacks):
+            callback(event, hwnd)
+
+    def _call(self, name):
+        self.calls[name] += 1
+        if self.call_latency >= 0.001:
+            # Long calls block like a real syscall and let other threads run
+            time.sleep(self.call_latency)
+        elif self.call_latency:
+            # Spin instead of sleeping so sub-millisecond latencies are honoured
+            deadline = time.perf_counter() + self.call_latency
+            while time.perf_counter() < deadline:
+                pass
+
+    def get_foreground_window(self):
+        self._call('get_foreground_window')
+        return self.foreground
+
+    def get_window_rect(self, hwnd):
+        self._call('get_window_rect')
+        return self.windows[hwnd].rect
+
+    def set_window_pos(self, hwnd, x, y, width, height):
+        self._call('set_window_pos')
+        self.windows[hwnd].rect = (x, y, x + width, y + height)
+        self.repaints += 1
+        self._emit('location_change', hwnd)
+
+    def get_window_text(self, hwnd):
+        self._call('get_window_text')
+        return self.windows[hwnd].title
+
+    def get_ex_style(self, hwnd):
+        self._call('get_ex_style')
+        return self.windows[hwnd].ex_style
+
+    def set_ex_style(self, hwnd, style):
+        self._call('set_ex_style')
+        self.windows[hwnd].ex_style = style
+
+    def get_layered_alpha(self, hwnd):
+        self._call('get_layered_alpha')
+        return self.windows[hwnd].alpha
+
+    def set_layered_alpha(self, hwnd, alpha):
+        self._call('set_layered_alpha')
+        self.windows[hwnd].alpha = alpha
+
+    def set_topmost(self, hwnd, topmost):
+        self._call('set_topmost')
+        self._raise(self.windows[hwnd], topmost)
+        self.repaints += 1
+
+    def set_insert_after(self, hwnd, insert_after):
+        self._call('set_window_pos')
+        self._place_after(self.windows[hwnd], insert_after)
+        self.repaints += 1
+
+    # HWND_TOPMOST goes to the very top; HWND_NOTOPMOST goes to the top of the non-topmost windows
+    def _raise(self, window, topmost):
+        self.z_order.remove(window.hwnd)
+        if topmost:
+            window.ex_style |= WS_EX_TOPMOST
+            self.z_order.insert(0, window.hwnd)
+        else:
+            window.ex_style &= ~WS_EX_TOPMOST
+            position = 0
+            while position < len(self.z_order) and self.windows[self.z_order[position]].ex_style & WS_EX_TOPMOST:
+                position += 1
+            self.z_order.insert(position, window.hwnd)
+
+    def _place_after(self, window, insert_after):
+        if insert_after == HWND_TOP:
+            self.z_order.remove(window.hwnd)
+            position = 0
+            if not window.ex_style & WS_EX_TOPMOST:
+                while position < len(self.z_order) and self.windows[self.z_order[position]].ex_style & WS_EX_TOPMOST:
+                    position += 1
+            self.z_order.insert(position, window.hwnd)
+            return
+        after = self.windows.get(insert_after)
+        if after is None or after is window:
+            return
+        if after.ex_style & WS_EX_TOPMOST:
+            window.ex_style |= WS_EX_TOPMOST
+        else:
+            window.ex_style &= ~WS_EX_TOPMOST
+        self.z_order.remove(window.hwnd)
+        self.z_order.insert(self.z_order.index(insert_after) + 1, window.hwnd)
+
+    def begin_defer(self, count):
+        self.calls['begin_defer_window_pos'] += 1
+        return SimulatedTransaction(self)
+
+    def enum_windows(self):
+        self._call('enum_windows')
+        return [hwnd for hwnd in self.z_order if self.windows[hwnd].visible]
+
+    def get_window_process(self, hwnd):
+        self._call('get_window_process')
+        return self.windows[hwnd].pid
+
+    def get_process_name(self, pid):
+        self._call('get_process_name')
+        return self.process_names.get(pid, f"app{pid}.exe")
+
+    def get_class_name(self, hwnd):
+        self._call('get_class_name')
+        return self.windows[hwnd].class_name
+
+    def is_window_visible(self, hwnd):
+        self._call('is_window_visible')
+        window = self.windows.get(hwnd)
+        return window is not None and window.visible
+
+    def is_minimized(self, hwnd):
+        self._call('is_minimized')
+        return self.windows[hwnd].minimized
+
+    def is_cloaked(self, hwnd):
+        self._call('is_cloaked')
+        return self.windows[hwnd].cloaked
+
+    def set_foreground_window(self, hwnd):
+        self._call('set_foreground_window')
+        self.foreground = hwnd
+        self._emit('foreground', hwnd)
+
+    def watch_window_events(self, callback):
+        self.event_callbacks.append(callback)
+
+    def monitor_from_window(self, hwnd):
+        self._call('monitor_from_window')
+        left, top, right, bottom = self.windows[hwnd].rect
+        x, y = (left + right) // 2, (top + bottom) // 2
+        nearest = None
+        for handle, rect, _ in self.monitors:
+            if rect[0] <= x < rect[2] and rect[1] <= y < rect[3]:
+                return handle
+            dx = max(rect[0] - x, 0, x - rect[2] + 1)
+            dy = max(rect[1] - y, 0, y - rect[3] + 1)
+            if nearest is None or dx * dx + dy * dy < nearest[0]:
+                nearest = (dx * dx + dy * dy, handle)
+        return nearest[1]
+
+    def enum_monitors(self):
+        self._call('enum_monitors')
+        return list(self.monitors)
+
+    def get_monitor_dpi(self, handle):
+        self._call('get_monitor_dpi')
+        return self.monitor_dpis.get(handle, default_dpi)
+
+    def watch_display_changes(self, callback):
+        self.display_callbacks.append(callback)
+
+    # Function to change the simulated monitor layout and notify watchers like WM_DISPLAYCHANGE would
+    def set_monitors(self, monitors, monitor_dpis=None):
+        self.monitors = list(monitors)
+        if monitor_dpis is not None:
+            self.monitor_dpis = monitor_dpis
+        for callback in list(self.display_callbacks):
+            callback()
+
+    def get_refresh_rate(self):
+        return self.refresh_rate
@@ -0,0 +1,233 @@
+import re
+import threading
+from bisect import bisect_left
+from event_log import log_event
+
+# Global variables
+token_pattern = re.compile(r'[0-9a-z]+')
+
+# Function to split a title/class/process name into lowercase search tokens
+def tokenize(text):
+    return token_pattern.findall(text.lower())
+
+# What the index knows about one top-level window
+class WindowInfo:
+    __slots__ = ('hwnd', 'title', 'class_name', 'pid', 'process', 'tokens')
+
+    def __init__(self, hwnd, title, class_name, pid, process):
+        self.hwnd = hwnd
+        self.title = title
+        self.class_name = class_name
+        self.pid = pid
+        self.process = process
+        self.tokens = set(tokenize(title)) | set(tokenize(process.rsplit('.', 1)[0]))
+
+    def __repr__(self):
+        return f"WindowInfo({self.hwnd:#x}, {self.title!r}, {self.class_name!r}, {self.process!r})"
+
+# Function to score how well a window matches the query tokens (higher is better)
+def match_score(info, query_tokens, query):
+    score = 0
+    for query_token in query_tokens:
+        if query_token in info.tokens:
+            score += 3
+        else:
+            score += 1
+    if query in info.title.lower():
+        score += 5
+    return score
+
+# In-memory index of visible top-level windows, keyed by hwnd with secondary indexes
+# on pid, process name, class name and title tokens.
+# It is kept current from window events (show, destroy/hide, name change, foreground) and
+# reconciled with a full enumeration every reconcile_interval seconds to recover missed events.
+class WindowIndex:
+    def __init__(self, backend, reconcile_interval=30.0):
+        self.backend = backend
+        self.reconcile_interval = reconcile_interval
+        self.windows = {}
+        self.by_pid = {}
+        self.by_process = {}
+        self.by_class = {}
+        self.by_token = {}
+        self.last_focus = {}  # hwnd -> focus counter value, higher is more recent
+        self.foreground = None  # Foreground window as last reported by events or reconcile
+        self._focus_tick = 0
+        self.events = 0
+        self.reconciles = 0
+        self._process_names = {}
+        self._sorted_tokens = None
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.backend.watch_window_events(self.on_event)
+        self.reconcile()
+        if self._thread is None and self.reconcile_interval:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._reconcile_loop, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _reconcile_loop(self):
+        while not self._stop.wait(self.reconcile_interval):
+            try:
+                self.reconcile()
+            except Exception as e:
+                log_event('error', f"Window index reconcile failed: {e}", source='window_index')
+
+    def on_event(self, event, hwnd):
+        self.events += 1
+        if event == 'show':
+            self.add(hwnd)
+        elif event in ('create', 'name_change'):
+            # Hidden windows (IME, tooltips, helper windows) also get these; enum_windows() leaves them out too
+            if self._is_visible(hwnd):
+                self.add(hwnd)
+            elif hwnd in self.windows:
+                self.remove(hwnd)
+        elif event in ('destroy', 'hide'):
+            self.remove(hwnd)
+        elif event == 'foreground':
+            self.foreground = hwnd
+            with self._lock:
+                if hwnd not in self.windows:
+                    self.add(hwnd)
+                self._focus_tick += 1
+                self.last_focus[hwnd] = self._focus_tick
+
+    def _is_visible(self, hwnd):
+        try:
+            return self.backend.is_window_visible(hwnd)
+        except Exception:
+            return False
+
+    # Function to (re)read one window and update every index entry for it
+    def add(self, hwnd):
+        try:
+            pid = self.backend.get_window_process(hwnd)
+            info = WindowInfo(hwnd, self.backend.get_window_text(hwnd), self.backend.get_class_name(hwnd), pid, self._process_name(pid))
+        except Exception:
+            # The window went away before we could read it
+            self.remove(hwnd)
+            return None
+        with self._lock:
+            self._unlink(hwnd)
+            self.windows[hwnd] = info
+            self.by_pid.setdefault(info.pid, set()).add(hwnd)
+            self.by_process.setdefault(info.process.lower(), set()).add(hwnd)
+            self.by_class.setdefault(info.class_name, set()).add(hwnd)
+            for token in info.tokens:
+                entries = self.by_token.get(token)
+                if entries is None:
+                    entries = self.by_token[token] = set()
+                    self._sorted_tokens = None
+                entries.add(hwnd)
+        return info
+
+    def remove(self, hwnd):
+        with self._lock:
+            self._unlink(hwnd)
+            self.last_focus.pop(hwnd, None)
+
+    def _unlink(self, hwnd):
+        info = self.windows.pop(hwnd, None)
+        if info is None:
+            return
+        self._discard(self.by_pid, info.pid, hwnd)
+        self._discard(self.by_process, info.process.lower(), hwnd)
+        self._discard(self.by_class, info.class_name, hwnd)
+        for token in info.tokens:
+            if self._discard(self.by_token, token, hwnd):
+                self._sorted_tokens = None
+
+    # Function to remove hwnd from index[key]; returns True if the key became empty and was dropped
+    def _discard(self, index, key, hwnd):
+        entries = index.get(key)
+        if entries is not None:
+            entries.discard(hwnd)
+            if not entries:
+                del index[key]
+                return True
+        return False
+
+    def _process_name(self, pid):
+        name = self._process_names.get(pid)
+        if name is None:
+            name = self._process_names[pid] = self.backend.get_process_name(pid) or ''
+        return name
+
+    # Function to bring the index in line with a full enumeration
+    def reconcile(self):
+        current = self.backend.enum_windows()
+        with self._lock:
+            known = set(self.windows)
+        for hwnd in known.difference(current):
+            self.remove(hwnd)
+        # Titles can change without events, so re-read every window
+        for hwnd in current:
+            self.add(hwnd)
+        self._process_names.clear()
+        self.foreground = self.backend.get_foreground_window()
+        self.reconciles += 1
+
+    def get(self, hwnd):
+        return self.windows.get(hwnd)
+
+    def all(self):
+        with self._lock:
+            return list(self.windows.values())
+
+    # Function to list every indexed window, most recently focused first
+    def by_recency(self):
+        with self._lock:
+            return sorted(self.windows.values(), key=lambda info: -self.last_focus.get(info.hwnd, 0))
+
+    def windows_of_pid(self, pid):
+        with self._lock:
+            return list(self.by_pid.get(pid, ()))
+
+    def windows_of_process(self, process):
+        with self._lock:
+            return list(self.by_process.get(process.lower(), ()))
+
+    def windows_of_class(self, class_name):
+        with self._lock:
+            return list(self.by_class.get(class_name, ()))
+
+    # Function to find windows whose tokens start with every query token, best match first
+    def search(self, query, limit=10):
+        query = query.strip().lower()
+        if not query:
+            with self._lock:
+                recent = sorted(self.last_focus, key=self.last_focus.get, reverse=True)
+                return [self.windows[hwnd] for hwnd in recent[:limit] if hwnd in self.windows]
+        query_tokens = tokenize(query)
+        with self._lock:
+            if self._sorted_tokens is None:
+                self._sorted_tokens = sorted(self.by_token)
+            candidates = None
+            for query_token in query_tokens:
+                matches = set()
+                tokens = self._sorted_tokens
+                for i in range(bisect_left(tokens, query_token), len(tokens)):
+                    if not tokens[i].startswith(query_token):
+                        break
+                    matches |= self.by_token[tokens[i]]
+                candidates = matches if candidates is None else candidates & matches
+                if not candidates:
+                    break
+            if not candidates:
+                # Fall back to a substring match over titles
+                candidates = [hwnd for hwnd, info in self.windows.items() if query in info.title.lower()]
+            ranked = sorted(
+                (self.windows[hwnd] for hwnd in candidates),
+                key=lambda info: (-match_score(info, query_tokens, query), -self.last_focus.get(info.hwnd, 0))
+            )
+        return ranked[:limit]
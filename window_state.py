@@ -0,0 +1,239 @@
+import threading
+import time
+from collections import OrderedDict
+from window_backend import WS_EX_LAYERED, WS_EX_TOPMOST
+
+# Global variables
+default_ttl = 1.0  # Seconds a cached value is trusted before it is read from the window again
+default_max_windows = 256  # Least recently used windows beyond this are evicted
+default_echo_window = 0.25  # Seconds after our own position write during which location_change events count as its echo
+
+# Last known state of one window; a value is only used while its read/write time is within the TTL
+class WindowState:
+    __slots__ = ('rect', 'rect_at', 'ex_style', 'style_at', 'alpha', 'alpha_at', 'written_at')
+
+    def __init__(self):
+        self.rect = None
+        self.rect_at = None
+        self.ex_style = None
+        self.style_at = None
+        self.alpha = None
+        self.alpha_at = None
+        self.written_at = None  # Time of our last position write, to recognise its location_change echoes
+
+# Per-window cache of rect, extended style (layered/topmost flags) and layered alpha.
+# It stands in front of a backend: reads are answered from the cache while fresh, writes go
+# through and update the cache, and everything else is passed to the backend unchanged.
+# location_change events that we did not cause drop the cached rect, destroy events drop the
+# window, and every value expires after ttl seconds in case an event was missed. Set ttl to 0
+# to read every value from the window.
+# Win32 sends zero, one or several location_change events per SetWindowPos, so our own echoes
+# cannot be counted; every location_change within echo_window seconds of our last write to the
+# window is taken as its echo, without reading the window again. A user drag sends a stream of
+# events that outlasts the window, so it still drops the cached rect.
+class WindowStateCache:
+    def __init__(self, backend, ttl=default_ttl, max_windows=default_max_windows, clock=time.monotonic, echo_window=default_echo_window):
+        self.backend = backend
+        self.ttl = ttl
+        self.echo_window = echo_window
+        self.max_windows = max_windows
+        self.clock = clock
+        self._states = OrderedDict()  # hwnd -> WindowState, least recently used first
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+        self.echoes = 0  # location_change events taken as echoes of our own writes
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+    def _state(self, hwnd):
+        state = self._states.get(hwnd)
+        if state is None:
+            state = self._states[hwnd] = WindowState()
+            if len(self._states) > self.max_windows:
+                self._states.popitem(last=False)
+                self.evictions += 1
+        else:
+            self._states.move_to_end(hwnd)
+        return state
+
+    def _fresh(self, stamp, now):
+        return stamp is not None and now - stamp < self.ttl
+
+    def on_event(self, event, hwnd):
+        if event == 'location_change':
+            with self._lock:
+                state = self._states.get(hwnd)
+                if state is None or state.rect is None:
+                    return
+                if state.written_at is not None and self.clock() - state.written_at < self.echo_window:
+                    self.echoes += 1
+                    return
+                state.rect = state.rect_at = state.written_at = None
+                self.invalidations += 1
+        elif event == 'destroy':
+            self.invalidate(hwnd)
+
+    # Function to forget one window, or every window when hwnd is None
+    def invalidate(self, hwnd=None):
+        with self._lock:
+            if hwnd is None:
+                self.invalidations += len(self._states)
+                self._states.clear()
+            elif self._states.pop(hwnd, None) is not None:
+                self.invalidations += 1
+
+    def get_window_rect(self, hwnd):
+        now = self.clock()
+        with self._lock:
+            state = self._state(hwnd)
+            if self._fresh(state.rect_at, now):
+                self.hits += 1
+                return state.rect
+            self.misses += 1
+        rect = tuple(self.backend.get_window_rect(hwnd))
+        with self._lock:
+            state = self._state(hwnd)
+            state.rect = rect
+            state.rect_at = now
+            state.written_at = None
+        return rect
+
+    def set_window_pos(self, hwnd, x, y, width, height):
+        with self._lock:
+            self._state(hwnd).written_at = self.clock()  # Before the call: the echo may come while it runs
+        self.backend.set_window_pos(hwnd, x, y, width, height)
+        self._record_rect(hwnd, x, y, width, height)
+
+    def _record_rect(self, hwnd, x, y, width, height):
+        with self._lock:
+            state = self._state(hwnd)
+            state.rect = (x, y, x + width, y + height)
+            state.rect_at = state.written_at = self.clock()
+
+    def get_ex_style(self, hwnd):
+        now = self.clock()
+        with self._lock:
+            state = self._state(hwnd)
+            if self._fresh(state.style_at, now):
+                self.hits += 1
+                return state.ex_style
+            self.misses += 1
+        style = self.backend.get_ex_style(hwnd)
+        with self._lock:
+            state = self._state(hwnd)
+            state.ex_style = style
+            state.style_at = now
+        return style
+
+    def set_ex_style(self, hwnd, style):
+        self.backend.set_ex_style(hwnd, style)
+        with self._lock:
+            state = self._state(hwnd)
+            state.ex_style = style
+            state.style_at = self.clock()
+
+    def is_layered(self, hwnd):
+        return bool(self.get_ex_style(hwnd) & WS_EX_LAYERED)
+
+    def is_topmost(self, hwnd):
+        return bool(self.get_ex_style(hwnd) & WS_EX_TOPMOST)
+
+    def get_layered_alpha(self, hwnd):
+        now = self.clock()
+        with self._lock:
+            state = self._state(hwnd)
+            if self._fresh(state.alpha_at, now):
+                self.hits += 1
+                return state.alpha
+            self.misses += 1
+        alpha = self.backend.get_layered_alpha(hwnd)
+        with self._lock:
+            state = self._state(hwnd)
+            state.alpha = alpha
+            state.alpha_at = now
+        return alpha
+
+    def set_layered_alpha(self, hwnd, alpha):
+        self.backend.set_layered_alpha(hwnd, alpha)
+        with self._lock:
+            state = self._state(hwnd)
+            state.alpha = alpha
+            state.alpha_at = self.clock()
+
+    def set_topmost(self, hwnd, topmost):
+        self.backend.set_topmost(hwnd, topmost)
+        self._record_topmost(hwnd, topmost)
+
+    def _record_topmost(self, hwnd, topmost):
+        with self._lock:
+            state = self._state(hwnd)
+            if state.ex_style is not None:
+                state.ex_style = state.ex_style | WS_EX_TOPMOST if topmost else state.ex_style & ~WS_EX_TOPMOST
+
+    # Moving into another window's band can change the topmost flag, so the cached style is dropped
+    def set_insert_after(self, hwnd, insert_after):
+        self.backend.set_insert_after(hwnd, insert_after)
+        self._forget_style(hwnd)
+
+    def _forget_style(self, hwnd):
+        with self._lock:
+            state = self._states.get(hwnd)
+            if state is not None:
+                state.ex_style = state.style_at = None
+
+    def begin_defer(self, count):
+        return CachedTransaction(self, self.backend.begin_defer(count))
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'invalidations': self.invalidations,
+            'evictions': self.evictions,
+            'echoes': self.echoes,
+            'windows': len(self._states),
+        }
+
+# Deferred transaction that records its writes in the cache once committed
+class CachedTransaction:
+    def __init__(self, cache, transaction):
+        self.cache = cache
+        self.transaction = transaction
+        self.positions = {}
+        self.topmost = {}
+        self.reordered = []
+
+    def set_pos(self, hwnd, x, y, width, height):
+        self.transaction.set_pos(hwnd, x, y, width, height)
+        self.positions[hwnd] = (x, y, width, height)
+
+    def set_topmost(self, hwnd, topmost):
+        self.transaction.set_topmost(hwnd, topmost)
+        self.topmost[hwnd] = topmost
+
+    def set_insert_after(self, hwnd, insert_after):
+        self.transaction.set_insert_after(hwnd, insert_after)
+        self.reordered.append(hwnd)
+
+    def commit(self):
+        cache = self.cache
+        with cache._lock:
+            now = cache.clock()
+            for hwnd in self.positions:
+                cache._state(hwnd).written_at = now
+        self.transaction.commit()
+        for hwnd, rect in self.positions.items():
+            cache._record_rect(hwnd, *rect)
+        for hwnd, topmost in self.topmost.items():
+            cache._record_topmost(hwnd, topmost)
+        for hwnd in self.reordered:
+            cache._forget_style(hwnd)
+        self.positions = {}
+        self.topmost = {}
+        self.reordered = []